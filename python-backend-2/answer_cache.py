@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Cache semântico de respostas dos pipelines (flash e thinking)
+
+Consultas sem histórico cujo embedding esteja a uma similaridade mínima de uma
+consulta já respondida reaproveitam a resposta anterior: a mesma sequência de
+mensagens (progresso, respostas parciais e FINAL_RESULT) é reenviada ao
+cliente sem nenhuma chamada ao LLM. O cache acompanha a versão do corpus
+(result_cache.get_corpus_version) e é esvaziado quando o corpus é reindexado.
+"""
+import json
+import time
+import asyncio
+import logging
+import threading
+import numpy as np
+from result_cache import get_corpus_version
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+
+def _embed(consulta):
+    """Gera o embedding normalizado da consulta (usa o cache de embeddings)"""
+    from search_algorithms.vector_search import vectorize_query
+
+    vetor = np.asarray(vectorize_query(consulta), dtype=np.float32)
+    norma = np.linalg.norm(vetor)
+    return vetor / norma if norma > 0 else vetor
+
+
+def _resposta_valida(mensagens):
+    """Verifica se a sequência gravada terminou com uma resposta útil
+
+    Respostas de erro (sem links recomendados) não são guardadas.
+    """
+    if not mensagens or not mensagens[-1].startswith("FINAL_RESULT::"):
+        return False
+    try:
+        final = json.loads(mensagens[-1][len("FINAL_RESULT::"):])
+    except json.JSONDecodeError:
+        return False
+    return bool(final.get("links"))
+
+
+class SemanticAnswerCache:
+    """Cache de respostas indexado pelo embedding da consulta"""
+
+    def __init__(self, name, threshold, max_entries, ttl_seconds):
+        """
+        Args:
+            name (str): Nome do cache (usado nos logs)
+            threshold (float): Similaridade de cosseno mínima para reaproveitar uma resposta
+            max_entries (int): Número máximo de respostas guardadas
+            ttl_seconds (float): Validade de cada resposta em segundos
+        """
+        self.name = name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._entries = []  # dicts com embedding, mensagens, timestamp e último uso
+        self._version = get_corpus_version()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _check_version(self):
+        """Descarta todas as respostas se o corpus foi reindexado"""
+        version = get_corpus_version()
+        if version != self._version:
+            logger.info(f"Cache de respostas '{self.name}': corpus reindexado, descartando {len(self._entries)} respostas")
+            self._entries = []
+            self._version = version
+
+    def lookup(self, embedding):
+        """Busca uma resposta guardada para uma consulta semelhante
+
+        Args:
+            embedding (np.ndarray): Embedding normalizado da consulta
+
+        Returns:
+            list[str] | None: Mensagens gravadas, se houver consulta suficientemente similar
+        """
+        with self._lock:
+            self._check_version()
+            agora = time.time()
+            self._entries = [e for e in self._entries if agora - e["timestamp"] <= self.ttl_seconds]
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            similaridades = np.stack([e["embedding"] for e in self._entries]) @ embedding
+            melhor = int(np.argmax(similaridades))
+            if similaridades[melhor] < self.threshold:
+                self.misses += 1
+                return None
+
+            entrada = self._entries[melhor]
+            entrada["last_used"] = agora
+            self.hits += 1
+            logger.info(f"Cache de respostas '{self.name}': acerto com similaridade {similaridades[melhor]:.3f}")
+            return list(entrada["mensagens"])
+
+    def store(self, embedding, mensagens):
+        """Guarda a sequência de mensagens de uma resposta, removendo a menos usada se cheio
+
+        Args:
+            embedding (np.ndarray): Embedding normalizado da consulta
+            mensagens (list[str]): Mensagens produzidas pelo pipeline
+        """
+        with self._lock:
+            self._check_version()
+            agora = time.time()
+            self._entries.append({
+                "embedding": embedding,
+                "mensagens": list(mensagens),
+                "timestamp": agora,
+                "last_used": agora,
+            })
+            if len(self._entries) > self.max_entries:
+                menos_usada = min(range(len(self._entries)), key=lambda i: self._entries[i]["last_used"])
+                self._entries.pop(menos_usada)
+
+    async def wrap_stream(self, consulta, historico, message_stream):
+        """Reenvia a resposta guardada ou grava a resposta do pipeline
+
+        Args:
+            consulta (str): Consulta do usuário
+            historico (str | None): Histórico da conversa (com histórico o cache não é usado)
+            message_stream: Gerador assíncrono do pipeline (só é consumido em caso de falha no cache)
+
+        Yields:
+            str: Mesmas mensagens que o pipeline produziria
+        """
+        if historico:
+            async for mensagem in message_stream:
+                yield mensagem
+            return
+
+        try:
+            embedding = await asyncio.to_thread(_embed, consulta)
+        except Exception as e:
+            logger.error(f"Cache de respostas '{self.name}': erro ao gerar embedding: {e}")
+            async for mensagem in message_stream:
+                yield mensagem
+            return
+
+        mensagens = self.lookup(embedding)
+        if mensagens is not None:
+            await message_stream.aclose()
+            for mensagem in mensagens:
+                yield mensagem
+            return
+
+        gravadas = []
+        try:
+            async for mensagem in message_stream:
+                gravadas.append(mensagem)
+                yield mensagem
+        finally:
+            # Fechado antes do fim (cliente desconectou): encerra também o pipeline
+            await message_stream.aclose()
+
+        if _resposta_valida(gravadas):
+            self.store(embedding, gravadas)
+
+    def stats(self):
+        """Retorna estatísticas de uso do cache
+
+        Returns:
+            dict: Acertos, falhas e número de respostas guardadas
+        """
+        with self._lock:
+            consultas = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / consultas if consultas else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
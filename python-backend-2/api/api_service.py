@@ -5,11 +5,56 @@ from rag_models.flash.query import handle_query_flash
 from rag_models.multimodal.query import handle_query_multimodal
 from api.models import ConsultaRequest, ConsultaResponse, ConsultaMultimodalRequest
 from fastapi import HTTPException, Request
+import asyncio
 import logging
 
 # Logger para rastreamento de operações
 logger = logging.getLogger(__name__)
 
+# Intervalo de verificação de desconexão enquanto se espera a próxima mensagem (s)
+DISCONNECT_POLL_SECONDS = 1.0
+
+async def stream_until_disconnect(request: Request, message_stream):
+    """Repassa as mensagens do pipeline até o cliente desconectar
+    
+    A desconexão é verificada também enquanto se espera a próxima mensagem
+    (por exemplo, o próximo trecho do Gemini). Ao detectá-la, a espera em
+    andamento é cancelada, o que aborta a geração no provedor, e o pipeline
+    é fechado: deixamos de pagar por tokens que ninguém vai ler.
+    
+    Args:
+        request (Request): Requisição FastAPI para verificar desconexão
+        message_stream: Gerador assíncrono de mensagens do pipeline
+        
+    Yields:
+        str: Mensagens do pipeline
+    """
+    proxima = None
+    try:
+        while True:
+            proxima = asyncio.ensure_future(message_stream.__anext__())
+            while not proxima.done():
+                await asyncio.wait({proxima}, timeout=DISCONNECT_POLL_SECONDS)
+                if not proxima.done() and await request.is_disconnected():
+                    logger.info("Client disconnected, cancelling generation")
+                    return
+            try:
+                message = proxima.result()
+            except StopAsyncIteration:
+                return
+            
+            # Verifica se cliente desconectou
+            if await request.is_disconnected():
+                logger.info("Client disconnected")
+                return
+            yield message
+    finally:
+        # Cancela a espera em andamento (também quando esta tarefa é cancelada)
+        if proxima is not None and not proxima.done():
+            proxima.cancel()
+            await asyncio.gather(proxima, return_exceptions=True)
+        await message_stream.aclose()
+
 async def handle_stream(request: Request, req: ConsultaRequest, model_name: str):
     """Processa consulta com streaming de progresso em tempo real
     
@@ -32,13 +77,8 @@ async def handle_stream(request: Request, req: ConsultaRequest, model_name: str)
         else:
             message_stream = handle_query(req.consulta, historico_str)
         
-        # Processa cada mensagem do stream
-        async for message in message_stream:
-            # Verifica se cliente desconectou
-            if await request.is_disconnected():
-                logger.info("Client disconnected")
-                break
-            
+        # Processa cada mensagem do stream, abortando a geração se o cliente desconectar
+        async for message in stream_until_disconnect(request, message_stream):
             # Identifica tipo de mensagem e formata evento SSE
             if message.startswith("FINAL_RESULT::"):
                 # Resultado final - remove prefixo e envia como evento 'done'
@@ -105,11 +145,7 @@ async def handle_multimodal_stream(request: Request, req: ConsultaMultimodalRequ
         historico_str = format_history(req.historico)
         message_stream = handle_query_multimodal(req.consulta, historico_str, req.metadata)
         
-        async for message in message_stream:
-            if await request.is_disconnected():
-                logger.info("Client disconnected")
-                break
-            
+        async for message in stream_until_disconnect(request, message_stream):
             if message.startswith("FINAL_RESULT::"):
                 yield {
                     "event": "done",
@@ -133,19 +169,32 @@ async def handle_multimodal_stream(request: Request, req: ConsultaMultimodalRequ
             "data": f"Server error: {str(e)}"
         }
 
-async def handle_transcribe_stream(request: Request, file_content: bytes, file_type: str):
-    """Processa transcrição com streaming em tempo real"""
+async def handle_transcribe_stream(request: Request, upload, file_type: str):
+    """Processa transcrição com streaming em tempo real
+    
+    Args:
+        request (Request): Requisição FastAPI para verificar desconexão
+        upload (SpooledUpload): Arquivo enviado, gravado em disco (removido ao final)
+        file_type (str): "audio" ou "video"
+    """
+    transcribe_generator = None
     try:
         logger.info(f"[SSE] Iniciando transcrição de {file_type}")
         
         if file_type == "audio":
             from processors.audio_transcriber import transcribe_audio_with_gemini_stream
-            transcribe_generator = transcribe_audio_with_gemini_stream(file_content)
+            transcribe_generator = transcribe_audio_with_gemini_stream(upload.path)
         else:
             from processors.video_transcriber import transcribe_video_with_gemini_stream
-            transcribe_generator = transcribe_video_with_gemini_stream(file_content)
+            transcribe_generator = transcribe_video_with_gemini_stream(upload.path)
         
-        for chunk in transcribe_generator:
+        # O gerador é síncrono (extração do áudio pelo ffmpeg, upload e stream do
+        # Gemini): cada passo roda em uma thread para não travar o event loop
+        while True:
+            chunk = await asyncio.to_thread(next, transcribe_generator, None)
+            if chunk is None:
+                break
+            
             if await request.is_disconnected():
                 logger.info("[SSE] Client disconnected")
                 break
@@ -174,4 +223,13 @@ async def handle_transcribe_stream(request: Request, file_content: bytes, file_t
         yield {
             "event": "error",
             "data": f"Server error: {str(e)}"
-        }
\ No newline at end of file
+        }
+    finally:
+        if transcribe_generator is not None:
+            try:
+                # Encerra o ffmpeg e o stream do Gemini se o cliente saiu no meio
+                transcribe_generator.close()
+            except ValueError:
+                # Um passo ainda roda na thread (tarefa cancelada); termina sozinho
+                pass
+        upload.remove()
\ No newline at end of file
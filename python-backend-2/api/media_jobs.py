@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Execução limitada dos processamentos de mídia fora do event loop
+
+Os processadores de PDF, áudio, imagem e vídeo são bloqueantes (PyPDF2,
+subprocessos ffmpeg, uploads síncronos ao Gemini). Aqui eles rodam em um pool
+de threads compartilhado, com um limite de execuções simultâneas por tipo de
+mídia e uma fila de espera limitada: quando a fila de um tipo está cheia, o
+job é recusado com MediaQueueFullError (a rota responde 503) em vez de
+acumular uploads em memória.
+"""
+import os
+import asyncio
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+# Execuções simultâneas por tipo de mídia
+MEDIA_LIMITS = {
+    "pdf": int(os.getenv("MEDIA_LIMIT_PDF", "4")),
+    "audio": int(os.getenv("MEDIA_LIMIT_AUDIO", "2")),
+    "image": int(os.getenv("MEDIA_LIMIT_IMAGE", "4")),
+    "video": int(os.getenv("MEDIA_LIMIT_VIDEO", "1")),
+}
+MEDIA_QUEUE_SIZE = int(os.getenv("MEDIA_QUEUE_SIZE", "8"))         # Jobs aguardando por tipo antes de recusar
+MEDIA_RETRY_AFTER = int(os.getenv("MEDIA_RETRY_AFTER", "10"))      # Sugestão de espera (s) no header Retry-After
+
+
+class MediaQueueFullError(Exception):
+    """Fila de processamento de um tipo de mídia cheia"""
+
+    def __init__(self, media_type):
+        super().__init__(f"Fila de processamento de '{media_type}' cheia")
+        self.media_type = media_type
+
+
+class MediaJobExecutor:
+    """Pool de threads com limite de concorrência e fila limitada por tipo de mídia
+
+    Os contadores só são alterados no event loop, portanto dispensam trava.
+    """
+
+    def __init__(self, limits, queue_size):
+        """
+        Args:
+            limits (dict[str, int]): Execuções simultâneas por tipo de mídia
+            queue_size (int): Jobs aguardando por tipo antes de recusar novos
+        """
+        self.limits = {media_type: max(limit, 1) for media_type, limit in limits.items()}
+        self.queue_size = max(queue_size, 0)
+        # Uma thread por vaga: os limites por tipo nunca disputam threads entre si
+        self._executor = ThreadPoolExecutor(max_workers=sum(self.limits.values()), thread_name_prefix="midia")
+        self._semaphores = {media_type: asyncio.Semaphore(limit) for media_type, limit in self.limits.items()}
+        self._stats = {
+            media_type: {"running": 0, "waiting": 0, "completed": 0, "failed": 0, "rejected": 0}
+            for media_type in self.limits
+        }
+
+    async def run(self, media_type, func, *args, **kwargs):
+        """Executa func(*args, **kwargs) no pool respeitando o limite do tipo
+
+        Args:
+            media_type (str): Tipo de mídia ("pdf", "audio", "image" ou "video")
+            func: Função bloqueante de processamento
+
+        Returns:
+            Resultado de func
+
+        Raises:
+            MediaQueueFullError: Se já há queue_size jobs desse tipo aguardando
+        """
+        stats = self._stats[media_type]
+        if stats["waiting"] >= self.queue_size and self._semaphores[media_type].locked():
+            stats["rejected"] += 1
+            logger.warning(f"Fila de '{media_type}' cheia ({stats['running']} em execução, {stats['waiting']} aguardando)")
+            raise MediaQueueFullError(media_type)
+
+        stats["waiting"] += 1
+        acquired = False
+        try:
+            async with self._semaphores[media_type]:
+                acquired = True
+                stats["waiting"] -= 1
+                stats["running"] += 1
+                try:
+                    loop = asyncio.get_running_loop()
+                    result = await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+                    stats["completed"] += 1
+                    return result
+                except Exception:
+                    stats["failed"] += 1
+                    raise
+                finally:
+                    stats["running"] -= 1
+        finally:
+            # Cancelado enquanto aguardava a vaga
+            if not acquired:
+                stats["waiting"] -= 1
+
+    def stats(self):
+        """Retorna a ocupação atual e os contadores de cada tipo de mídia
+
+        Returns:
+            dict: Por tipo, limite, em execução, aguardando, concluídos, falhas e recusados
+        """
+        return {
+            media_type: {"limit": self.limits[media_type], "queue_size": self.queue_size, **stats}
+            for media_type, stats in self._stats.items()
+        }
+
+
+# Instância compartilhada pelas rotas de processamento de mídia
+media_jobs = MediaJobExecutor(MEDIA_LIMITS, MEDIA_QUEUE_SIZE)
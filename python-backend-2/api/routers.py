@@ -2,8 +2,14 @@
 # Implementa endpoints para chat síncrono e streaming
 from fastapi import APIRouter, HTTPException, Request, UploadFile, File
 from sse_starlette.sse import EventSourceResponse
+from starlette.background import BackgroundTask
 from .models import ConsultaRequest, ConsultaMultimodalRequest, ConsultaResponse, URLRequest
 from .api_service import handle_stream, handle_multimodal_stream, handle_transcribe_stream
+from .media_jobs import media_jobs, MediaQueueFullError, MEDIA_RETRY_AFTER
+from async_web_scraper import scrape_webpage_async
+from media_cache import media_cache, file_key, url_key, scraped_key
+from .uploads import spool_upload, UploadTooLargeError
+import asyncio
 import logging
 
 # Configura roteador com prefixo vazio e tag para documentação
@@ -11,6 +17,51 @@ router = APIRouter(prefix="", tags=["Chatbot"])
 logger = logging.getLogger(__name__)
 
 
+async def _processar_midia(media_type, func, file, suffix):
+    """Grava o upload em disco e processa a mídia no pool, reaproveitando o
+    resultado de um envio idêntico
+    
+    O arquivo temporário é removido ao final, qualquer que seja o desfecho.
+    
+    Args:
+        media_type (str): Tipo de mídia ("pdf", "audio", "image" ou "video")
+        func: Processador bloqueante (processPDFBackend, processAudioBackend...)
+        file (UploadFile): Arquivo recebido pela rota
+        suffix (str): Extensão do arquivo temporário (ex.: ".mp4")
+        
+    Returns:
+        dict: JSON estruturado para busca
+        
+    Raises:
+        UploadTooLargeError: Se o arquivo passar de UPLOAD_MAX_MB
+    """
+    # Gravado em blocos, sem carregar o arquivo inteiro na memória
+    upload = await spool_upload(file, suffix)
+    with upload:
+        logger.info(f"Upload de '{media_type}' gravado em disco: {upload.size} bytes")
+        if not upload.size:
+            raise ValueError("Arquivo vazio ou não foi possível ler o conteúdo")
+        
+        if media_cache is None:
+            return await media_jobs.run(media_type, func, upload.path)
+        
+        key = file_key(media_type, upload.sha256)
+        result = await asyncio.to_thread(media_cache.get, key)
+        if result is not None:
+            logger.info(f"Cache de mídia: '{media_type}' já processado ({key[:12]})")
+            return result
+        
+        result = await media_jobs.run(media_type, func, upload.path)
+        await asyncio.to_thread(media_cache.put, key, result)
+        return result
+
+async def _spool_or_413(file, suffix):
+    """Grava o upload em disco, respondendo 413 se passar do tamanho máximo"""
+    try:
+        return await spool_upload(file, suffix)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
 @router.post("/ask-stream") 
 async def ask_stream(request: Request, req: ConsultaRequest):
     """Endpoint para consultas com streaming de progresso (SSE)
@@ -54,12 +105,9 @@ async def process_pdf(file: UploadFile = File(...)):
         dict: JSON estruturado para busca
     """
     try:
-        # Lê o conteúdo do arquivo PDF
-        pdf_content = await file.read()
-        
-        # Processa PDF com LLM usando o processador existente
+        # Processa PDF com LLM usando o processador existente (no pool de mídia, fora do event loop)
         from processors.pdf_processor import processPDFBackend
-        result = processPDFBackend(pdf_content)
+        result = await _processar_midia("pdf", processPDFBackend, file, ".pdf")
         
         response_json = {"query": result["input_busca"], "metadata": result}
         
@@ -73,6 +121,11 @@ async def process_pdf(file: UploadFile = File(...)):
         
         return response_json
         
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MediaQueueFullError as e:
+        # Fila cheia: o cliente deve tentar novamente mais tarde
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(MEDIA_RETRY_AFTER)})
     except Exception as e:
         logger.error(f"Erro ao processar PDF: {str(e)}")
         # Retorna resposta básica mesmo com erro
@@ -105,17 +158,10 @@ async def process_audio(file: UploadFile = File(...)):
         print(f"🎵 Recebido arquivo: {file.filename if file else 'None'}")
         print(f"📊 Tipo do arquivo: {file.content_type if file else 'None'}")
         
-        # Lê o conteúdo do arquivo de áudio
-        audio_content = await file.read()
-        print(f"📦 Conteúdo lido: {len(audio_content) if audio_content else 'None'} bytes")
-        
-        if not audio_content:
-            raise ValueError("Arquivo de áudio vazio ou não foi possível ler o conteúdo")
-        
         # Processa áudio com Whisper e LLM
         from processors.audio_processor import processAudioBackend
         print("🚀 Chamando processAudioBackend...")
-        result = processAudioBackend(audio_content)
+        result = await _processar_midia("audio", processAudioBackend, file, ".m4a")
         print(f"✅ Resultado do processamento: {result}")
         
         response_json = {"query": result["input_busca"], "metadata": result}
@@ -130,6 +176,11 @@ async def process_audio(file: UploadFile = File(...)):
         
         return response_json
         
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MediaQueueFullError as e:
+        # Fila cheia: o cliente deve tentar novamente mais tarde
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(MEDIA_RETRY_AFTER)})
     except Exception as e:
         import traceback
         print(f"💥 Erro capturado no router: {str(e)}")
@@ -160,12 +211,15 @@ async def transcribe_audio(request: Request, file: UploadFile = File(...)):
     Returns:
         EventSourceResponse: Stream de eventos SSE com transcrição
     """
-    audio_content = await file.read()
-    if not audio_content:
+    upload = await _spool_or_413(file, ".m4a")
+    if not upload.size:
+        upload.remove()
         raise HTTPException(status_code=400, detail="Arquivo de áudio vazio")
     
-    event_generator = handle_transcribe_stream(request, audio_content, "audio")
-    return EventSourceResponse(event_generator)
+    # A remoção fica atrelada à resposta: roda mesmo se o cliente desconectar
+    # antes de o stream começar (quando o finally do gerador nunca executa)
+    event_generator = handle_transcribe_stream(request, upload, "audio")
+    return EventSourceResponse(event_generator, background=BackgroundTask(upload.remove))
 
 @router.post("/transcribe-video")
 async def transcribe_video(request: Request, file: UploadFile = File(...)):
@@ -178,12 +232,15 @@ async def transcribe_video(request: Request, file: UploadFile = File(...)):
     Returns:
         EventSourceResponse: Stream de eventos SSE com transcrição
     """
-    video_content = await file.read()
-    if not video_content:
+    upload = await _spool_or_413(file, ".mp4")
+    if not upload.size:
+        upload.remove()
         raise HTTPException(status_code=400, detail="Arquivo de vídeo vazio")
     
-    event_generator = handle_transcribe_stream(request, video_content, "video")
-    return EventSourceResponse(event_generator)
+    # A remoção fica atrelada à resposta: roda mesmo se o cliente desconectar
+    # antes de o stream começar (quando o finally do gerador nunca executa)
+    event_generator = handle_transcribe_stream(request, upload, "video")
+    return EventSourceResponse(event_generator, background=BackgroundTask(upload.remove))
 
 @router.post("/process-image")
 async def process_image(file: UploadFile = File(...)):
@@ -199,17 +256,10 @@ async def process_image(file: UploadFile = File(...)):
         print(f"🖼️ Recebido arquivo: {file.filename if file else 'None'}")
         print(f"📊 Tipo do arquivo: {file.content_type if file else 'None'}")
         
-        # Lê o conteúdo do arquivo de imagem
-        image_content = await file.read()
-        print(f"📦 Conteúdo lido: {len(image_content) if image_content else 'None'} bytes")
-        
-        if not image_content:
-            raise ValueError("Arquivo de imagem vazio ou não foi possível ler o conteúdo")
-        
         # Processa imagem com Gemini
         from processors.image_processor import processImageBackend
         print("🚀 Chamando processImageBackend...")
-        result = processImageBackend(image_content)
+        result = await _processar_midia("image", processImageBackend, file, ".jpg")
         print(f"✅ Resultado do processamento: {result}")
         
         response_json = {"query": result["input_busca"], "metadata": result}
@@ -224,6 +274,11 @@ async def process_image(file: UploadFile = File(...)):
         
         return response_json
         
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MediaQueueFullError as e:
+        # Fila cheia: o cliente deve tentar novamente mais tarde
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(MEDIA_RETRY_AFTER)})
     except Exception as e:
         import traceback
         print(f"💥 Erro capturado no router: {str(e)}")
@@ -254,13 +309,8 @@ async def process_video(file: UploadFile = File(...)):
         dict: JSON estruturado para busca
     """
     try:
-        video_content = await file.read()
-        
-        if not video_content:
-            raise ValueError("Arquivo de vídeo vazio ou não foi possível ler o conteúdo")
-        
         from processors.video_processor import processVideoBackend
-        result = processVideoBackend(video_content)
+        result = await _processar_midia("video", processVideoBackend, file, ".mp4")
         
         response_json = {"query": result["input_busca"], "metadata": result}
         
@@ -273,6 +323,11 @@ async def process_video(file: UploadFile = File(...)):
         
         return response_json
         
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MediaQueueFullError as e:
+        # Fila cheia: o cliente deve tentar novamente mais tarde
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(MEDIA_RETRY_AFTER)})
     except Exception as e:
         logger.error(f"Erro ao processar vídeo: {str(e)}")
         error_response = {
@@ -289,6 +344,19 @@ async def process_video(file: UploadFile = File(...)):
         
         return error_response
 
+@router.get("/media-jobs/stats")
+async def media_jobs_stats():
+    """Endpoint de métricas do pool de processamento de mídia
+    
+    Returns:
+        dict: Por tipo de mídia, limite, jobs em execução, aguardando, concluídos, falhas e recusados,
+            mais acertos e falhas do cache de metadados
+    """
+    stats = media_jobs.stats()
+    if media_cache is not None:
+        stats["cache"] = media_cache.stats()
+    return stats
+
 @router.post("/ask-file-stream")
 async def ask_file_stream(request: Request, req: ConsultaMultimodalRequest):
     """Endpoint para consultas geradas a partir de PDF anexado com streaming
@@ -318,68 +386,27 @@ async def process_url(request: URLRequest):
     try:
         url = request.url
         
-        # Executa web scraping
-        import subprocess
         import json
-        import os
-        
-        env = os.environ.copy()
-        env['PYTHONIOENCODING'] = 'utf-8'
-        env['PYTHONHTTPSVERIFY'] = '0'
-        env['CURL_CA_BUNDLE'] = ''
-        
-        # Adiciona proxy se configurado no .env
-        if 'PROXY' in os.environ:
-            env['HTTP_PROXY'] = os.environ['PROXY']
-            env['HTTPS_PROXY'] = os.environ['PROXY']
-            env['http_proxy'] = os.environ['PROXY']
-            env['https_proxy'] = os.environ['PROXY']
-        
-        script_code = '''
-import ssl
-import sys
-ssl._create_default_https_context = ssl._create_unverified_context
-sys.path.insert(0, ".")
-with open("web_scraper.py", encoding="utf-8") as f:
-    exec(f.read())
-'''
-        
-        result = subprocess.run(
-            ['python', '-c', script_code, url],
-            capture_output=True,
-            text=True,
-            cwd='.',
-            encoding='utf-8',
-            env=env
-        )
-        
-        if result.returncode != 0:
-            raise Exception(f"Erro no scraping: {result.stderr}")
-        
-        if not result.stdout.strip():
-            raise Exception(f"Web scraper retornou saída vazia. stderr: {result.stderr}")
-        
-        # Extrai apenas a parte JSON do output (ignora mensagens de debug)
-        output_lines = result.stdout.strip().split('\n')
-        json_start = -1
-        for i, line in enumerate(output_lines):
-            if line.strip().startswith('{'):
-                json_start = i
-                break
-        
-        if json_start == -1:
-            raise Exception(f"Nenhum JSON encontrado no output: {result.stdout[:200]}...")
-        
-        json_output = '\n'.join(output_lines[json_start:])
-        
-        try:
-            scraped_data = json.loads(json_output)
-        except json.JSONDecodeError as e:
-            raise Exception(f"Erro ao parsear JSON: '{json_output[:200]}...'. Erro: {str(e)}")
-        
-        # Processa com LLM
-        from processors.url_processor_backend import process_url_data
-        structured_query = process_url_data(scraped_data)
+        from processors.url_processor_backend import process_url_data, is_youtube_url
+        
+        if is_youtube_url(url):
+            # Vídeos do YouTube são analisados só pela URL: sem scraping
+            scraped_data = {"url": url}
+            cache_key = url_key(url)
+        else:
+            # Executa web scraping no próprio processo (cliente HTTP compartilhado)
+            scraped_data = await scrape_webpage_async(url)
+            cache_key = scraped_key(scraped_data) if scraped_data.get("status") == "success" else None
+        
+        structured_query = None
+        if media_cache is not None and cache_key:
+            structured_query = await asyncio.to_thread(media_cache.get, cache_key)
+        
+        if structured_query is None:
+            # Processa com LLM
+            structured_query = await asyncio.to_thread(process_url_data, scraped_data)
+            if media_cache is not None and cache_key:
+                await asyncio.to_thread(media_cache.put, cache_key, structured_query)
         
         # Log detalhado do JSON gerado
         print("\n" + "="*80)
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+Uploads gravados em disco em blocos, sem carregar o arquivo inteiro na memória
+
+O conteúdo do UploadFile é copiado em blocos de UPLOAD_CHUNK_SIZE para um
+arquivo temporário, calculando o SHA-256 (chave do cache de mídia) na mesma
+passada e interrompendo a cópia acima de UPLOAD_MAX_MB. Os processadores
+recebem o caminho do arquivo, que já serve direto para o ffmpeg e para o
+upload ao Gemini; a memória por upload fica constante, qualquer que seja o
+tamanho do vídeo.
+"""
+import os
+import asyncio
+import hashlib
+import logging
+import tempfile
+from dotenv import load_dotenv
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+UPLOAD_MAX_MB = int(os.getenv("UPLOAD_MAX_MB", "500"))                     # Tamanho máximo de um upload
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))  # Bloco copiado por vez (bytes)
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or None                       # None = diretório temporário do sistema
+
+
+class UploadTooLargeError(Exception):
+    """Upload maior que UPLOAD_MAX_MB"""
+
+    def __init__(self, max_bytes):
+        super().__init__(f"Arquivo maior que o limite de {max_bytes // (1024 * 1024)} MB")
+        self.max_bytes = max_bytes
+
+
+class SpooledUpload:
+    """Upload gravado em um arquivo temporário
+
+    Attributes:
+        path (str): Caminho do arquivo temporário
+        size (int): Tamanho em bytes
+        sha256 (str): SHA-256 do conteúdo (hexadecimal)
+    """
+
+    def __init__(self, path, size, sha256):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+
+    def remove(self):
+        """Remove o arquivo temporário (idempotente)"""
+        if self.path and os.path.exists(self.path):
+            try:
+                os.unlink(self.path)
+            except OSError as e:
+                logger.warning(f"Não foi possível remover o upload temporário {self.path}: {e}")
+        self.path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.remove()
+
+
+def _spool(source, suffix, max_bytes):
+    """Copia o arquivo de origem em blocos para um temporário (bloqueante)"""
+    digest = hashlib.sha256()
+    size = 0
+    with tempfile.NamedTemporaryFile(suffix=suffix, dir=UPLOAD_TMP_DIR, delete=False) as target:
+        try:
+            while True:
+                chunk = source.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+                digest.update(chunk)
+                target.write(chunk)
+        except BaseException:
+            target.close()
+            os.unlink(target.name)
+            raise
+    return SpooledUpload(target.name, size, digest.hexdigest())
+
+
+async def spool_upload(file, suffix, max_mb=None):
+    """Grava um UploadFile em um arquivo temporário, em blocos
+
+    Args:
+        file (UploadFile): Arquivo recebido pela rota
+        suffix (str): Extensão do arquivo temporário (ex.: ".mp4")
+        max_mb (int, optional): Tamanho máximo em MB (padrão UPLOAD_MAX_MB)
+
+    Returns:
+        SpooledUpload: Caminho, tamanho e SHA-256 do arquivo gravado;
+            o chamador deve removê-lo (remove() ou bloco with)
+
+    Raises:
+        UploadTooLargeError: Se o arquivo passar do tamanho máximo
+    """
+    max_bytes = (max_mb or UPLOAD_MAX_MB) * 1024 * 1024
+    # A cópia roda em uma thread: a escrita em disco não bloqueia o event loop
+    await file.seek(0)
+    return await asyncio.to_thread(_spool, file.file, suffix, max_bytes)
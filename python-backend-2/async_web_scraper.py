@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Web scraping assíncrono, executado no próprio processo da API
+
+Versão assíncrona de web_scraper.scrape_webpage: o download usa um cliente
+httpx compartilhado (conexões keep-alive reaproveitadas entre requisições) e
+é feito em streaming, interrompido assim que a página passa de
+SCRAPER_MAX_BYTES. A análise do HTML (parse_webpage, com lxml quando
+disponível) roda em uma thread para não bloquear o event loop.
+"""
+import os
+import asyncio
+import logging
+import httpx
+from dotenv import load_dotenv
+from web_scraper import HEADERS, parse_webpage
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+SCRAPER_MAX_BYTES = int(os.getenv("SCRAPER_MAX_BYTES", str(5 * 1024 * 1024)))   # Tamanho máximo baixado por página
+SCRAPER_TIMEOUT = float(os.getenv("SCRAPER_TIMEOUT", "30"))                       # Timeout por operação de rede (s)
+SCRAPER_MAX_CONNECTIONS = int(os.getenv("SCRAPER_MAX_CONNECTIONS", "20"))         # Conexões simultâneas do cliente
+PROXY = os.getenv("PROXY")
+
+# Cliente HTTP compartilhado, criado no primeiro uso
+_client = None
+
+
+def get_client():
+    """Retorna o cliente httpx compartilhado, criando-o no primeiro uso
+
+    Returns:
+        httpx.AsyncClient: Cliente com pool de conexões keep-alive
+    """
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            headers=HEADERS,
+            timeout=SCRAPER_TIMEOUT,
+            limits=httpx.Limits(max_connections=SCRAPER_MAX_CONNECTIONS),
+            follow_redirects=True,
+            verify=False,  # mesmo comportamento do scraper síncrono
+            proxy=PROXY or None,
+        )
+    return _client
+
+
+async def close_client():
+    """Fecha o cliente compartilhado (chamado no encerramento da aplicação)"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def _download(url):
+    """Baixa a página em streaming, limitada a SCRAPER_MAX_BYTES
+
+    Returns:
+        tuple[bytes, str | None]: Conteúdo baixado (truncado no limite, se a
+            página for maior) e o ETag da resposta
+    """
+    async with get_client().stream("GET", url) as response:
+        response.raise_for_status()
+
+        etag = response.headers.get("etag")
+        partes = []
+        total = 0
+        async for parte in response.aiter_bytes():
+            partes.append(parte)
+            total += len(parte)
+            if total >= SCRAPER_MAX_BYTES:
+                # Interrompe o download: o início da página basta para a análise
+                logger.warning(f"Página maior que {SCRAPER_MAX_BYTES} bytes, download interrompido: {url}")
+                break
+
+    return b"".join(partes)[:SCRAPER_MAX_BYTES], etag
+
+
+async def scrape_webpage_async(url):
+    """
+    Realiza web scraping de uma URL e extrai o conteúdo textual (assíncrono)
+
+    Mesmo formato de retorno de web_scraper.scrape_webpage, mais o 'etag'
+    da resposta (usado como versão da página no cache de mídia).
+    """
+    try:
+        logger.info(f"Scraping da URL: {url}")
+        content, etag = await _download(url)
+        result = await asyncio.to_thread(parse_webpage, url, content)
+        result['etag'] = etag
+        return result
+
+    except Exception as e:
+        return {
+            'url': url,
+            'error': str(e),
+            'status': 'error'
+        }
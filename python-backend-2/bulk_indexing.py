@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Indexação em lote no Elasticsearch compartilhada pelos scripts de ingestão
+
+Recebe um fluxo (gerador) de ações — index, update e delete misturados — e o
+envia em blocos de ES_BULK_CHUNK_SIZE ações, com até ES_BULK_THREADS blocos em
+paralelo. Cada bloco usa streaming_bulk, que reenvia com backoff exponencial os
+documentos rejeitados com 429 (fila de indexação cheia). O fluxo é consumido
+sob demanda: apenas os blocos em trânsito ficam em memória.
+"""
+import os
+import logging
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from elasticsearch.helpers import streaming_bulk
+from dotenv import load_dotenv
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+ES_BULK_CHUNK_SIZE = int(os.getenv("ES_BULK_CHUNK_SIZE", "500"))           # Ações por requisição _bulk
+ES_BULK_THREADS = int(os.getenv("ES_BULK_THREADS", "4"))                   # Requisições _bulk em paralelo
+ES_BULK_MAX_RETRIES = int(os.getenv("ES_BULK_MAX_RETRIES", "5"))           # Reenvios de documentos com 429
+ES_BULK_INITIAL_BACKOFF = float(os.getenv("ES_BULK_INITIAL_BACKOFF", "2"))  # Espera antes do 1º reenvio (s), dobra a cada tentativa
+ES_BULK_MAX_BACKOFF = float(os.getenv("ES_BULK_MAX_BACKOFF", "60"))         # Espera máxima entre reenvios (s)
+
+
+def _chunks(actions, size):
+    """Agrupa o fluxo de ações em listas de até size ações"""
+    chunk = []
+    for action in actions:
+        chunk.append(action)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _send_chunk(es, chunk):
+    """Envia um bloco de ações com reenvio em caso de 429
+
+    Returns:
+        tuple[int, list]: Ações bem-sucedidas e itens com erro
+    """
+    success = 0
+    errors = []
+    for ok, item in streaming_bulk(
+        es,
+        chunk,
+        chunk_size=len(chunk),
+        max_retries=ES_BULK_MAX_RETRIES,
+        initial_backoff=ES_BULK_INITIAL_BACKOFF,
+        max_backoff=ES_BULK_MAX_BACKOFF,
+        raise_on_error=False,
+        raise_on_exception=False,
+    ):
+        # Remover um documento que já não existe não é erro
+        if ok or item.get("delete", {}).get("status") == 404:
+            success += 1
+        else:
+            errors.append(item)
+    return success, errors
+
+
+def bulk_index(es, actions, chunk_size=None, thread_count=None):
+    """Envia um fluxo de ações ao Elasticsearch em blocos paralelos
+
+    Args:
+        es (Elasticsearch): Cliente Elasticsearch
+        actions: Iterável de ações no formato de elasticsearch.helpers
+            (com "_op_type" index/update/delete)
+        chunk_size (int, optional): Ações por requisição (padrão ES_BULK_CHUNK_SIZE)
+        thread_count (int, optional): Requisições em paralelo (padrão ES_BULK_THREADS)
+
+    Returns:
+        tuple[int, list]: Total de ações bem-sucedidas e itens com erro
+    """
+    chunk_size = chunk_size or ES_BULK_CHUNK_SIZE
+    thread_count = max(thread_count or ES_BULK_THREADS, 1)
+
+    success = 0
+    errors = []
+
+    def collect(futures):
+        nonlocal success
+        for future in futures:
+            chunk_success, chunk_errors = future.result()
+            success += chunk_success
+            errors.extend(chunk_errors)
+
+    with ThreadPoolExecutor(max_workers=thread_count, thread_name_prefix="es-bulk") as executor:
+        pending = set()
+        for chunk in _chunks(actions, chunk_size):
+            pending.add(executor.submit(_send_chunk, es, chunk))
+            # Limita os blocos em memória: espera um terminar antes de ler mais
+            if len(pending) >= thread_count * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+        collect(pending)
+
+    if errors:
+        logger.error(f"Indexação em lote: {len(errors)} ações com erro (ex.: {errors[0]})")
+    logger.info(f"Indexação em lote: {success} ações concluídas")
+    return success, errors
+
+
+@contextmanager
+def bulk_load_settings(es, index):
+    """Desliga refresh e réplicas do índice durante uma carga em massa
+
+    Restaura os valores anteriores ao final (mesmo em caso de erro) e força
+    um refresh para tornar os documentos visíveis.
+
+    Args:
+        es (Elasticsearch): Cliente Elasticsearch
+        index (str): Nome do índice
+    """
+    settings = es.indices.get_settings(index=index)[index]["settings"]["index"]
+    previous = {
+        "refresh_interval": settings.get("refresh_interval"),      # None = padrão do cluster
+        "number_of_replicas": settings.get("number_of_replicas"),
+    }
+
+    es.indices.put_settings(index=index, settings={"index": {"refresh_interval": "-1", "number_of_replicas": 0}})
+    logger.info(f"Índice '{index}': refresh e réplicas desligados para a carga")
+    try:
+        yield
+    finally:
+        es.indices.put_settings(index=index, settings={"index": previous})
+        es.indices.refresh(index=index)
+        logger.info(f"Índice '{index}': configurações restauradas ({previous})")
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Pool de conexões Oracle compartilhado pelo processo
+
+Todos os algoritmos de busca (search_algorithms) e os scripts de ingestão
+obtêm conexões deste pool em vez de abrir uma conexão nova a cada consulta.
+O pool é criado sob demanda na primeira utilização e reaproveitado por todas
+as requisições do processo.
+"""
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+import oracledb
+from dotenv import load_dotenv
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Carrega variáveis de ambiente
+load_dotenv()
+DB_USER = os.getenv("DB_USER")
+DB_PASSWORD = os.getenv("DB_PASSWORD")
+DB_DSN = os.getenv("DB_DSN")
+
+# Configurações do pool (podem ser sobrescritas pelo .env)
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "2"))                    # Conexões mantidas abertas
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))                   # Máximo de conexões simultâneas
+DB_POOL_INCREMENT = int(os.getenv("DB_POOL_INCREMENT", "1"))        # Conexões abertas por vez ao crescer
+DB_POOL_WAIT_TIMEOUT = int(os.getenv("DB_POOL_WAIT_TIMEOUT", "5000"))  # Espera máxima por conexão livre (ms)
+DB_POOL_PING_INTERVAL = int(os.getenv("DB_POOL_PING_INTERVAL", "60"))  # Ping de saúde em conexões ociosas (s)
+DB_POOL_IDLE_TIMEOUT = int(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))   # Fecha conexões excedentes ociosas (s)
+
+# Leitura em streaming (scripts de ingestão)
+DB_FETCH_ARRAYSIZE = int(os.getenv("DB_FETCH_ARRAYSIZE", "500"))    # Linhas por ida ao banco
+DB_FETCH_BATCH_SIZE = int(os.getenv("DB_FETCH_BATCH_SIZE", "200"))  # Linhas por lote entregue ao chamador
+
+# Pool global e trava para criação única
+_pool = None
+_pool_lock = threading.Lock()
+
+# Estatísticas de uso do pool
+_stats_lock = threading.Lock()
+_stats = {
+    "acquisitions": 0,     # Total de conexões obtidas
+    "failures": 0,         # Falhas ao obter conexão (timeout, banco indisponível)
+    "total_wait_ms": 0.0,  # Tempo total de espera por conexão
+    "max_wait_ms": 0.0,    # Maior espera observada
+    "total_hold_ms": 0.0,  # Tempo total de uso das conexões
+}
+
+
+def get_pool():
+    """Retorna o pool de conexões do processo, criando-o na primeira chamada
+
+    Returns:
+        oracledb.ConnectionPool: Pool de conexões compartilhado
+    """
+    global _pool
+
+    if _pool is not None:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None:
+            logger.info(f"Criando pool Oracle (min={DB_POOL_MIN}, max={DB_POOL_MAX})...")
+            _pool = oracledb.create_pool(
+                user=DB_USER,
+                password=DB_PASSWORD,
+                dsn=DB_DSN,
+                min=DB_POOL_MIN,
+                max=DB_POOL_MAX,
+                increment=DB_POOL_INCREMENT,
+                getmode=oracledb.POOL_GETMODE_TIMEDWAIT,
+                wait_timeout=DB_POOL_WAIT_TIMEOUT,
+                ping_interval=DB_POOL_PING_INTERVAL,
+                timeout=DB_POOL_IDLE_TIMEOUT,
+            )
+            logger.info("Pool Oracle criado com sucesso")
+
+    return _pool
+
+
+@contextmanager
+def get_connection():
+    """Obtém uma conexão do pool e a devolve ao final do bloco
+
+    Conexões ociosas há mais de DB_POOL_PING_INTERVAL segundos são verificadas
+    pelo próprio pool antes de serem entregues, descartando sessões mortas.
+
+    Yields:
+        oracledb.Connection: Conexão emprestada do pool
+
+    Raises:
+        oracledb.Error: Se não houver conexão livre dentro de DB_POOL_WAIT_TIMEOUT
+    """
+    pool = get_pool()
+
+    start = time.perf_counter()
+    try:
+        connection = pool.acquire()
+    except oracledb.Error:
+        with _stats_lock:
+            _stats["failures"] += 1
+        logger.error(f"Não foi possível obter conexão do pool (ocupadas: {pool.busy}/{pool.max})")
+        raise
+    wait_ms = (time.perf_counter() - start) * 1000
+
+    acquired_at = time.perf_counter()
+    try:
+        yield connection
+    finally:
+        hold_ms = (time.perf_counter() - acquired_at) * 1000
+        pool.release(connection)
+        with _stats_lock:
+            _stats["acquisitions"] += 1
+            _stats["total_wait_ms"] += wait_ms
+            _stats["max_wait_ms"] = max(_stats["max_wait_ms"], wait_ms)
+            _stats["total_hold_ms"] += hold_ms
+        logger.debug(f"Conexão Oracle: espera {wait_ms:.1f}ms, uso {hold_ms:.1f}ms")
+
+
+def stream_query(sql, params=None, batch_size=DB_FETCH_BATCH_SIZE):
+    """Executa uma consulta e produz as linhas em lotes de tamanho fixo
+    
+    O cursor busca DB_FETCH_ARRAYSIZE linhas por ida ao banco e nunca
+    materializa o resultado inteiro, de modo que a memória usada não depende
+    do tamanho da tabela. Para receber CLOBs como str em vez de LOBs (uma ida
+    ao banco a menos por linha), o chamador deve definir
+    oracledb.defaults.fetch_lobs = False.
+    
+    Args:
+        sql (str): Consulta a executar
+        params (list | dict, optional): Parâmetros de bind
+        batch_size (int): Número de linhas por lote
+        
+    Yields:
+        list[tuple]: Lote com até batch_size linhas
+    """
+    with get_connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.arraysize = DB_FETCH_ARRAYSIZE
+            cursor.prefetchrows = DB_FETCH_ARRAYSIZE
+            cursor.execute(sql, params or [])
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+
+
+def get_pool_stats():
+    """Retorna estatísticas de uso do pool
+
+    Returns:
+        dict: Contadores de aquisições, esperas e ocupação atual do pool
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+
+    acquisitions = stats["acquisitions"]
+    stats["avg_wait_ms"] = stats["total_wait_ms"] / acquisitions if acquisitions else 0.0
+    stats["avg_hold_ms"] = stats["total_hold_ms"] / acquisitions if acquisitions else 0.0
+
+    if _pool is not None:
+        stats["opened"] = _pool.opened
+        stats["busy"] = _pool.busy
+        stats["max"] = _pool.max
+
+    return stats
+
+
+def close_pool():
+    """Fecha o pool de conexões (usado ao final de scripts de ingestão)"""
+    global _pool
+
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close(force=True)
+            _pool = None
+            logger.info("Pool Oracle fechado")
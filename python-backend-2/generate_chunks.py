@@ -5,18 +5,27 @@ Generate chunks from documents and store them with vectors in Oracle database
 import os
 import logging
 import oracledb
+from db_connection import get_connection, stream_query, close_pool
+from result_cache import invalidate_result_caches
 import numpy as np
 import time
+import hashlib
+from array import array
 import argparse
 import ssl
+import queue
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
 
 # Configuration variables
 CHUNK_SIZE = 500  # Size of each chunk in characters
 OVERLAP_SIZE = 200  # Size of overlap between chunks in characters
-BATCH_SIZE = 50  # Number of chunks to process in each batch
+BATCH_SIZE = 50  # Initial number of chunks per batch (adapted while running)
 MODEL_NAME = 'intfloat/multilingual-e5-large-instruct'
+VECTOR_INDEX_NAME = 'CHUNKS_VECTOR_IDX'
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -24,9 +33,20 @@ logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv()
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_DSN = os.getenv("DB_DSN")
+
+# Embedding pipeline: reader -> encoder processes -> writer thread
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "0"))  # Encoder processes (0 = one per 4 cores)
+EMBEDDING_QUEUE_SIZE = int(os.getenv("EMBEDDING_QUEUE_SIZE", "4"))  # Batches in flight between reader and writer
+EMBEDDING_TARGET_BATCH_SECONDS = float(os.getenv("EMBEDDING_TARGET_BATCH_SECONDS", "2.0"))  # Target encode time per batch
+MIN_BATCH_SIZE = 16
+MAX_BATCH_SIZE = 512
+
+# Fetch CLOBs as str: documents are streamed in batches without one LOB round trip per row
+oracledb.defaults.fetch_lobs = False
+
+# Vector index used by the approximate search mode (VECTOR_SEARCH_MODE=approx)
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "ivf").lower()  # "ivf" (neighbor partitions) or "hnsw" (in-memory graph)
+VECTOR_INDEX_TARGET_ACCURACY = int(os.getenv("VECTOR_INDEX_TARGET_ACCURACY", "95"))
 
 
 def split_text_into_chunks(text, chunk_size, overlap_size):
@@ -90,10 +110,88 @@ def create_chunks_table(cursor):
         cursor.execute(create_table_sql)
         logger.info("Tabela 'chunks' criada com sucesso.")
 
-def generate_chunks():
-    """Generate chunks from documents and store them with vectors"""
-    logger.info(f"Carregando modelo {MODEL_NAME}...")
+def create_vector_index(cursor):
+    """Create the approximate-search vector index on chunks if it doesn't exist"""
+    cursor.execute("SELECT COUNT(*) FROM user_indexes WHERE index_name = :1", (VECTOR_INDEX_NAME,))
+    if cursor.fetchone()[0] > 0:
+        logger.info(f"Índice vetorial '{VECTOR_INDEX_NAME}' já existe.")
+        return
     
+    if VECTOR_INDEX_TYPE == "hnsw":
+        organization = "ORGANIZATION INMEMORY NEIGHBOR GRAPH"
+    else:
+        organization = "ORGANIZATION NEIGHBOR PARTITIONS"
+    
+    logger.info(f"Criando índice vetorial '{VECTOR_INDEX_NAME}' ({VECTOR_INDEX_TYPE})...")
+    cursor.execute(f"""
+    CREATE VECTOR INDEX {VECTOR_INDEX_NAME} ON chunks (vector)
+    {organization}
+    DISTANCE COSINE
+    WITH TARGET ACCURACY {int(VECTOR_INDEX_TARGET_ACCURACY)}
+    """)
+    logger.info(f"Índice vetorial '{VECTOR_INDEX_NAME}' criado com sucesso.")
+
+def create_hashes_table(cursor):
+    """Create the per-document content hash table used by incremental runs"""
+    try:
+        cursor.execute("SELECT COUNT(*) FROM chunk_document_hashes WHERE ROWNUM = 1")
+    except oracledb.Error:
+        logger.info("Criando tabela 'chunk_document_hashes'...")
+        cursor.execute("""
+        CREATE TABLE chunk_document_hashes (
+            document_id NUMBER PRIMARY KEY,
+            content_hash VARCHAR2(32) NOT NULL
+        ) TABLESPACE USERS
+        """)
+        logger.info("Tabela 'chunk_document_hashes' criada com sucesso.")
+
+def get_document_hash(text):
+    """Hash of everything that determines a document's chunks and vectors
+    
+    Changing the chunking parameters or the model also marks documents as changed.
+    """
+    content = f"{MODEL_NAME}|{CHUNK_SIZE}|{OVERLAP_SIZE}|{text}"
+    return hashlib.md5(content.encode('utf-8')).hexdigest()
+
+def save_document_hashes(cursor, document_hashes):
+    """Insert or update the content hash of each processed document"""
+    if not document_hashes:
+        return
+    cursor.executemany("""
+        MERGE INTO chunk_document_hashes h
+        USING (SELECT :1 AS document_id, :2 AS content_hash FROM dual) s
+        ON (h.document_id = s.document_id)
+        WHEN MATCHED THEN UPDATE SET h.content_hash = s.content_hash
+        WHEN NOT MATCHED THEN INSERT (document_id, content_hash) VALUES (s.document_id, s.content_hash)
+    """, list(document_hashes.items()))
+
+def insert_chunks(cursor, batch, embeddings):
+    """Insert a batch of chunks (text and vector together) in a single round trip
+    
+    Vectors are bound natively as array('f') instead of being formatted as text,
+    and the generated ids come back through RETURNING.
+    
+    Returns:
+        list[int]: Ids of the inserted chunks, in batch order
+    """
+    rows = [
+        (chunk['document_id'], chunk['chunk_index'], chunk['chunk_text'],
+         array('f', np.asarray(vector, dtype=np.float32).tobytes()))
+        for chunk, vector in zip(batch, embeddings)
+    ]
+    
+    id_var = cursor.var(oracledb.DB_TYPE_NUMBER, arraysize=len(rows))
+    # Chunk texts (<= CHUNK_SIZE chars) are bound as strings; Oracle converts them to CLOB
+    cursor.setinputsizes(None, None, None, oracledb.DB_TYPE_VECTOR, id_var)
+    cursor.executemany(
+        "INSERT INTO chunks (document_id, chunk_index, chunk_text, vector) "
+        "VALUES (:1, :2, :3, :4) RETURNING id INTO :5",
+        rows
+    )
+    return [int(id_var.getvalue(i)[0]) for i in range(len(rows))]
+
+def load_model():
+    """Load the embedding model (proxy and SSL settings for the corporate network)"""
     # Configura proxy para redes corporativas
     os.environ['http_proxy'] = 'http://10.0.220.11:3128'
     os.environ['https_proxy'] = 'http://10.0.220.11:3128'
@@ -101,81 +199,263 @@ def generate_chunks():
     # Contorna verificação SSL para redes corporativas
     ssl._create_default_https_context = ssl._create_unverified_context
     
-    model = SentenceTransformer(MODEL_NAME)
-    logger.info("Modelo carregado com sucesso.")
+    return SentenceTransformer(MODEL_NAME)
+
+# Model loaded once in each encoder process
+_encoder_model = None
+
+def _init_encoder(num_threads):
+    """Encoder process initializer: load the model and split the cores between workers"""
+    global _encoder_model
+    import torch
+    torch.set_num_threads(num_threads)
+    logger.info(f"Carregando modelo {MODEL_NAME} no processo {os.getpid()}...")
+    _encoder_model = load_model()
+    logger.info(f"Modelo carregado no processo {os.getpid()}.")
+
+def _encode_batch(texts):
+    """Encode a batch of texts in an encoder process
+    
+    Returns:
+        tuple[np.ndarray, float]: Embeddings and encoding time in seconds
+    """
+    start = time.perf_counter()
+    embeddings = _encoder_model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+    return embeddings, time.perf_counter() - start
+
+class AdaptiveBatchSize:
+    """Batch size that tracks EMBEDDING_TARGET_BATCH_SECONDS of encoding per batch"""
+    
+    def __init__(self, initial=BATCH_SIZE):
+        self.value = initial
+    
+    def update(self, batch_len, encode_seconds):
+        """Move the batch size halfway towards the size that would hit the target time"""
+        if batch_len == 0 or encode_seconds <= 0:
+            return
+        ideal = EMBEDDING_TARGET_BATCH_SECONDS * batch_len / encode_seconds
+        self.value = int(min(max((self.value + ideal) / 2, MIN_BATCH_SIZE), MAX_BATCH_SIZE))
+
+def adaptive_batches(items, batch_size):
+    """Group any iterable into lists of the current adaptive batch size, consuming it lazily"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size.value:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def embed_and_insert_chunks(connection, cursor, chunks, stale_document_ids=None):
+    """Embed chunks and insert them through a reader -> encoders -> writer pipeline
+    
+    The calling thread reads chunks and submits batches to EMBEDDING_WORKERS
+    encoder processes; a writer thread inserts the encoded batches in order
+    (one commit per batch). A bounded queue between them applies backpressure,
+    so reading, encoding and database writes overlap without unbounded memory.
+    
+    Args:
+        chunks: Iterable of chunk dicts, consumed lazily
+        stale_document_ids (dict | set, optional): Documents whose previous chunks must be
+            deleted before their first new chunk is inserted (incremental runs)
+        
+    Returns:
+        int: Number of chunks inserted
+    """
+    workers = EMBEDDING_WORKERS or max(1, (os.cpu_count() or 1) // 4)
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    batch_size = AdaptiveBatchSize()
+    write_queue = queue.Queue(maxsize=EMBEDDING_QUEUE_SIZE)
+    errors = []
+    stats = {"chunks": 0, "batches": 0}
+    cleared_ids = set()
+    
+    def writer():
+        """Insert encoded batches in submission order"""
+        start_time = time.perf_counter()
+        while True:
+            item = write_queue.get()
+            if item is None:
+                return
+            if errors:
+                continue  # keep draining so the reader never blocks after a failure
+            batch, future = item
+            try:
+                embeddings, encode_seconds = future.result()
+                batch_size.update(len(batch), encode_seconds)
+                
+                write_start = time.perf_counter()
+                if stale_document_ids is not None:
+                    new_ids = {chunk['document_id'] for chunk in batch} - cleared_ids
+                    to_clear = [(doc_id,) for doc_id in new_ids if doc_id in stale_document_ids]
+                    if to_clear:
+                        cursor.executemany("DELETE FROM chunks WHERE document_id = :1", to_clear)
+                    cleared_ids.update(new_ids)
+                
+                # Insert chunks (one executemany per batch)
+                inserted_ids = insert_chunks(cursor, batch, embeddings)
+                connection.commit()
+                write_seconds = time.perf_counter() - write_start
+                
+                stats["chunks"] += len(batch)
+                stats["batches"] += 1
+                throughput = stats["chunks"] / (time.perf_counter() - start_time)
+                logger.info(f"Lote {stats['batches']} inserido: {len(batch)} chunks (ids {inserted_ids[0]}-{inserted_ids[-1]}), "
+                            f"embeddings {encode_seconds:.2f}s, escrita {write_seconds:.2f}s - "
+                            f"{stats['chunks']} chunks, {throughput:.1f} chunks/s, próximo lote: {batch_size.value}")
+            except Exception as e:
+                errors.append(e)
     
+    logger.info(f"Iniciando pipeline de embeddings com {workers} processo(s) de {threads_per_worker} thread(s).")
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_encoder,
+        initargs=(threads_per_worker,)
+    )
+    writer_thread = threading.Thread(target=writer, name="chunk-writer")
+    writer_thread.start()
+    
+    try:
+        for batch in adaptive_batches(chunks, batch_size):
+            if errors:
+                break
+            # Prepare texts for embedding with E5 prefix
+            texts_to_embed = ["passage: " + chunk['chunk_text'] for chunk in batch]
+            write_queue.put((batch, executor.submit(_encode_batch, texts_to_embed)))
+    finally:
+        write_queue.put(None)
+        writer_thread.join()
+        executor.shutdown(cancel_futures=True)
+    
+    if errors:
+        raise errors[0]
+    
+    # Changed documents that no longer produce any chunk (e.g. emptied text)
+    if stale_document_ids is not None:
+        leftover = [(doc_id,) for doc_id in stale_document_ids if doc_id not in cleared_ids]
+        if leftover:
+            cursor.executemany("DELETE FROM chunks WHERE document_id = :1", leftover)
+            connection.commit()
+    
+    return stats["chunks"]
+
+def rebuild_local_indexes():
+    """Rebuild the on-disk local vector indexes that are in use
+
+    Only indexes already present on disk are rebuilt, so deployments that do
+    not use a local backend pay nothing. The search server keeps serving the
+    previous index until the new one is swapped in.
+    """
+    from search_algorithms import ann_search, bruteforce_search
+
+    if os.path.exists(ann_search.ANN_INDEX_PATH):
+        logger.info("Rebuilding local ANN index...")
+        if not ann_search.build_index():
+            logger.error("Local ANN index rebuild failed; the previous index stays in use")
+    if os.path.exists(bruteforce_search.BRUTEFORCE_EXPORT_PATH):
+        logger.info("Re-exporting chunks for brute-force search...")
+        if not bruteforce_search.export_chunks():
+            logger.error("Brute-force export failed; the previous export stays in use")
+
+def generate_chunks(incremental=False):
+    """Generate chunks from documents and store them with vectors
+    
+    Documents are streamed from Oracle in fixed-size batches and flow through
+    chunking, embedding and insertion without being materialized, so memory
+    stays flat regardless of collection size.
+    
+    Args:
+        incremental (bool): Only re-chunk and re-embed new or changed documents
+            (by content hash) and drop chunks of removed documents, instead of
+            rebuilding every chunk
+    """
+    changed = False
+    document_hashes = {}
     try:
         logger.info("Conectando ao banco de dados Oracle...")
-        with oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=DB_DSN) as connection:
+        with get_connection() as connection:
             logger.info("Conexão com o banco de dados Oracle bem-sucedida.")
             with connection.cursor() as cursor:
-                # Create chunks table if needed
+                # Create chunks and hashes tables if needed
                 create_chunks_table(cursor)
+                create_hashes_table(cursor)
                 
-                # Clear existing chunks
-                cursor.execute("DELETE FROM chunks")
-                connection.commit()
-                logger.info("Chunks existentes removidos.")
+                stored_hashes = {}
+                if incremental:
+                    cursor.execute("SELECT document_id, content_hash FROM chunk_document_hashes")
+                    stored_hashes = dict(cursor.fetchall())
+                else:
+                    # Clear existing chunks
+                    changed = True
+                    cursor.execute("DELETE FROM chunks")
+                    cursor.execute("DELETE FROM chunk_document_hashes")
+                    connection.commit()
+                    logger.info("Chunks existentes removidos.")
                 
-                # Fetch documents
-                logger.info("Buscando documentos...")
-                cursor.execute("SELECT id, text FROM documents")
-                documents = cursor.fetchall()
-                logger.info(f"Encontrados {len(documents)} documentos.")
+                current_ids = set()
+                counts = {"added": 0, "updated": 0}
                 
-                all_chunks = []
-                for doc_id, text_clob in documents:
-                    # Read CLOB content
-                    text = text_clob.read() if hasattr(text_clob, 'read') else str(text_clob)
-                    
-                    # Generate chunks
-                    chunks = split_text_into_chunks(text, CHUNK_SIZE, OVERLAP_SIZE)
-                    
-                    for chunk_index, chunk_text in enumerate(chunks):
-                        all_chunks.append({
-                            'document_id': doc_id,
-                            'chunk_text': chunk_text,
-                            'chunk_index': chunk_index
-                        })
+                def document_chunks():
+                    """Stream documents and yield the chunks of new or changed ones"""
+                    for rows in stream_query("SELECT id, text FROM documents"):
+                        batch_chunks = []
+                        for doc_id, text in rows:
+                            text = text or ""
+                            current_ids.add(doc_id)
+                            
+                            # Skip documents whose content didn't change since the last run
+                            doc_hash = get_document_hash(text)
+                            if doc_id in stored_hashes:
+                                if stored_hashes[doc_id] == doc_hash:
+                                    continue
+                                counts["updated"] += 1
+                            else:
+                                counts["added"] += 1
+                            document_hashes[doc_id] = doc_hash
+                            
+                            # Generate chunks
+                            for chunk_index, chunk_text in enumerate(split_text_into_chunks(text, CHUNK_SIZE, OVERLAP_SIZE)):
+                                batch_chunks.append({
+                                    'document_id': doc_id,
+                                    'chunk_text': chunk_text,
+                                    'chunk_index': chunk_index
+                                })
+                        
+                        yield from batch_chunks
                 
-                logger.info(f"Gerados {len(all_chunks)} chunks de {len(documents)} documentos.")
+                logger.info("Processando documentos em streaming...")
+                # Old chunks of changed documents (and of new documents, in case chunks were
+                # generated before hashes were tracked) are dropped by the writer right
+                # before their new chunks are inserted; document_hashes fills up as the
+                # reader advances, ahead of the writer
+                stale_ids = document_hashes if incremental else None
+                total_chunks = embed_and_insert_chunks(connection, cursor, document_chunks(), stale_ids)
+                added, updated = counts["added"], counts["updated"]
+                logger.info(f"Gerados {total_chunks} chunks de {added + updated} documentos ({len(current_ids)} documentos lidos).")
                 
-                # Process chunks in batches
-                total_chunks = len(all_chunks)
-                num_batches = (total_chunks + BATCH_SIZE - 1) // BATCH_SIZE
+                removed = 0
+                if incremental:
+                    removed_ids = [(doc_id,) for doc_id in stored_hashes if doc_id not in current_ids]
+                    removed = len(removed_ids)
+                    if removed_ids:
+                        cursor.executemany("DELETE FROM chunks WHERE document_id = :1", removed_ids)
+                        cursor.executemany("DELETE FROM chunk_document_hashes WHERE document_id = :1", removed_ids)
+                    logger.info(f"Mudanças: +{added} ~{updated} -{removed}")
+                    
+                    if not (added or updated or removed):
+                        logger.info("Chunks já estão sincronizados com os documentos.")
+                        return
+                    changed = True
                 
-                logger.info(f"Processando {total_chunks} chunks em {num_batches} lotes de até {BATCH_SIZE} chunks cada.")
+                # Hashes are saved only after every chunk of the run is in place,
+                # so an interrupted run reprocesses those documents next time
+                save_document_hashes(cursor, document_hashes)
+                connection.commit()
                 
-                for i in range(0, total_chunks, BATCH_SIZE):
-                    batch_start_time = time.time()
-                    batch = all_chunks[i:i + BATCH_SIZE]
-                    
-                    logger.info(f"--- Processando lote {i // BATCH_SIZE + 1}/{num_batches} ---")
-                    
-                    # Prepare texts for embedding with E5 prefix
-                    texts_to_embed = ["passage: " + chunk['chunk_text'] for chunk in batch]
-                    
-                    logger.info(f"Gerando embeddings para {len(batch)} chunks...")
-                    embeddings = model.encode(texts_to_embed, convert_to_numpy=True, show_progress_bar=True)
-                    logger.info(f"Embeddings gerados. Shape: {embeddings.shape}")
-                    
-                    # Insert chunks
-                    logger.info("Inserindo chunks no banco de dados...")
-                    for chunk, vector in zip(batch, embeddings):
-                        # Format vector as string for Oracle VECTOR constructor
-                        vector_str = '[' + ','.join(map(str, vector.astype(np.float32))) + ']'
-                        
-                        # Insert chunk
-                        sql = "INSERT INTO chunks (document_id, chunk_index, vector) VALUES (:1, :2, VECTOR(:3))"
-                        cursor.execute(sql, (chunk['document_id'], chunk['chunk_index'], vector_str))
-                        
-                        # Update CLOB separately
-                        cursor.execute("UPDATE chunks SET chunk_text = :1 WHERE id = (SELECT MAX(id) FROM chunks)", (chunk['chunk_text'],))
-                    
-                    connection.commit()
-                    
-                    batch_end_time = time.time()
-                    logger.info(f"Lote {i // BATCH_SIZE + 1} inserido com sucesso em {batch_end_time - batch_start_time:.2f} segundos.")
+                # IVF centroids are trained on the existing rows, so build after inserting
+                create_vector_index(cursor)
                 
                 # Show sample record
                 logger.info("--- Amostra de chunk inserido ---")
@@ -189,7 +469,10 @@ def generate_chunks():
                 else:
                     logger.info("Nenhum chunk encontrado.")
                 
-                logger.info(f"Processamento concluído. Total de chunks inseridos: {total_chunks}")
+                if incremental:
+                    logger.info(f"Processamento concluído. +{added} ~{updated} -{removed} documentos, {total_chunks} chunks inseridos")
+                else:
+                    logger.info(f"Processamento concluído. Total de chunks inseridos: {total_chunks}")
                 
     except oracledb.Error as e:
         error, = e.args
@@ -197,10 +480,23 @@ def generate_chunks():
         logger.error("Verifique se o container Docker está em execução e se as credenciais estão corretas.")
     except Exception as e:
         logger.error(f"Ocorreu um erro inesperado: {e}")
+    finally:
+        # Chunks foram apagados/reescritos: resultados em cache não valem mais
+        if changed or document_hashes:
+            invalidate_result_caches()
+            rebuild_local_indexes()
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate chunks and vectors from documents")
+    parser.add_argument("--incremental", action="store_true",
+                        help="only process new/changed documents and remove chunks of deleted ones")
+    args = parser.parse_args()
+    
     logger.info(f"Iniciando geração de chunks com tamanho: {CHUNK_SIZE} e overlap: {OVERLAP_SIZE}")
-    generate_chunks()
+    try:
+        generate_chunks(incremental=args.incremental)
+    finally:
+        close_pool()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
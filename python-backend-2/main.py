@@ -8,6 +8,7 @@ debug_hyde()"""
 from fastapi import FastAPI
 from api import routers
 from config import configure_app
+from async_web_scraper import close_client
 
 
 # Cria a instância principal da aplicação FastAPI
@@ -22,6 +23,9 @@ configure_app(app)
 # Inclui as rotas da API
 app.include_router(routers.router)
 
+# Fecha o cliente HTTP compartilhado do web scraping no encerramento
+app.add_event_handler("shutdown", close_client)
+
 # Executa o servidor se o arquivo for chamado diretamente
 if __name__ == "__main__":
     import uvicorn
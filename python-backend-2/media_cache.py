@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+"""
+Cache em disco dos metadados de mídia processada (PDF, áudio, imagem, vídeo e URL)
+
+Pesquisadores reenviam os mesmos arquivos e URLs; cada reenvio refazia a
+extração e a análise no Gemini. Aqui o JSON resultante (no formato de
+FileMetadata) é guardado em disco, endereçado pelo conteúdo:
+
+- arquivos: SHA-256 dos bytes enviados (calculado ao gravar o upload em disco);
+- URLs: URL normalizada mais o ETag da resposta (ou o SHA-256 do conteúdo
+  baixado, se o servidor não enviar ETag); vídeos do YouTube só pela URL.
+
+Cada entrada é um arquivo JSON; o número de entradas é limitado por
+MEDIA_CACHE_MAX_ENTRIES com remoção da menos usada (LRU, pela data de
+modificação, atualizada a cada acerto). Respostas de erro e de fallback
+não são guardadas, para que um novo envio tente a análise de novo.
+
+O query_id não é guardado (identifica a consulta, não o conteúdo): a entrada
+guarda só o prefixo (ex.: AUTO_VIDEO_QUERY) e um acerto recebe um query_id
+novo, no mesmo formato gerado pelos processadores.
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from dotenv import load_dotenv
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+MEDIA_CACHE_ENABLED = os.getenv("MEDIA_CACHE_ENABLED", "true").lower() == "true"
+MEDIA_CACHE_PATH = os.getenv("MEDIA_CACHE_PATH", "cache/media")                  # Diretório das entradas
+MEDIA_CACHE_MAX_ENTRIES = int(os.getenv("MEDIA_CACHE_MAX_ENTRIES", "2048"))      # Entradas antes da remoção LRU
+
+# Versão do formato da chave: mudar invalida todo o cache (ex.: troca de prompt ou modelo)
+_KEY_VERSION = "v1"
+
+# Campos de FileMetadata exigidos para guardar um resultado
+_CAMPOS = ("query_id", "resumo", "input_busca", "assunto_principal", "termos_chave")
+
+# Assuntos devolvidos pelos processadores quando a análise no Gemini falha
+_ASSUNTOS_FALLBACK = {"Arquivo de áudio", "Arquivo de imagem", "Arquivo de vídeo", "Vídeo do YouTube"}
+
+
+def file_key(media_type, content_sha256):
+    """Chave de um arquivo enviado, a partir do SHA-256 do conteúdo
+
+    Args:
+        media_type (str): Tipo de mídia ("pdf", "audio", "image" ou "video")
+        content_sha256 (str): SHA-256 (hexadecimal) dos bytes do arquivo
+
+    Returns:
+        str: Chave hexadecimal
+    """
+    key = f"{_KEY_VERSION}:{media_type}:{content_sha256}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def normalize_url(url):
+    """Normaliza a URL: esquema e host em minúsculas, sem fragmento e com a query ordenada"""
+    parts = urlsplit(url.strip())
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", query, ""))
+
+
+def url_key(url, version=""):
+    """Chave de uma URL: URL normalizada mais a versão do conteúdo
+
+    Args:
+        url (str): URL processada
+        version (str): ETag da resposta ou hash do conteúdo baixado ("" para o YouTube)
+
+    Returns:
+        str: Chave hexadecimal
+    """
+    key = f"{_KEY_VERSION}:url:{normalize_url(url)}:{version}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def scraped_key(scraped_data):
+    """Chave de uma página baixada: URL mais ETag ou, na falta dele, hash do conteúdo
+
+    Args:
+        scraped_data (dict): Resultado de scrape_webpage_async
+
+    Returns:
+        str: Chave hexadecimal
+    """
+    version = scraped_data.get("etag") or hashlib.sha256(
+        f"{scraped_data.get('title', '')}\n{scraped_data.get('content', '')}".encode("utf-8")
+    ).hexdigest()
+    return url_key(scraped_data.get("url", ""), version)
+
+
+def _query_id_prefix(query_id):
+    """Prefixo do query_id gerado pelos processadores (<PREFIXO>-<AAAAMMDD>)"""
+    return str(query_id).rsplit("-", 1)[0]
+
+
+def _cacheavel(result):
+    """Só guarda metadados completos e que não sejam erro ou fallback"""
+    return (
+        isinstance(result, dict)
+        and all(campo in result for campo in _CAMPOS)
+        and not str(result["query_id"]).startswith("ERROR")
+        and bool(result["resumo"])
+        and bool(result["termos_chave"])
+        and result["assunto_principal"] not in _ASSUNTOS_FALLBACK
+    )
+
+
+class MediaCache:
+    """Cache LRU de metadados de mídia persistido em disco (um arquivo JSON por entrada)"""
+
+    def __init__(self, path, max_entries):
+        """
+        Args:
+            path (str): Diretório das entradas
+            max_entries (int): Número máximo de entradas
+        """
+        self.path = path
+        self.max_entries = max(max_entries, 1)
+        self._lock = threading.Lock()
+        self._entries = None  # chave -> None, da menos para a mais usada (carregado no primeiro uso)
+        self.hits = 0
+        self.misses = 0
+
+    def _file(self, key):
+        return os.path.join(self.path, f"{key}.json")
+
+    def _load_index(self):
+        """Monta o índice LRU a partir das datas de modificação dos arquivos"""
+        if self._entries is not None:
+            return
+        os.makedirs(self.path, exist_ok=True)
+        files = []
+        for name in os.listdir(self.path):
+            if name.endswith(".json"):
+                try:
+                    files.append((os.path.getmtime(os.path.join(self.path, name)), name[:-5]))
+                except OSError:
+                    pass
+        self._entries = OrderedDict((key, None) for _, key in sorted(files))
+
+    def get(self, key):
+        """Retorna os metadados guardados para a chave (com um query_id novo), ou None"""
+        with self._lock:
+            self._load_index()
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            try:
+                with open(self._file(key), encoding="utf-8") as f:
+                    result = json.load(f)
+                os.utime(self._file(key))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Cache de mídia: entrada ilegível {key}: {e}")
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        # Novo query_id a cada acerto (entradas antigas ainda trazem o query_id original)
+        prefix = result.pop("query_id_prefix", None) or _query_id_prefix(result.pop("query_id", "AUTO_QUERY"))
+        return {"query_id": f"{prefix}-{datetime.now().strftime('%Y%m%d')}", **result}
+
+    def put(self, key, result):
+        """Guarda os metadados (se válidos) e remove as entradas menos usadas além do limite"""
+        if not _cacheavel(result):
+            return
+        entry = {campo: valor for campo, valor in result.items() if campo != "query_id"}
+        entry["query_id_prefix"] = _query_id_prefix(result["query_id"])
+        with self._lock:
+            self._load_index()
+            tmp = self._file(key) + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(entry, f, ensure_ascii=False)
+                os.replace(tmp, self._file(key))
+            except OSError as e:
+                logger.warning(f"Cache de mídia: erro ao gravar {key}: {e}")
+                return
+            self._entries[key] = None
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                old_key, _ = self._entries.popitem(last=False)
+                try:
+                    os.remove(self._file(old_key))
+                except OSError:
+                    pass
+
+    def stats(self):
+        """Retorna estatísticas de uso do cache
+
+        Returns:
+            dict: Acertos, falhas e número de entradas
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entries) if self._entries is not None else None,
+            }
+
+
+# Instância compartilhada (None se desabilitado por MEDIA_CACHE_ENABLED)
+media_cache = MediaCache(MEDIA_CACHE_PATH, MEDIA_CACHE_MAX_ENTRIES) if MEDIA_CACHE_ENABLED else None
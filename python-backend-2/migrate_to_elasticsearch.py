@@ -1,15 +1,24 @@
 # -*- coding: utf-8 -*-
 """
 Migrate documents_folded from Oracle to Elasticsearch
+
+Blue/green rebuild: documents are loaded into a new timestamped index
+(documents_folded_<timestamp>), which is warmed up and then atomically put
+behind the documents_folded alias that the searcher reads. Searches keep
+hitting the previous index for the whole migration.
 """
 import os
+import sys
 import logging
 import oracledb
 from dotenv import load_dotenv
 from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
 import time
 import elasticsearch
+from bulk_indexing import bulk_index, bulk_load_settings
+from db_connection import stream_query, close_pool
+from result_cache import invalidate_result_caches
+from search_algorithms.elasticsearch_query import build_search_body
 print(elasticsearch.__version__)
 
 logging.basicConfig(level=logging.INFO)
@@ -18,11 +27,15 @@ logger = logging.getLogger(__name__)
 os.environ["NO_PROXY"] = "localhost,127.0.0.1"
 
 load_dotenv()
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_DSN = os.getenv("DB_DSN")
 URL_ELASTICSEARCH = os.getenv("URL_ELASTIC_SEARCH")
 
+INDEX_ALIAS = "documents_folded"                                     # Name read by elasticsearch_search
+ES_KEEP_OLD_INDICES = int(os.getenv("ES_KEEP_OLD_INDICES", "1"))     # Previous indices kept for rollback
+ES_WARMUP_QUERIES = int(os.getenv("ES_WARMUP_QUERIES", "5"))         # Queries run before the swap
+
+# Fetch CLOBs as str so documents can be streamed in batches
+oracledb.defaults.fetch_lobs = False
+
 def wait_for_elasticsearch():
     """Wait for Elasticsearch to be ready"""
     es = Elasticsearch(URL_ELASTICSEARCH)
@@ -38,8 +51,8 @@ def wait_for_elasticsearch():
             time.sleep(2)
     return False
 
-def create_elasticsearch_index():
-    """Create Elasticsearch index with proper mapping"""
+def create_elasticsearch_index(index_name):
+    """Create a new Elasticsearch index with proper mapping"""
     es = Elasticsearch(URL_ELASTICSEARCH)
 
     
@@ -64,81 +77,133 @@ def create_elasticsearch_index():
 }
     
     try:
-        if es.indices.exists(index="documents_folded"):
-            es.indices.delete(index="documents_folded")
-            logger.info("Deleted existing index")
-    except Exception as e:
-        logger.info(f"Index doesn't exist or error checking: {e}")
-    
-    try:
-        es.indices.create(index="documents_folded", body=mapping)
-        logger.info("Created Elasticsearch index 'documents_folded'")
+        es.indices.create(index=index_name, body=mapping)
+        logger.info(f"Created Elasticsearch index '{index_name}'")
     except Exception as e:
         logger.error(f"Error creating index: {e}")
         raise
     
     return es
 
+def warm_up_index(es, index_name, expected_count):
+    """Check the new index and run a few searches before it goes live
+    
+    Returns:
+        bool: True if the index holds every document and answers queries
+    """
+    es.indices.refresh(index=index_name)
+    count = es.count(index=index_name)["count"]
+    if count != expected_count:
+        logger.error(f"Index '{index_name}' has {count} documents, expected {expected_count}")
+        return False
+    
+    # Titles of random documents, searched with the production query bodies
+    # (main query and expansion-term phrase match) so the same caches warm up
+    sample = es.search(
+        index=index_name,
+        size=ES_WARMUP_QUERIES,
+        query={"function_score": {"query": {"match_all": {}}, "random_score": {}}},
+        source=["title"]
+    )
+    for hit in sample["hits"]["hits"]:
+        title = hit["_source"].get("title") or ""
+        if title:
+            es.search(index=index_name, body=build_search_body(title, 10, is_main_query=True))
+            es.search(index=index_name, body=build_search_body(title, 10, is_main_query=False))
+    logger.info(f"Index '{index_name}' warmed up with {len(sample['hits']['hits'])} queries")
+    return True
+
+def swap_alias(es, index_name):
+    """Atomically point the alias at the new index
+    
+    A legacy concrete index named like the alias is removed in the same
+    atomic operation.
+    """
+    actions = []
+    if es.indices.exists_alias(name=INDEX_ALIAS):
+        for old_index in es.indices.get_alias(name=INDEX_ALIAS):
+            actions.append({"remove": {"index": old_index, "alias": INDEX_ALIAS}})
+    elif es.indices.exists(index=INDEX_ALIAS):
+        actions.append({"remove_index": {"index": INDEX_ALIAS}})
+    actions.append({"add": {"index": index_name, "alias": INDEX_ALIAS}})
+    
+    es.indices.update_aliases(actions=actions)
+    logger.info(f"Alias '{INDEX_ALIAS}' now points to '{index_name}'")
+
+def delete_old_indices(es, current_index, keep=ES_KEEP_OLD_INDICES):
+    """Delete previous timestamped indices, keeping the newest `keep` for rollback"""
+    old_indices = sorted(
+        (name for name in es.indices.get(index=f"{INDEX_ALIAS}_*") if name != current_index),
+        reverse=True
+    )
+    for name in old_indices[keep:]:
+        es.indices.delete(index=name)
+        logger.info(f"Deleted old index '{name}'")
+
 def fetch_documents_from_oracle():
-    """Fetch all documents_folded from Oracle database"""
+    """Stream documents from Oracle in fixed-size batches
+    
+    Yields:
+        list[dict]: Batch of documents with text, url and title
+    """
     try:
-        with oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=DB_DSN) as conn:
-            with conn.cursor() as cursor:
-                cursor.execute("SELECT text, url, title FROM documents")
-                documents = []
-                
-                for text, url, title in cursor.fetchall():
-                    text_content = text.read() if hasattr(text, "read") else str(text)
-                    documents.append({
-                        "text": text_content,
-                        "url": url,
-                        "title": title
-                    })
-                
-                logger.info(f"Fetched {len(documents)} documents from Oracle")
-                return documents
-                
+        for rows in stream_query("SELECT text, url, title FROM documents"):
+            yield [{"text": text or "", "url": url, "title": title} for text, url, title in rows]
     except oracledb.Error as e:
         logger.error(f"Error fetching from Oracle: {e}")
-        return []
+        raise
 
 def migrate_documents_folded():
-    """Migrate documents_folded from Oracle to Elasticsearch"""
+    """Migrate documents_folded from Oracle into a new index and swap the alias"""
     if not wait_for_elasticsearch():
         logger.error("Elasticsearch not ready")
         return
     
-    es = create_elasticsearch_index()
-    documents_folded = fetch_documents_from_oracle()
+    index_name = f"{INDEX_ALIAS}_{time.strftime('%Y%m%d%H%M%S')}"
+    es = create_elasticsearch_index(index_name)
     
-    if not documents_folded:
-        logger.error("No documents_folded to migrate")
-        return
+    # Documents are streamed from Oracle straight into the bulk engine
+    total = 0
     
-    # Prepare documents_folded for bulk indexing
-    actions = []
-    for i, doc in enumerate(documents_folded):
-        action = {
-            "_index": "documents_folded",
-            "_id": i,
-            "_source": doc
-        }
-        actions.append(action)
+    def actions():
+        nonlocal total
+        for documents_folded in fetch_documents_from_oracle():
+            for doc in documents_folded:
+                yield {
+                    "_index": index_name,
+                    "_id": total,
+                    "_source": doc
+                }
+                total += 1
     
-    # Bulk index documents_folded
     try:
-        result = bulk(es, actions)
-        logger.info(f"Bulk indexing result: {result}")
-        logger.info(f"Successfully indexed documents_folded")
+        # Refresh and replicas are off while loading and restored afterwards
+        with bulk_load_settings(es, index_name):
+            success, errors = bulk_index(es, actions())
+        
+        if not total:
+            raise RuntimeError("No documents_folded to migrate")
+        
+        logger.info(f"Indexed {success}/{total} documents_folded ({len(errors)} errors)")
+        
+        if errors or not warm_up_index(es, index_name, total):
+            raise RuntimeError("New index is incomplete")
     except Exception as e:
-        logger.error(f"Error during bulk indexing: {e}")
-        # Try individual indexing as fallback
-        for action in actions[:5]:  # Try first 5 documents_folded
-            try:
-                es.index(index="documents_folded", id=action["_id"], body=action["_source"])
-                logger.info(f"Indexed document {action['_id']}")
-            except Exception as idx_error:
-                logger.error(f"Error indexing document {action['_id']}: {idx_error}")
+        # The alias was never touched: production keeps serving the previous index
+        logger.error(f"Migration aborted, keeping current index: {e}")
+        es.indices.delete(index=index_name, ignore_unavailable=True)
+        return False
+    
+    swap_alias(es, index_name)
+    delete_old_indices(es, index_name)
+    
+    # Index was rebuilt: cached search results are stale
+    invalidate_result_caches()
+    return True
 
 if __name__ == "__main__":
-    migrate_documents_folded()
\ No newline at end of file
+    try:
+        ok = migrate_documents_folded()
+    finally:
+        close_pool()
+    sys.exit(0 if ok else 1)
\ No newline at end of file
@@ -1,7 +1,6 @@
 # Processador de arquivos de áudio
 # Analisa áudio com Gemini e gera JSON estruturado para busca
 import json
-import tempfile
 import os
 import time
 from datetime import datetime
@@ -22,11 +21,11 @@ def show_progress(current, total, step):
     bar = '█' * (percentage // 5) + '░' * (20 - percentage // 5)
     print(f"\r[{bar}] {percentage}% - {step}", end='', flush=True)
 
-def analyze_audio_with_gemini(audio_file):
+def analyze_audio_with_gemini(audio_path):
     """Analisa áudio com Gemini e extrai informações estruturadas
     
     Args:
-        audio_file (bytes): Conteúdo do arquivo de áudio
+        audio_path (str): Caminho do arquivo de áudio
         
     Returns:
         dict: JSON com assunto_principal, termos_chave e resumo
@@ -41,13 +40,8 @@ def analyze_audio_with_gemini(audio_file):
         
         show_progress(2, 3, 'Enviando áudio para análise...')
         
-        # Cria arquivo temporário para upload
-        with tempfile.NamedTemporaryFile(suffix=".m4a", delete=False) as temp_file:
-            temp_file.write(audio_file)
-            temp_path = temp_file.name
-        
-        # Faz upload do áudio para Gemini File API
-        with open(temp_path, 'rb') as f:
+        # Faz upload do áudio para Gemini File API direto do arquivo enviado
+        with open(audio_path, 'rb') as f:
             audio_upload = client.files.upload(file=f, config={'mime_type': 'audio/m4a'})
         
         # Prompt para extração estruturada de informações
@@ -71,9 +65,8 @@ def analyze_audio_with_gemini(audio_file):
             contents=[prompt, audio_upload]
         )
         
-        # Limpa recursos temporários
+        # Limpa o arquivo remoto
         client.files.delete(name=audio_upload.name)
-        os.unlink(temp_path)
         
         # Extrai e limpa JSON da resposta
         json_text = response.text.strip() if hasattr(response, 'text') else str(response)
@@ -86,12 +79,6 @@ def analyze_audio_with_gemini(audio_file):
     
     except Exception as e:
         print(f"❌ Erro na análise com Gemini: {e}")
-        # Limpa arquivo temporário em caso de erro
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
         
         # Retorna fallback em caso de erro
         return {
@@ -136,22 +123,22 @@ def create_search_json(metadata):
     
     return search_json
 
-def processAudioBackend(audio_file):
+def processAudioBackend(audio_path):
     """Processa arquivo de áudio e retorna JSON estruturado para busca
     
     Args:
-        audio_file (bytes): Conteúdo do arquivo de áudio
+        audio_path (str): Caminho do arquivo de áudio
         
     Returns:
         dict: JSON estruturado com query_id, resumo, input_busca, assunto_principal e termos_chave
     """
     print("\n🔄 Iniciando processamento do áudio no backend...")
-    print(f"📊 Tamanho do arquivo: {len(audio_file) if audio_file else 'None'} bytes")
+    print(f"📊 Tamanho do arquivo: {os.path.getsize(audio_path)} bytes")
     
     try:
         # Etapa 1: Analisar áudio com Gemini
         print("🤖 Analisando áudio com Gemini...")
-        metadata = analyze_audio_with_gemini(audio_file)
+        metadata = analyze_audio_with_gemini(audio_path)
         print(f"📋 Metadata gerada: {metadata}")
         
         # Etapa 2: Criar JSON estruturado para busca
@@ -1,14 +1,12 @@
-import tempfile
 import os
 from google import genai
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def transcribe_audio_with_gemini_stream(audio_file):
-    """Transcreve áudio usando Gemini API com streaming"""
+def transcribe_audio_with_gemini_stream(audio_path):
+    """Transcreve áudio (caminho em disco) usando Gemini API com streaming"""
     print("[TRANSCRIBE] Iniciando transcrição de áudio...")
-    temp_path = None
     audio_upload = None
     client = None
     
@@ -17,13 +15,9 @@ def transcribe_audio_with_gemini_stream(audio_file):
         print("[TRANSCRIBE] Cliente Gemini configurado")
         yield "Configurando cliente..."
         
-        with tempfile.NamedTemporaryFile(suffix=".m4a", delete=False) as temp_file:
-            temp_file.write(audio_file)
-            temp_path = temp_file.name
-        print(f"[TRANSCRIBE] Arquivo temporário criado: {temp_path}")
         yield "Arquivo preparado..."
         
-        with open(temp_path, 'rb') as f:
+        with open(audio_path, 'rb') as f:
             audio_upload = client.files.upload(file=f, config={'mime_type': 'audio/m4a'})
         print(f"[TRANSCRIBE] Upload concluído: {audio_upload.name}")
         yield "Upload concluído..."
@@ -61,9 +55,3 @@ def transcribe_audio_with_gemini_stream(audio_file):
                 print("[TRANSCRIBE] Arquivo remoto deletado")
             except:
                 pass
-        if temp_path and os.path.exists(temp_path):
-            try:
-                os.unlink(temp_path)
-                print("[TRANSCRIBE] Arquivo local deletado")
-            except PermissionError:
-                pass
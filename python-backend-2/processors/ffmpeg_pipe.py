@@ -0,0 +1,97 @@
+import io
+import os
+import re
+import subprocess
+import tempfile
+from contextlib import contextmanager
+from dotenv import load_dotenv
+import imageio_ffmpeg
+
+load_dotenv()
+
+# Saída do ffmpeg mantida em memória até este tamanho; acima disso vai para um arquivo temporário
+FFMPEG_BUFFER_MAX_MB = int(os.getenv("FFMPEG_BUFFER_MAX_MB", "64"))
+
+# Bloco lido do stdout do ffmpeg por vez
+READ_SIZE = 1024 * 1024
+
+
+def probe_audio_codec(input_path):
+    """Retorna o codec da primeira faixa de áudio (ex.: 'aac', 'mp3', 'ac3'), ou None se não houver"""
+    result = subprocess.run(
+        [imageio_ffmpeg.get_ffmpeg_exe(), '-hide_banner', '-nostdin', '-i', input_path],
+        capture_output=True
+    )
+    match = re.search(rb"Stream #\S+.*?: Audio: (\w+)", result.stderr)
+    return match.group(1).decode() if match else None
+
+
+@contextmanager
+def ffmpeg_output(input_path, output_args, start=None, duration=None, suffix=""):
+    """Executa o ffmpeg sobre um arquivo em disco e entrega a saída lida do pipe
+
+    A saída é escrita no stdout (pipe:1) e acumulada em memória; se passar de
+    FFMPEG_BUFFER_MAX_MB (ex.: a faixa de áudio de um vídeo longo), continua
+    em um arquivo temporário, removido ao sair do bloco with. Em ambos os casos
+    o stream tem seek, como exige client.files.upload. O -ss vem antes do -i:
+    o ffmpeg pula direto para o keyframe mais próximo em vez de decodificar o
+    vídeo desde o início.
+
+    Args:
+        input_path (str): Caminho do arquivo de entrada (upload gravado em disco)
+        output_args (list[str]): Codecs e formato de saída; o formato precisa
+            funcionar em pipe (ex.: '-f', 'adts' ou mp4 fragmentado)
+        start (float, optional): Início do trecho em segundos
+        duration (float, optional): Duração do trecho em segundos
+        suffix (str): Extensão do arquivo temporário, se for necessário
+
+    Yields:
+        io.BufferedIOBase: Saída do ffmpeg, posicionada no início
+
+    Raises:
+        subprocess.CalledProcessError: Se o ffmpeg falhar (stderr incluído)
+    """
+    command = [imageio_ffmpeg.get_ffmpeg_exe(), '-hide_banner', '-nostdin']
+    if start is not None:
+        command += ['-ss', str(start)]
+    command += ['-i', input_path]
+    if duration is not None:
+        command += ['-t', str(duration)]
+    command += [*output_args, 'pipe:1']
+
+    max_bytes = FFMPEG_BUFFER_MAX_MB * 1024 * 1024
+    output = io.BytesIO()
+    spill_path = None
+    try:
+        # stderr em arquivo: um pipe cheio de log travaria o ffmpeg enquanto lemos o stdout
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=stderr)
+            try:
+                for chunk in iter(lambda: process.stdout.read(READ_SIZE), b""):
+                    if spill_path is None and output.tell() + len(chunk) > max_bytes:
+                        fd, spill_path = tempfile.mkstemp(suffix=suffix)
+                        spilled = os.fdopen(fd, "w+b")
+                        spilled.write(output.getbuffer())
+                        output.close()
+                        output = spilled
+                    output.write(chunk)
+            except BaseException:
+                process.kill()
+                raise
+            finally:
+                process.stdout.close()
+                returncode = process.wait()
+
+            if returncode != 0:
+                stderr.seek(0)
+                raise subprocess.CalledProcessError(returncode, command, stderr=stderr.read())
+
+        output.seek(0)
+        yield output
+    finally:
+        output.close()
+        if spill_path:
+            try:
+                os.unlink(spill_path)
+            except OSError:
+                pass
@@ -1,5 +1,4 @@
 import json
-import tempfile
 import os
 from datetime import datetime
 from google import genai
@@ -13,8 +12,8 @@ def show_progress(current, total, step):
     bar = '█' * (percentage // 5) + '░' * (20 - percentage // 5)
     print(f"\r[{bar}] {percentage}% - {step}", end='', flush=True)
 
-def analyze_image_with_gemini(image_file):
-    """Analisa imagem diretamente com Gemini e gera JSON estruturado"""
+def analyze_image_with_gemini(image_path):
+    """Analisa imagem (caminho em disco) diretamente com Gemini e gera JSON estruturado"""
     print(f"🤖 Analisando imagem diretamente com Gemini...")
     
     show_progress(1, 3, 'Configurando Gemini...')
@@ -24,11 +23,7 @@ def analyze_image_with_gemini(image_file):
         
         show_progress(2, 3, 'Enviando imagem para análise...')
         
-        with tempfile.NamedTemporaryFile(suffix=".jpg", delete=False) as temp_file:
-            temp_file.write(image_file)
-            temp_path = temp_file.name
-        
-        with open(temp_path, 'rb') as f:
+        with open(image_path, 'rb') as f:
             image_upload = client.files.upload(file=f, config={'mime_type': 'image/jpeg'})
         
         prompt = """
@@ -55,7 +50,6 @@ def analyze_image_with_gemini(image_file):
         print("Resposta do Gemini: ", response)
         
         client.files.delete(name=image_upload.name)
-        os.unlink(temp_path)
         
         json_text = response.text.strip()
         if json_text.startswith('```json'):
@@ -67,11 +61,6 @@ def analyze_image_with_gemini(image_file):
         
     except Exception as e:
         print(f"❌ Erro na análise com Gemini: {e}")
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            try:
-                os.unlink(temp_path)
-            except:
-                pass
         
         return {
             "assunto_principal": "Arquivo de imagem",
@@ -106,15 +95,15 @@ def create_search_json(metadata):
     
     return search_json
 
-def processImageBackend(image_file):
-    """Processa arquivo de imagem e retorna JSON estruturado para busca"""
+def processImageBackend(image_path):
+    """Processa arquivo de imagem (caminho em disco) e retorna JSON estruturado para busca"""
     print("\n🔄 Iniciando processamento da imagem no backend...")
-    print(f"📊 Tamanho do arquivo: {len(image_file) if image_file else 'None'} bytes")
+    print(f"📊 Tamanho do arquivo: {os.path.getsize(image_path)} bytes")
     
     try:
         # Etapa 1: Analisar imagem diretamente com Gemini
         print("🤖 Analisando imagem com Gemini...")
-        metadata = analyze_image_with_gemini(image_file)
+        metadata = analyze_image_with_gemini(image_path)
         print(f"📋 Metadata gerada: {metadata}")
         
         # Etapa 2: Criar JSON de busca
@@ -1,7 +1,6 @@
 import json
 import PyPDF2
 from datetime import datetime
-from io import BytesIO
 import google.generativeai as genai
 import os
 from dotenv import load_dotenv
@@ -14,11 +13,11 @@ def show_progress(current, total, step):
     bar = '█' * (percentage // 5) + '░' * (20 - percentage // 5)
     print(f"\r[{bar}] {percentage}% - {step}", end='', flush=True)
 
-def extract_text_from_pdf(pdf_file):
-    """Extrai texto do arquivo PDF"""
+def extract_text_from_pdf(pdf_path):
+    """Extrai texto do arquivo PDF (lido do disco, página a página)"""
     show_progress(1, 5, 'Extraindo texto do PDF...')
     
-    pdf_reader = PyPDF2.PdfReader(BytesIO(pdf_file))
+    pdf_reader = PyPDF2.PdfReader(pdf_path)
     text = ""
     
     for page in pdf_reader.pages:
@@ -108,13 +107,13 @@ def create_search_json(metadata):
     
     return search_json
 
-def processPDFBackend(pdf_file):
-    """Processa arquivo PDF e retorna JSON estruturado para busca"""
+def processPDFBackend(pdf_path):
+    """Processa arquivo PDF (caminho em disco) e retorna JSON estruturado para busca"""
     print("\n🔄 Iniciando processamento do PDF no backend...")
     
     try:
         # Etapa 1: Extrair texto
-        text = extract_text_from_pdf(pdf_file)
+        text = extract_text_from_pdf(pdf_path)
         
         # Etapa 2: Analisar com LLM
         metadata = analyze_pdf_with_llm(text)
@@ -99,6 +99,12 @@ class URLProcessor:
         
         return structured_query
 
+def is_youtube_url(url: str) -> bool:
+    """
+    Indica se a URL é de um vídeo do YouTube (processado só pela URL, sem scraping)
+    """
+    return 'youtube.com/watch?' in url or 'youtu.be/' in url
+
 def process_url_data(scraped_json: str) -> Dict[str, Any]:
     """
     Função principal para processar dados de URL
@@ -107,7 +113,7 @@ def process_url_data(scraped_json: str) -> Dict[str, Any]:
     url = scraped_data.get('url', '')
     
     # Verifica se é URL do YouTube
-    if 'youtube.com/watch?' in url or 'youtu.be/' in url:
+    if is_youtube_url(url):
         return process_youtube_url_data(url)
     
     # Processa URLs normais
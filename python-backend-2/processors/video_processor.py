@@ -1,43 +1,30 @@
 import json
-import tempfile
 import os
 import subprocess
 import time
 from datetime import datetime
 from google import genai
 from dotenv import load_dotenv
-import imageio_ffmpeg
+from processors.ffmpeg_pipe import ffmpeg_output
 
 load_dotenv()
 
-def analyze_video_with_gemini(video_file):
-    """Analisa vídeo diretamente com Gemini e gera JSON estruturado"""
+def analyze_video_with_gemini(video_path):
+    """Analisa vídeo (caminho em disco) diretamente com Gemini e gera JSON estruturado"""
     try:
         print("[DEBUG] Configurando Gemini API...")
         client = genai.Client(api_key=os.getenv("GEMINI_API"))
 
-        print("[DEBUG] Salvando vídeo temporário...")
-        with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as temp_file:
-            temp_file.write(video_file)
-            temp_path = temp_file.name
-        print(f"[DEBUG] Vídeo salvo em: {temp_path}")
-        
-        trimmed_path = temp_path.replace('.mp4', '_trimmed.mp4')
         print(f"[DEBUG] Cortando vídeo (10s-70s) e comprimindo...")
         
-        ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
-        subprocess.run([
-            ffmpeg_exe, '-i', temp_path, '-ss', '10', '-t', '60',
+        # Corte direto do arquivo enviado para a memória: MP4 fragmentado
+        # (empty_moov) pode ser escrito em pipe, sem arquivo temporário
+        with ffmpeg_output(video_path, [
             '-vf', 'scale=480:-1', '-c:v', 'libx264', '-crf', '32', '-preset', 'fast',
-            '-y', trimmed_path
-        ], check=True, capture_output=True)
-        
-        print(f"[DEBUG] Vídeo cortado salvo em: {trimmed_path}")
-        os.unlink(temp_path)
-        
-        print("[DEBUG] Fazendo upload para Gemini...")
-        with open(trimmed_path, 'rb') as f:
-            video_upload = client.files.upload(file=f, config={'mime_type': 'video/mp4'})
+            '-movflags', 'frag_keyframe+empty_moov', '-f', 'mp4'
+        ], start=10, duration=60, suffix='_trimmed.mp4') as trimmed:
+            print(f"[DEBUG] Vídeo cortado, fazendo upload para Gemini...")
+            video_upload = client.files.upload(file=trimmed, config={'mime_type': 'video/mp4'})
         print(f"[DEBUG] Upload concluído: {video_upload.name}")
         
         print("[DEBUG] Aguardando processamento do vídeo...")
@@ -77,7 +64,6 @@ def analyze_video_with_gemini(video_file):
             client.files.delete(name=video_upload.name)
         except:
             pass
-        os.unlink(trimmed_path)
         
         json_text = response.text.strip()
         print(f"[DEBUG] Processando JSON...")
@@ -94,8 +80,6 @@ def analyze_video_with_gemini(video_file):
     except json.JSONDecodeError as e:
         print(f"[ERROR] Erro ao parsear JSON: {e}")
         print(f"[DEBUG] Texto recebido: {response.text if 'response' in locals() else 'N/A'}")
-        if 'trimmed_path' in locals() and os.path.exists(trimmed_path):
-            os.unlink(trimmed_path)
         return {
             "assunto_principal": "Arquivo de vídeo",
             "termos_chave": ["vídeo", "conteúdo", "análise"],
@@ -103,10 +87,6 @@ def analyze_video_with_gemini(video_file):
         }
     except subprocess.CalledProcessError as e:
         print(f"[ERROR] Erro ffmpeg: {e.stderr.decode()}")
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            os.unlink(temp_path)
-        if 'trimmed_path' in locals() and os.path.exists(trimmed_path):
-            os.unlink(trimmed_path)
         return {
             "assunto_principal": "Arquivo de vídeo",
             "termos_chave": ["vídeo", "conteúdo", "análise"],
@@ -114,10 +94,6 @@ def analyze_video_with_gemini(video_file):
         }
     except Exception as e:
         print(f"[ERROR] Erro durante processamento: {type(e).__name__}: {str(e)}")
-        if 'temp_path' in locals() and os.path.exists(temp_path):
-            os.unlink(temp_path)
-        if 'trimmed_path' in locals() and os.path.exists(trimmed_path):
-            os.unlink(trimmed_path)
         
         return {
             "assunto_principal": "Arquivo de vídeo",
@@ -146,10 +122,10 @@ def create_search_json(metadata):
         "termos_chave": termos
     }
 
-def processVideoBackend(video_file):
-    """Processa arquivo de vídeo e retorna JSON estruturado para busca"""
+def processVideoBackend(video_path):
+    """Processa arquivo de vídeo (caminho em disco) e retorna JSON estruturado para busca"""
     try:
-        metadata = analyze_video_with_gemini(video_file)
+        metadata = analyze_video_with_gemini(video_path)
         search_json = create_search_json(metadata)
         return search_json
         
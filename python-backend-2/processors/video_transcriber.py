@@ -1,17 +1,13 @@
-import tempfile
 import os
-import subprocess
 from google import genai
 from dotenv import load_dotenv
-import imageio_ffmpeg
+from processors.ffmpeg_pipe import ffmpeg_output, probe_audio_codec
 
 load_dotenv()
 
-def transcribe_video_with_gemini_stream(video_file):
-    """Transcreve vídeo extraindo áudio e usando Gemini API com streaming"""
+def transcribe_video_with_gemini_stream(video_path):
+    """Transcreve vídeo (caminho em disco) extraindo áudio e usando Gemini API com streaming"""
     print("[TRANSCRIBE] Iniciando transcrição de vídeo...")
-    temp_path = None
-    audio_path = None
     audio_upload = None
     client = None
     
@@ -20,25 +16,20 @@ def transcribe_video_with_gemini_stream(video_file):
         print("[TRANSCRIBE] Cliente Gemini configurado")
         yield "Configurando cliente..."
         
-        with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as temp_file:
-            temp_file.write(video_file)
-            temp_path = temp_file.name
-        print(f"[TRANSCRIBE] Vídeo temporário criado: {temp_path}")
         yield "Vídeo preparado..."
         
-        audio_path = temp_path.replace('.mp4', '.m4a')
-        ffmpeg_exe = imageio_ffmpeg.get_ffmpeg_exe()
-        subprocess.run([
-            ffmpeg_exe, '-i', temp_path, '-vn', '-c:a', 'copy', '-y', audio_path
-        ], check=True, capture_output=True)
-        print(f"[TRANSCRIBE] Áudio extraído: {audio_path}")
+        # Extrai a faixa de áudio em ADTS (pode ser escrito em pipe, ao contrário
+        # do contêiner M4A). O ADTS só aceita AAC: outros codecs (MP3, AC-3,
+        # Opus...) são recodificados; AAC é copiado sem recodificar
+        codec = probe_audio_codec(video_path)
+        if codec is None:
+            raise ValueError("Vídeo sem faixa de áudio")
+        audio_codec = ['-c:a', 'copy'] if codec == 'aac' else ['-c:a', 'aac', '-b:a', '128k']
+        print(f"[TRANSCRIBE] Codec de áudio: {codec}")
         yield "Extraindo áudio..."
         
-        os.unlink(temp_path)
-        temp_path = None
-        
-        with open(audio_path, 'rb') as f:
-            audio_upload = client.files.upload(file=f, config={'mime_type': 'audio/m4a'})
+        with ffmpeg_output(video_path, ['-vn', *audio_codec, '-f', 'adts'], suffix='.aac') as audio:
+            audio_upload = client.files.upload(file=audio, config={'mime_type': 'audio/aac'})
         print(f"[TRANSCRIBE] Upload concluído: {audio_upload.name}")
         yield "Upload concluído..."
         
@@ -72,15 +63,3 @@ def transcribe_video_with_gemini_stream(video_file):
                 print("[TRANSCRIBE] Arquivo remoto deletado")
             except:
                 pass
-        if temp_path and os.path.exists(temp_path):
-            try:
-                os.unlink(temp_path)
-                print("[TRANSCRIBE] Vídeo temporário deletado")
-            except PermissionError:
-                pass
-        if audio_path and os.path.exists(audio_path):
-            try:
-                os.unlink(audio_path)
-                print("[TRANSCRIBE] Áudio temporário deletado")
-            except PermissionError:
-                pass
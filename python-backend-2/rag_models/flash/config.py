@@ -25,4 +25,10 @@ MAX_NODES_TRADITIONAL_QUERY = 10    # Máximo de nós tradicionais totais
 
 # Limitações de tamanho para otimização
 MAX_CHARS_PER_NODE = 2500  # Caracteres máximos por nó (controle de tokens)
-MAX_QUERY_CHARS = 2000     # Caracteres máximos da consulta do usuário
\ No newline at end of file
+MAX_QUERY_CHARS = 2000     # Caracteres máximos da consulta do usuário
+
+# Cache semântico de respostas (opcional, apenas para consultas sem histórico)
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "false").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))    # Similaridade mínima entre consultas
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "256"))   # Respostas guardadas
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))               # Validade em segundos
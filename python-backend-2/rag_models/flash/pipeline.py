@@ -29,8 +29,8 @@ async def pipeline_stream(consulta, historico=None, llm=None):
     if messages.MENSAGEM_PIPELINE_INICIALIZANDO:
         yield messages.MENSAGEM_PIPELINE_INICIALIZANDO
     
-    # Busca documentos relevantes usando busca híbrida
-    nos = global_query(consulta)
+    # Busca documentos relevantes usando busca híbrida (bloqueante: fora do event loop)
+    nos = await asyncio.to_thread(global_query, consulta)
     num_documentos = len(nos)
     
     # Informa quantidade de documentos encontrados
@@ -49,7 +49,7 @@ async def pipeline_stream(consulta, historico=None, llm=None):
         try:
             resposta_parts = []
             # Faz query ao LLM com streaming
-            for chunk in llm_query(llm, consulta, historico_str, nos):
+            async for chunk in llm_query(llm, consulta, historico_str, nos):
                 yield chunk
                 if chunk.startswith("PARTIAL_RESPONSE:"):
                     resposta_parts.append(chunk[17:])  # Remove prefixo
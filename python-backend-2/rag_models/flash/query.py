@@ -1,7 +1,9 @@
 # Módulo principal de consulta - inicializa e configura todos os componentes
 # Ponto de entrada para processamento de consultas do usuário
 from .config import GEMINI_API, LLM_MODEL, GEMINI_API_PROVIDER, PROJECT_ID, LOCATION
+from .config import ANSWER_CACHE_ENABLED, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL
 from .pipeline import pipeline_stream
+from answer_cache import SemanticAnswerCache
 import vertexai
 from vertexai.generative_models import GenerativeModel
 import google.generativeai as genai
@@ -16,6 +18,9 @@ else:
     llm = genai.GenerativeModel(LLM_MODEL)
     print(f"Modelo Google AI Studio carregado: {LLM_MODEL}")
 
+# Cache semântico de respostas (habilitado por ANSWER_CACHE_ENABLED)
+answer_cache = SemanticAnswerCache("flash", ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL) if ANSWER_CACHE_ENABLED else None
+
 def handle_query_flash(consulta, historico):
     """Função principal para processar consultas do usuário
     
@@ -26,4 +31,7 @@ def handle_query_flash(consulta, historico):
     Returns:
         Generator: Stream de mensagens de progresso e resultado final
     """
-    return pipeline_stream(consulta, historico, llm)
\ No newline at end of file
+    message_stream = pipeline_stream(consulta, historico, llm)
+    if answer_cache is None:
+        return message_stream
+    return answer_cache.wrap_stream(consulta, historico, message_stream)
\ No newline at end of file
@@ -22,7 +22,7 @@ def global_query(consulta):
     return nos_sem_duplicatas
 
 
-def llm_query(llm, consulta, historico_str, nos, pdf_metadata=None):
+async def llm_query(llm, consulta, historico_str, nos, pdf_metadata=None):
     """Gera resposta usando LLM baseada nos documentos recuperados
     
     Args:
@@ -33,7 +33,7 @@ def llm_query(llm, consulta, historico_str, nos, pdf_metadata=None):
         pdf_metadata (dict, optional): Metadados do PDF se consulta baseada em PDF
         
     Yields:
-        str: Chunks da resposta em streaming com prefixo PARTIAL_RESPONSE:
+        str: Chunks da resposta em streaming (assíncrono) com prefixo PARTIAL_RESPONSE:
     """
     # Prompt padrão para consultas normais
     prompt = f'''
@@ -59,8 +59,11 @@ def llm_query(llm, consulta, historico_str, nos, pdf_metadata=None):
     print("prompt é " + prompt)
     
     
-    response = llm.generate_content(prompt, stream=True)
-    for chunk in response:
+    # Streaming assíncrono: a espera por cada trecho não bloqueia o event loop.
+    # Se a tarefa que consome este gerador for cancelada (cliente desconectou),
+    # o cancelamento interrompe a chamada em andamento e a geração é abortada.
+    response = await llm.generate_content_async(prompt, stream=True)
+    async for chunk in response:
         yield f"PARTIAL_RESPONSE:{chunk.text}"
 
     print("Acabou o stream")
@@ -19,7 +19,7 @@ async def pipeline_stream(consulta, historico=None, llm=None, file_metadata=None
     if messages.MENSAGEM_PIPELINE_INICIALIZANDO:
         yield messages.MENSAGEM_PIPELINE_INICIALIZANDO
 
-    nos = global_query(consulta, file_metadata)
+    nos = await asyncio.to_thread(global_query, consulta, file_metadata)
     num_documentos = len(nos)
     
     if messages.MENSAGEM_DOCUMENTOS_ENCONTRADOS:
@@ -34,7 +34,7 @@ async def pipeline_stream(consulta, historico=None, llm=None, file_metadata=None
         
         try:
             resposta_parts = []
-            for chunk in llm_query(llm, consulta, historico_str, nos, file_metadata):
+            async for chunk in llm_query(llm, consulta, historico_str, nos, file_metadata):
                 yield chunk
                 if chunk.startswith("PARTIAL_RESPONSE:"):
                     resposta_parts.append(chunk[17:])  # Remove "PARTIAL_RESPONSE:" prefix
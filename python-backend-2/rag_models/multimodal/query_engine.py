@@ -43,12 +43,13 @@ def global_query(consulta, file_metadata):
     return nos_sem_duplicatas
 
 
-def llm_query(llm, consulta, historico_str, nos, file_metadata=None):
+async def llm_query(llm, consulta, historico_str, nos, file_metadata=None):
+    contexto_arquivo = f"\nContexto de um arquivo anexado à consulta: {json.dumps(file_metadata.__dict__)}" if file_metadata else ""
     prompt = f'''
         Você é um assistente que recomenda páginas para ajudar na pesquisa.\n
 
         {f"Atenção às mensagens anteriores do usuário para que você entenda o contexto da conversa. Histórico de Conversa: {historico_str}." if historico_str else ""}
-        {f"\nContexto de um arquivo anexado à consulta: {json.dumps(file_metadata.__dict__)}" if file_metadata else ""}
+        {contexto_arquivo}
         \nSegue a consulta que deve ser respondida. Consulta: "{consulta}".\n
 
         Com base neste JSON:
@@ -67,8 +68,11 @@ def llm_query(llm, consulta, historico_str, nos, file_metadata=None):
     print("prompt é " + prompt)
     
     
-    response = llm.generate_content(prompt, stream=True)
-    for chunk in response:
+    # Streaming assíncrono: a espera por cada trecho não bloqueia o event loop.
+    # Se a tarefa que consome este gerador for cancelada (cliente desconectou),
+    # o cancelamento interrompe a chamada em andamento e a geração é abortada.
+    response = await llm.generate_content_async(prompt, stream=True)
+    async for chunk in response:
         yield f"PARTIAL_RESPONSE:{chunk.text}"
 
     print("Acabou o stream")
@@ -10,7 +10,10 @@ from .config import NUMBER_OF_VECTOR_QUERIES, NUMBER_OF_TRADITIONAL_QUERIES, MAX
 import json
 import os
 from dotenv import load_dotenv
-import time
+import asyncio
+
+# Tempo máximo de espera por uma chamada ao LLM (s)
+LLM_TIMEOUT_SECONDS = 300
 
 async def pipeline_stream(consulta, historico=None, query_engine=None, llm=None):
     """Pipeline principal para processamento de consultas com streaming de progresso
@@ -77,29 +80,13 @@ async def pipeline_stream(consulta, historico=None, query_engine=None, llm=None)
         # Sistema de retry para lidar com falhas temporárias da API
         for attempt in range(max_attempts):
             try:
-                # Faz a chamada para o modelo LLM com timeout de 300s
-                import threading
-                result = [None]
-                exception = [None]
-                
-                def llm_call():
-                    try:
-                        result[0] = llm.complete(prompt)
-                    except Exception as e:
-                        exception[0] = e
-                
-                thread = threading.Thread(target=llm_call)
-                thread.daemon = True
-                thread.start()
-                thread.join(timeout=300)  # 300s timeout
-                
-                if thread.is_alive():
+                # Faz a chamada assíncrona ao modelo LLM com timeout de 300s,
+                # sem ocupar uma thread nem bloquear o event loop
+                try:
+                    raw_output = await asyncio.wait_for(llm.acomplete(prompt), timeout=LLM_TIMEOUT_SECONDS)
+                except asyncio.TimeoutError:
                     print(f"DEBUG: Timeout na chamada LLM (tentativa {attempt + 1}/{max_attempts})")
                     raw_output = None
-                elif exception[0]:
-                    raise exception[0]
-                else:
-                    raw_output = result[0]
 
                 # Se recebeu uma resposta válida, sai do loop
                 if raw_output and str(raw_output):
@@ -114,7 +101,7 @@ async def pipeline_stream(consulta, historico=None, query_engine=None, llm=None)
             if attempt < max_attempts - 1:
                 sleep_time = sleep_durations[attempt]
                 print(f"DEBUG: Tentando novamente em {sleep_time} segundos... (Tentativa {attempt + 2}/{max_attempts})")
-                time.sleep(sleep_time)
+                await asyncio.sleep(sleep_time)
             else:
                 # Esta foi a última tentativa
                 print("DEBUG: Falha após todas as tentativas.") 
@@ -130,7 +117,8 @@ async def pipeline_stream(consulta, historico=None, query_engine=None, llm=None)
         if messages.MENSAGEM_CONSULTA_VETORIAL_GERADA:
             yield messages.MENSAGEM_CONSULTA_VETORIAL_GERADA
         
-        nos = query_engine.custom_global_query(raw_output, consulta)
+        # Recuperação (Oracle/Elasticsearch/embeddings) é bloqueante: roda fora do event loop
+        nos = await asyncio.to_thread(query_engine.custom_global_query, raw_output, consulta)
         num_documentos = len(nos) 
         urls_validas = [no["url"] for no in nos]
         if messages.MENSAGEM_DOCUMENTOS_ENCONTRADOS:
@@ -141,7 +129,7 @@ async def pipeline_stream(consulta, historico=None, query_engine=None, llm=None)
         # Sistema de retry para extração e validação do JSON
         for attempt in range(max_attempts):
             try:
-                resposta = query_engine.custom_query(consulta, historico_str or "", nos)
+                resposta = await query_engine.acustom_query(consulta, historico_str or "", nos)
                 if not resposta:
                     raise ValueError("Resposta vazia.")
                 print("segundo output gerado, deve ser json válido: :")
@@ -162,7 +150,7 @@ async def pipeline_stream(consulta, historico=None, query_engine=None, llm=None)
                 if attempt < max_attempts - 1:
                     sleep_time = sleep_durations[attempt]
                     print(f"Tentando novamente em {sleep_time} segundos...")
-                    time.sleep(sleep_time)
+                    await asyncio.sleep(sleep_time)
                 else:
                     # Após todas as tentativas falharem, retorna erro ao usuário
                     final_erro = {
@@ -177,7 +165,7 @@ async def pipeline_stream(consulta, historico=None, query_engine=None, llm=None)
         if messages.MENSAGEM_RESPOSTA_VALIDADA:
             yield messages.MENSAGEM_RESPOSTA_VALIDADA
 
-        resposta_textual = formatando_respostas(resposta_json_validada, consulta, llm, historico_str or "")
+        resposta_textual = await formatando_respostas(resposta_json_validada, consulta, llm, historico_str or "")
 
         final = {
             "resposta": resposta_textual,
@@ -1,10 +1,12 @@
 # Módulo principal de consulta - inicializa e configura todos os componentes
 # Ponto de entrada para processamento de consultas do usuário
 from .config import GEMINI_API, LLM_MODEL
+from .config import ANSWER_CACHE_ENABLED, ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL
 from llama_index.llms.google_genai import GoogleGenAI
 from .query_engine import create_query_engine
 from .pipeline import pipeline_stream
 from llama_index.core import Settings
+from answer_cache import SemanticAnswerCache
 
 # Inicializa o modelo de linguagem Google Gemini
 llm = GoogleGenAI(model=LLM_MODEL, api_key=GEMINI_API)
@@ -18,6 +20,9 @@ query_engine = create_query_engine(llm)
 
 print("Query engine criado com sucesso")
 
+# Cache semântico de respostas (habilitado por ANSWER_CACHE_ENABLED)
+answer_cache = SemanticAnswerCache("thinking", ANSWER_CACHE_THRESHOLD, ANSWER_CACHE_MAX_ENTRIES, ANSWER_CACHE_TTL) if ANSWER_CACHE_ENABLED else None
+
 def handle_query(consulta, historico):
     """Função principal para processar consultas do usuário
     
@@ -29,4 +34,7 @@ def handle_query(consulta, historico):
         Generator: Stream de mensagens de progresso e resultado final
     """
     print("Before pipeline_stream")
-    return pipeline_stream(consulta, historico, query_engine, llm)
\ No newline at end of file
+    message_stream = pipeline_stream(consulta, historico, query_engine, llm)
+    if answer_cache is None:
+        return message_stream
+    return answer_cache.wrap_stream(consulta, historico, message_stream)
\ No newline at end of file
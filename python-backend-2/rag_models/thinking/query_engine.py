@@ -1,10 +1,12 @@
 # Importações necessárias para o motor de consulta RAG
 from llama_index.core import PromptTemplate
 from llama_index.llms.google_genai import GoogleGenAI
-from .config import NODES_PER_VECTOR_QUERY, NODES_PER_TRADITIONAL_QUERY, MAX_CHARS_PER_NODE, MAX_QUERY_CHARS, NUMBER_OF_TRADITIONAL_QUERIES, NUMBER_OF_VECTOR_QUERIES, MAX_NODES_VECTOR_QUERY, MAX_NODES_TRADITIONAL_QUERY
+from .config import NODES_PER_VECTOR_QUERY, NODES_PER_TRADITIONAL_QUERY, MAX_CHARS_PER_NODE, MAX_QUERY_CHARS, NUMBER_OF_TRADITIONAL_QUERIES, NUMBER_OF_VECTOR_QUERIES, MAX_NODES_VECTOR_QUERY, MAX_NODES_TRADITIONAL_QUERY, MAX_RETRIEVAL_WORKERS
 from .validation import remover_urls_duplicadas
-from vector_search import search_similar_documents
+from vector_search import search_similar_documents_by_vector
+from search_algorithms.vector_search import vectorize_queries
 from text_search import search_documents_by_text
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import time
 
@@ -38,6 +40,63 @@ qa_prompt = PromptTemplate(
     "Resposta: "
 )
 
+# Pool de threads compartilhado para as sub-consultas de recuperação
+# Limitado por MAX_RETRIEVAL_WORKERS para não sobrecarregar Oracle e Elasticsearch
+_retrieval_executor = ThreadPoolExecutor(max_workers=MAX_RETRIEVAL_WORKERS, thread_name_prefix="recuperacao")
+
+def _resultado_ou_vazio(futuro, tipo):
+    """Obtém o resultado de uma sub-consulta, tratando falhas isoladamente
+    
+    Args:
+        futuro: Future retornado pelo pool de recuperação
+        tipo: Tipo da consulta ("vetorial" ou "tradicional"), usado no log
+        
+    Returns:
+        Lista de documentos da sub-consulta ou lista vazia em caso de erro
+    """
+    try:
+        return futuro.result() or []
+    except Exception as e:
+        print(f"Erro na consulta {tipo}: {str(e)}")
+        return []
+
+def _combinar_nos_vetoriais(resultados_por_consulta):
+    """Mescla os resultados vetoriais de cada consulta, na ordem das consultas
+    
+    Args:
+        resultados_por_consulta: Lista com os documentos retornados por consulta
+        
+    Returns:
+        Lista de nós sem duplicatas limitada pelo MAX_NODES_VECTOR_QUERY
+    """
+    nos = [no for resultados in resultados_por_consulta for no in resultados]
+    # Reformata os nós para estrutura padronizada
+    nos_reformatados = [{"text": no["text"], "url": no["url"], "title": no["title"]} for no in nos]
+    print("Consulta vetorial achou: " + str(len(nos_reformatados)))
+    # Remove duplicatas baseado na url
+    nos_sem_duplicatas = remover_urls_duplicadas(nos_reformatados)
+    return nos_sem_duplicatas[:MAX_NODES_VECTOR_QUERY]
+
+def _combinar_nos_tradicionais(resultados_por_consulta):
+    """Extrai os nós da busca tradicional em lote
+    
+    Args:
+        resultados_por_consulta: Lista com os documentos retornados pela tarefa
+            em lote (no máximo uma)
+        
+    Returns:
+        Lista de nós sem duplicatas limitada pelo MAX_NODES_TRADITIONAL_QUERY
+    """
+    # A ordem já vem da busca em lote (com o bônus de documentos encontrados
+    # por várias consultas); reordenar aqui não mudaria nada
+    resultados = [r for resultados in resultados_por_consulta for r in resultados]
+    print("Consulta tradicional achou: " + str(len(resultados)))
+    
+    # Extrai o texto do resultado de forma segura
+    nos = [{"text": r["text"], "url": r["url"], "title": r["title"]} for r in resultados]
+    nos_sem_duplicatas = remover_urls_duplicadas(nos)
+    return nos_sem_duplicatas[:MAX_NODES_TRADITIONAL_QUERY]
+
 # Motor de consulta RAG personalizado
 # Combina busca vetorial e tradicional para recuperar documentos relevantes
 class RAGStringQueryEngine:
@@ -48,6 +107,51 @@ class RAGStringQueryEngine:
             self.llm = llm
             self.qa_prompt = qa_prompt
     
+    def busca_concorrente(self, consultas_vetoriais: list[str], consultas_tradicionais: list[str]):
+        """Dispara todas as sub-consultas vetoriais e tradicionais ao mesmo tempo
+        
+        As consultas tradicionais seguem juntas em uma única tarefa (um só
+        _msearch no Elasticsearch). Não devem ser divididas em uma tarefa por
+        consulta: a deduplicação da busca textual multiplica o score de um
+        documento encontrado por várias consultas (1 + 0.3 x (ocorrências - 1)),
+        e esse bônus só existe quando todas passam pela mesma chamada.
+        
+        Enquanto essa tarefa executa, os embeddings de todas as consultas
+        vetoriais são gerados em uma única passada do modelo e cada busca no
+        Oracle é submetida como uma tarefa independente. A latência total passa
+        a ser a da tarefa mais lenta em vez da soma de todas.
+        
+        Args:
+            consultas_vetoriais: Lista de strings para busca vetorial
+            consultas_tradicionais: Lista de strings para busca tradicional
+            
+        Returns:
+            Tupla (resultados_vetoriais, resultados_tradicionais), cada um com uma
+            lista de resultados por tarefa, na mesma ordem das consultas
+        """
+        inicio = time.time()
+        futuros_tradicionais = [
+            _retrieval_executor.submit(search_documents_by_text, consultas_tradicionais, NODES_PER_TRADITIONAL_QUERY, False)
+        ] if consultas_tradicionais else []
+        
+        futuros_vetoriais = []
+        if consultas_vetoriais:
+            try:
+                # Um único forward do modelo para todas as consultas vetoriais
+                vetores = vectorize_queries(consultas_vetoriais)
+                futuros_vetoriais = [
+                    _retrieval_executor.submit(search_similar_documents_by_vector, vetor, NODES_PER_VECTOR_QUERY, consulta)
+                    for vetor, consulta in zip(vetores, consultas_vetoriais)
+                ]
+            except Exception as e:
+                print(f"Erro ao vetorizar consultas: {str(e)}")
+        
+        resultados_vetoriais = [_resultado_ou_vazio(futuro, "vetorial") for futuro in futuros_vetoriais]
+        resultados_tradicionais = [_resultado_ou_vazio(futuro, "tradicional") for futuro in futuros_tradicionais]
+        print(f"Recuperação concorrente de {len(futuros_vetoriais) + len(futuros_tradicionais)} consultas em {time.time() - inicio:.2f}s")
+        
+        return resultados_vetoriais, resultados_tradicionais
+    
     def custom_vector_query(self, consultas_vetoriais: list[str]):
         """Executa consultas vetoriais usando embeddings semânticos
         
@@ -57,18 +161,8 @@ class RAGStringQueryEngine:
         Returns:
             Lista de nós sem duplicatas limitada pelo MAX_NODES_VECTOR_QUERY
         """
-        nos = []  # Lista para armazenar todos os nós recuperados
-        for idx, consulta_vetorial in enumerate(consultas_vetoriais):
-            # Recupera documentos usando busca vetorial com prefixo "query:"
-            retrieved = search_similar_documents(consulta_vetorial, n_results=NODES_PER_VECTOR_QUERY)
-            nos += retrieved  # Adiciona todos os nós recuperados à lista 
-
-        # Reformata os nós para estrutura padronizada
-        nos_reformatados = [{"text": no["text"], "url": no["url"], "title": no["title"]} for no in nos]
-        print("Consulta vetorial achou: " + str(len(nos_reformatados)))
-        # Remove duplicatas baseado na url
-        nos_sem_duplicatas = remover_urls_duplicadas(nos_reformatados)
-        return nos_sem_duplicatas[:MAX_NODES_VECTOR_QUERY]
+        resultados_vetoriais, _ = self.busca_concorrente(consultas_vetoriais, [])
+        return _combinar_nos_vetoriais(resultados_vetoriais)
     
     def custom_traditional_query(self, consultas_tradicionais: list[str]):
         """Executa consultas tradicionais usando Elasticsearch
@@ -79,21 +173,16 @@ class RAGStringQueryEngine:
         Returns:
             Lista de nós limitada pelo MAX_NODES_TRADITIONAL_QUERY
         """
-        nos = []
-        # Busca documentos no Elasticsearch usando consultas tradicionais
-        resultados = search_documents_by_text(consultas_tradicionais, NODES_PER_TRADITIONAL_QUERY, expand=False)
-        print("Consulta tradicional achou: " + str(len(resultados)))
-        
-        for resultado in resultados:
-            # Extrai o texto do resultado de forma segura
-            no = {"text": resultado["text"], "url": resultado["url"], "title": resultado["title"]}
-            nos.append(no)
-            
-        return nos[:MAX_NODES_TRADITIONAL_QUERY]
+        _, resultados_tradicionais = self.busca_concorrente([], consultas_tradicionais)
+        return _combinar_nos_tradicionais(resultados_tradicionais)
         
     def custom_global_query(self, keywords_raw_output, original_query):
         """Combina consultas vetoriais e tradicionais baseado nas palavras-chave
         
+        As sub-consultas vetoriais e o lote de consultas tradicionais são
+        executados em paralelo por busca_concorrente e os resultados são
+        mesclados ao final.
+        
         Args:
             keywords_raw_output: String com palavras-chave separadas por vírgula
             
@@ -101,13 +190,13 @@ class RAGStringQueryEngine:
             Lista combinada de nós sem duplicatas
         """
         
-        nos_consulta_tradicional = []
-        nos_consulta_vetorial = []
+        consultas_tradicionais = []
+        consultas_vetoriais = []
         # Divide as palavras-chave em lista de consultas
         lista_consultas = str(keywords_raw_output).split(",")
         len_lista_consultas = len(lista_consultas)
         
-        # Executa consultas tradicionais se configurado
+        # Monta consultas tradicionais se configurado
         if (NUMBER_OF_TRADITIONAL_QUERIES > 0):
             lista_consultas_tradicionais = []
             # Distribui as consultas entre vetorial e tradicional
@@ -118,16 +207,19 @@ class RAGStringQueryEngine:
             
             # Remove espaços em branco e consultas vazias
             consultas_tradicionais = [q.strip() for q in lista_consultas_tradicionais if q.strip()]
-            nos_consulta_tradicional = self.custom_traditional_query(consultas_tradicionais)
         
-        # Executa consultas vetoriais se configurado
+        # Monta consultas vetoriais se configurado
         if (NUMBER_OF_VECTOR_QUERIES > 0):
             lista_consultas_vetoriais = [original_query]
             if (NUMBER_OF_VECTOR_QUERIES > 1):
                 lista_consultas_vetoriais = lista_consultas_vetoriais + lista_consultas[:min(len_lista_consultas, NUMBER_OF_VECTOR_QUERIES-1)]
             # Remove espaços em branco e consultas vazias
             consultas_vetoriais = [q.strip() for q in lista_consultas_vetoriais if q.strip()]
-            nos_consulta_vetorial = self.custom_vector_query(consultas_vetoriais)
+        
+        # Executa todas as sub-consultas de uma só vez
+        resultados_vetoriais, resultados_tradicionais = self.busca_concorrente(consultas_vetoriais, consultas_tradicionais)
+        nos_consulta_vetorial = _combinar_nos_vetoriais(resultados_vetoriais)
+        nos_consulta_tradicional = _combinar_nos_tradicionais(resultados_tradicionais)
         
         # Combina resultados de ambas as consultas
         nos_com_repeticao = nos_consulta_vetorial + nos_consulta_tradicional
@@ -137,8 +229,8 @@ class RAGStringQueryEngine:
         return nos
         
 
-    def custom_query(self, query_str: str, historico_str: str, nodes):
-        """Gera resposta final usando LLM com contexto dos documentos recuperados
+    def _montar_prompt(self, query_str: str, historico_str: str, nodes):
+        """Monta o prompt final com o contexto dos documentos recuperados
         
         Args:
             query_str: Consulta do usuário
@@ -146,7 +238,7 @@ class RAGStringQueryEngine:
             nodes: Lista de nós/documentos recuperados
             
         Returns:
-            Resposta gerada pelo modelo em formato string
+            Prompt formatado em string
         """
     
         clipped_nodes = []
@@ -169,8 +261,36 @@ class RAGStringQueryEngine:
         # Formata o prompt final com contexto, consulta e histórico
         final_prompt = self.qa_prompt.format(context_str=context_str, query_str=query_str[:MAX_QUERY_CHARS], historico_str=historico_instrucoes)
         print("Tamanho da consulta: " + str(len(final_prompt)) + " caracteres")
-        response = self.llm.complete(prompt=final_prompt)      
-    
+        return final_prompt
+
+    def custom_query(self, query_str: str, historico_str: str, nodes):
+        """Gera resposta final usando LLM com contexto dos documentos recuperados
+        
+        Args:
+            query_str: Consulta do usuário
+            historico_str: Histórico da conversa
+            nodes: Lista de nós/documentos recuperados
+            
+        Returns:
+            Resposta gerada pelo modelo em formato string
+        """
+        response = self.llm.complete(prompt=self._montar_prompt(query_str, historico_str, nodes))
+        return str(response)
+
+    async def acustom_query(self, query_str: str, historico_str: str, nodes):
+        """Versão assíncrona de custom_query, usada pelo pipeline
+        
+        A chamada ao LLM usa a API assíncrona e não bloqueia o event loop.
+        
+        Args:
+            query_str: Consulta do usuário
+            historico_str: Histórico da conversa
+            nodes: Lista de nós/documentos recuperados
+            
+        Returns:
+            Resposta gerada pelo modelo em formato string
+        """
+        response = await self.llm.acomplete(prompt=self._montar_prompt(query_str, historico_str, nodes))
         return str(response)
     
 def create_query_engine(llm):
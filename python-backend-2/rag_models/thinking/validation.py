@@ -4,7 +4,7 @@ import json
 import re
 from rapidfuzz import process
 import os
-import time
+import asyncio
 from dotenv import load_dotenv
 
 # Carrega variáveis de ambiente
@@ -114,9 +114,11 @@ def validando(resposta_json, urls_validas):
     
     return resposta_json
 
-def formatando_respostas(resposta_json, consulta, llm, historico_str=None):
+async def formatando_respostas(resposta_json, consulta, llm, historico_str=None):
     """Formata a resposta JSON em texto natural usando o modelo de linguagem
     
+    Usa a API assíncrona do LLM e espera entre tentativas sem bloquear o event loop.
+    
     Args:
         resposta_json (dict): JSON com páginas validadas
         consulta (str): Consulta original do usuário
@@ -154,7 +156,7 @@ Exemplo de como formatar com markdown as recomendações:
     for attempt in range(max_attempts):
         try:
             # Faz a chamada para o modelo LLM
-            output = llm.complete(prompt=prompt).text
+            output = (await llm.acomplete(prompt=prompt)).text
 
             # Se recebeu uma resposta válida, sai do loop
             if output and str(output):
@@ -169,7 +171,7 @@ Exemplo de como formatar com markdown as recomendações:
         if attempt < max_attempts - 1:
             sleep_time = sleep_durations[attempt]
             print(f"DEBUG: Tentando novamente em {sleep_time} segundos... (Tentativa {attempt + 2}/{max_attempts})")
-            time.sleep(sleep_time)
+            await asyncio.sleep(sleep_time)
         else:
            # Esta foi a última tentativa
             print("DEBUG: Falha após todas as tentativas.") 
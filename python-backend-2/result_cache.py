@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Cache de resultados de recuperação (busca textual e vetorial)
+
+Guarda os resultados de consultas idênticas por um tempo limitado (TTL) e com
+número máximo de entradas (LRU). Como a reindexação roda em outro processo
+(update_elasticsearch.py, generate_chunks.py, migrate_to_elasticsearch.py),
+a invalidação é feita por um carimbo de versão do corpus gravado em disco:
+os scripts de ingestão atualizam o carimbo e cada cache se esvazia sozinho
+assim que percebe que a versão mudou.
+"""
+import os
+import copy
+import time
+import logging
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+
+# Configuração do sistema de logging
+logger = logging.getLogger(__name__)
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))  # Entradas por cache
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "3600"))                # Validade em segundos
+CORPUS_VERSION_PATH = os.getenv("CORPUS_VERSION_PATH", "cache/corpus_version") # Carimbo compartilhado
+
+# Caminho relativo resolvido a partir deste diretório, não do diretório de trabalho:
+# a API e os scripts de ingestão precisam ler e gravar o mesmo carimbo
+CORPUS_VERSION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), CORPUS_VERSION_PATH)
+
+# Caches registrados neste processo (para invalidação local imediata)
+_registered_caches = []
+
+
+def get_corpus_version():
+    """Retorna a versão atual do corpus indexado
+
+    Returns:
+        str: Conteúdo do carimbo de versão, ou "0" se ainda não existir
+    """
+    try:
+        with open(CORPUS_VERSION_PATH, encoding="utf-8") as f:
+            return f.read().strip() or "0"
+    except OSError:
+        return "0"
+
+
+def bump_corpus_version():
+    """Gera uma nova versão do corpus, invalidando caches em todos os processos
+
+    Returns:
+        str: Nova versão gravada no carimbo
+    """
+    version = str(time.time_ns())
+    directory = os.path.dirname(CORPUS_VERSION_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = CORPUS_VERSION_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_path, CORPUS_VERSION_PATH)
+    return version
+
+
+def invalidate_result_caches():
+    """Invalida os caches de resultados após uma reindexação
+
+    Atualiza o carimbo de versão do corpus (alcançando o servidor em execução)
+    e esvazia imediatamente os caches deste processo.
+    """
+    try:
+        version = bump_corpus_version()
+        logger.info(f"Versão do corpus atualizada para {version}; caches de resultados invalidados")
+    except OSError as e:
+        logger.error(f"Erro ao atualizar versão do corpus: {e}")
+
+    for cache in _registered_caches:
+        cache.clear()
+
+
+class ResultCache:
+    """Cache LRU + TTL de resultados, atrelado à versão do corpus"""
+
+    def __init__(self, name, max_entries=RESULT_CACHE_MAX_ENTRIES, ttl_seconds=RESULT_CACHE_TTL):
+        """
+        Args:
+            name (str): Nome do cache (usado nos logs)
+            max_entries (int): Número máximo de entradas
+            ttl_seconds (float): Validade de cada entrada em segundos
+        """
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # chave -> (valor, timestamp)
+        self._version = get_corpus_version()
+
+        self.hits = 0
+        self.misses = 0
+
+        _registered_caches.append(self)
+
+    def _check_version(self):
+        """Esvazia o cache se o corpus foi reindexado desde o preenchimento"""
+        version = get_corpus_version()
+        if version != self._version:
+            logger.info(f"Cache '{self.name}': corpus reindexado, descartando {len(self._entries)} entradas")
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key):
+        """Retorna uma cópia do valor em cache, ou None
+
+        Args:
+            key: Chave hashable da consulta
+
+        Returns:
+            Cópia do valor armazenado, ou None se ausente/expirado
+        """
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, timestamp = entry
+            if time.time() - timestamp > self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return copy.deepcopy(value)
+
+    def put(self, key, value):
+        """Armazena uma cópia do valor, removendo a entrada LRU se necessário
+
+        Args:
+            key: Chave hashable da consulta
+            value: Resultado a ser armazenado
+        """
+        with self._lock:
+            self._check_version()
+            self._entries[key] = (copy.deepcopy(value), time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove todas as entradas do cache"""
+        with self._lock:
+            self._entries.clear()
+            self._version = get_corpus_version()
+
+    def stats(self):
+        """Retorna estatísticas de uso do cache
+
+        Returns:
+            dict: Acertos, falhas e número de entradas
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
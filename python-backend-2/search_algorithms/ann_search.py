@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Implementação de busca vetorial aproximada (ANN) em memória
+
+Alternativa à busca vetorial no Oracle: todos os embeddings da tabela chunks
+são carregados uma única vez em uma matriz float32 compacta e organizados em
+um índice IVF (inverted file) — os vetores são agrupados por k-means e cada
+consulta varre apenas as ANN_NPROBE listas com centroides mais próximos.
+A busca top-k e a deduplicação por URL acontecem inteiramente no processo,
+sem consultas ao banco.
+
+O índice é salvo em disco (arquivos .npy e um blob de textos) e carregado via
+memory-map, de modo que reiniciar o servidor não exige baixar novamente todos
+os vetores do Oracle. A construção acontece fora das consultas: por
+generate_chunks.py (quando os chunks mudam) ou pela linha de comando
+(python -m search_algorithms.ann_search). O servidor continua usando o índice
+carregado até que um novo seja gravado, e só constrói por conta própria, em
+segundo plano, quando não existe índice algum.
+"""
+import os
+import logging
+import numpy as np
+from search_algorithms.local_index import (LocalIndex, LocalIndexLoader, build_atomically,
+                                           export_chunks, write_meta)
+from dotenv import load_dotenv
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+ANN_INDEX_PATH = os.getenv("ANN_INDEX_PATH", "cache/ann_index")         # Diretório dos arquivos do índice
+ANN_NLIST = int(os.getenv("ANN_NLIST", "0"))                            # Listas IVF (0 = 4 * sqrt(n_chunks))
+ANN_NPROBE = int(os.getenv("ANN_NPROBE", "16"))                         # Listas varridas por consulta
+ANN_TRAIN_SAMPLE = int(os.getenv("ANN_TRAIN_SAMPLE", "50000"))          # Vetores usados no treino do k-means
+ANN_KMEANS_ITERATIONS = int(os.getenv("ANN_KMEANS_ITERATIONS", "10"))
+ANN_OVERFETCH = int(os.getenv("ANN_OVERFETCH", "4"))                    # Chunks candidatos por resultado (dedup por URL)
+ANN_RETRY_SECONDS = float(os.getenv("ANN_RETRY_SECONDS", "300"))        # Espera após falha de carga/construção
+
+# Linhas processadas por bloco na montagem do índice (limita memória)
+BLOCK_SIZE = 8192
+
+
+def _normalize(matrix):
+    """Normaliza as linhas para norma 1 (produto interno = similaridade de cosseno)"""
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _train_kmeans(sample, nlist):
+    """Treina os centroides IVF com k-means esférico
+
+    Args:
+        sample (np.ndarray): Vetores normalizados usados no treino
+        nlist (int): Número de centroides
+
+    Returns:
+        np.ndarray: Centroides normalizados (nlist x dimensão)
+    """
+    rng = np.random.default_rng(0)
+    centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+
+    for _ in range(ANN_KMEANS_ITERATIONS):
+        assignments = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, sample)
+        empty = np.bincount(assignments, minlength=nlist) == 0
+        # Centroides sem vetores são reposicionados em pontos aleatórios da amostra
+        sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+        centroids = _normalize(sums)
+
+    return centroids
+
+
+def _build(path):
+    """Exporta os chunks para path e monta o índice IVF sobre eles"""
+    exported = export_chunks(path, "raw_vectors.npy")
+    if exported is None:
+        logger.warning("Nenhum chunk encontrado; índice ANN não construído")
+        return False
+
+    n, dim = exported["count"], exported["dim"]
+    raw_vectors = np.load(os.path.join(path, "raw_vectors.npy"), mmap_mode="r")
+
+    # Treina os centroides em uma amostra dos vetores
+    nlist = ANN_NLIST or max(1, int(4 * np.sqrt(n)))
+    nlist = min(nlist, n)
+    rng = np.random.default_rng(0)
+    sample_rows = np.sort(rng.choice(n, min(n, max(ANN_TRAIN_SAMPLE, nlist)), replace=False))
+    logger.info(f"Treinando {nlist} centroides IVF com {len(sample_rows)} vetores...")
+    centroids = _train_kmeans(_normalize(np.asarray(raw_vectors[sample_rows])), nlist)
+
+    # Atribui cada vetor à lista do centroide mais próximo
+    assignments = np.empty(n, dtype=np.int32)
+    for start in range(0, n, BLOCK_SIZE):
+        block = _normalize(np.asarray(raw_vectors[start:start + BLOCK_SIZE]))
+        assignments[start:start + BLOCK_SIZE] = np.argmax(block @ centroids.T, axis=1)
+
+    # Reordena os vetores por lista, para que cada lista seja um trecho contíguo da matriz
+    order = np.argsort(assignments, kind="stable")
+    list_offsets = np.zeros(nlist + 1, dtype=np.int64)
+    list_offsets[1:] = np.cumsum(np.bincount(assignments, minlength=nlist))
+
+    vectors = np.lib.format.open_memmap(os.path.join(path, "vectors.npy"), mode="w+",
+                                        dtype=np.float32, shape=(n, dim))
+    for start in range(0, n, BLOCK_SIZE):
+        rows = order[start:start + BLOCK_SIZE]
+        vectors[start:start + len(rows)] = _normalize(np.asarray(raw_vectors[rows]))
+    vectors.flush()
+    del vectors, raw_vectors
+    os.remove(os.path.join(path, "raw_vectors.npy"))
+
+    np.save(os.path.join(path, "centroids.npy"), centroids.astype(np.float32))
+    np.save(os.path.join(path, "list_offsets.npy"), list_offsets)
+    np.save(os.path.join(path, "chunk_rows.npy"), order.astype(np.int64))
+    write_meta(path, count=n, dim=dim, nlist=nlist, urls=exported["urls"])
+    logger.info(f"Índice ANN montado: {n} chunks, {nlist} listas")
+    return True
+
+
+def build_index(path=ANN_INDEX_PATH):
+    """Carrega todos os chunks do Oracle, monta o índice IVF e salva em disco
+
+    Args:
+        path (str): Diretório onde o índice será gravado
+
+    Returns:
+        bool: True se o índice foi construído
+    """
+    if not build_atomically(path, _build, "índice ANN"):
+        return False
+    logger.info(f"Índice ANN salvo em {path}")
+    return True
+
+
+class AnnIndex(LocalIndex):
+    """Índice IVF carregado do disco via memory-map"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Diretório de uma versão gerada por build_index
+        """
+        super().__init__(path)
+        self.centroids = np.load(os.path.join(path, "centroids.npy"))
+        self.list_offsets = np.load(os.path.join(path, "list_offsets.npy"))
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.chunk_rows = np.load(os.path.join(path, "chunk_rows.npy"), mmap_mode="r")
+
+    def search(self, query_vector, n_results):
+        """Busca os documentos mais próximos, com o melhor chunk de cada URL
+
+        Args:
+            query_vector (np.ndarray): Embedding da consulta
+            n_results (int): Número de documentos a retornar
+
+        Returns:
+            list[dict]: Lista de documentos com campos 'text', 'url', 'title', 'relevance_score'
+        """
+        query_vector = _normalize(np.asarray(query_vector, dtype=np.float32))
+
+        # Seleciona as listas cujos centroides são mais próximos da consulta
+        nprobe = min(ANN_NPROBE, len(self.centroids))
+        probes = np.argpartition(-(self.centroids @ query_vector), nprobe - 1)[:nprobe]
+
+        rows = np.concatenate([np.arange(self.list_offsets[p], self.list_offsets[p + 1]) for p in probes])
+        if len(rows) == 0:
+            return []
+        scores = np.concatenate([
+            self.vectors[self.list_offsets[p]:self.list_offsets[p + 1]] @ query_vector for p in probes
+        ])
+
+        # Top k x m chunks candidatos, ordenados por similaridade
+        k = min(len(scores), n_results * max(ANN_OVERFETCH, 1))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        documents = []
+        seen_urls = set()
+        for i in top:
+            chunk_row = int(self.chunk_rows[rows[i]])
+            url, title = self.urls[int(self.url_ids[chunk_row])]
+            if url in seen_urls:
+                continue
+            seen_urls.add(url)
+
+            # Mesma conversão de distância usada na busca vetorial do Oracle
+            distance = max(1.0 - float(scores[i]), 0.0)
+            relevance_score = 1.0 / (1.0 + distance) if distance > 0 else 1.0
+
+            documents.append({
+                'text': self._chunk_text(chunk_row),
+                'url': url,
+                'title': title,
+                'relevance_score': relevance_score
+            })
+            if len(documents) >= n_results:
+                break
+
+        return documents
+
+
+# Índice carregado sob demanda e recarregado quando um novo é gravado
+_loader = LocalIndexLoader("índice ANN", ANN_INDEX_PATH, AnnIndex, build_index, ANN_RETRY_SECONDS)
+
+
+def get_index():
+    """Retorna o índice ANN, recarregando do disco quando um novo é gravado
+
+    Nunca constrói o índice no caminho da consulta: se não houver índice em
+    disco, a construção é iniciada em segundo plano e a busca retorna vazio até
+    que termine. Após uma falha, novas tentativas esperam ANN_RETRY_SECONDS.
+
+    Returns:
+        AnnIndex | None: Índice pronto para consulta, ou None se ainda não existir
+    """
+    return _loader.get()
+
+
+def search_documents_by_text(queries, n_results_per_query=5):
+    """Implementação da busca vetorial aproximada em memória
+
+    Interface compatível com outros algoritmos de busca. Gera os embeddings de
+    todas as consultas em uma única passada do modelo e consulta o índice IVF local.
+
+    Args:
+        queries (list[str]): Lista de consultas de busca
+        n_results_per_query (int): Número de resultados por consulta
+
+    Returns:
+        list[dict]: Lista de documentos com campos 'text', 'url', 'title', 'relevance_score'
+    """
+    # Validação de entrada
+    if not queries or not isinstance(queries, list):
+        return []
+
+    valid_queries = [query for query in queries if query and query.strip()]
+    if not valid_queries:
+        return []
+
+    try:
+        index = get_index()
+        if index is None:
+            return []
+
+        # Importado aqui: generate_chunks usa build_index sem carregar o modelo de consultas
+        from search_algorithms.vector_search import vectorize_queries
+        query_vectors = vectorize_queries(valid_queries)
+        all_documents = []
+        for query_vector in query_vectors:
+            all_documents.extend(index.search(query_vector, n_results_per_query))
+
+        logger.info(f"Busca ANN: {len(all_documents)} resultados para {len(valid_queries)} consultas")
+        return all_documents
+
+    except Exception as e:
+        logger.error(f"Erro inesperado na busca ANN: {e}")
+        return []
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    build_index()
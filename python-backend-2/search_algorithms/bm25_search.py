@@ -9,6 +9,7 @@ modelo probabilístico de recuperação de informação desenvolvido por Roberts
 import os
 import logging
 import oracledb
+from db_connection import get_connection
 from dotenv import load_dotenv
 from rank_bm25 import BM25Okapi
 
@@ -17,9 +18,6 @@ logger = logging.getLogger(__name__)
 
 # Carrega variáveis de ambiente do arquivo .env
 load_dotenv()
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_DSN = os.getenv("DB_DSN")
 
 # Inicializa cliente Oracle com biblioteca instant client
 oracledb.init_oracle_client(lib_dir=r"C:\oracle\instantclient_23_9")
@@ -52,7 +50,7 @@ def fetch_candidate_documents(query):
 
     try:
         # Conecta ao banco Oracle e executa consulta
-        with oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=DB_DSN) as conn:
+        with get_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(sql)
                 results = []
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Implementação de busca vetorial exata por força bruta com NumPy
+
+Para ambientes sem índice vetorial no Oracle: os vetores da tabela chunks, os
+ids de documento e o mapeamento de URLs são exportados uma única vez para
+arquivos .npy. Na consulta, a matriz é aberta via memory-map, todas as
+consultas são pontuadas em uma única multiplicação de matrizes e o melhor
+chunk de cada URL é obtido por uma redução vetorizada (np.maximum.reduceat),
+reproduzindo exatamente a semântica da SQL de search_algorithms/vector_search.py
+sem nenhuma ida ao banco. Serve como linha de base para comparação com o Oracle.
+
+A exportação e a carga usam a mesma infraestrutura do índice ANN
+(search_algorithms/local_index.py): construída fora das consultas, por
+generate_chunks.py ou por python -m search_algorithms.bruteforce_search.
+"""
+import os
+import logging
+import numpy as np
+from search_algorithms.local_index import (LocalIndex, LocalIndexLoader, build_atomically,
+                                           export_chunks as export_chunk_files, write_meta)
+from dotenv import load_dotenv
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Carrega variáveis de ambiente
+load_dotenv()
+
+BRUTEFORCE_EXPORT_PATH = os.getenv("BRUTEFORCE_EXPORT_PATH", "cache/bruteforce")      # Diretório dos arquivos exportados
+BRUTEFORCE_RETRY_SECONDS = float(os.getenv("BRUTEFORCE_RETRY_SECONDS", "300"))        # Espera após falha de carga/exportação
+
+
+def _export(path):
+    """Exporta os chunks ordenados por URL e marca o início de cada URL"""
+    exported = export_chunk_files(path, "vectors.npy", order_by_url=True, normalize=True)
+    if exported is None:
+        logger.warning("Nenhum chunk encontrado; exportação não realizada")
+        return False
+
+    # Início de cada trecho contíguo de URL na matriz
+    url_ids = np.load(os.path.join(path, "url_ids.npy"))
+    url_starts = np.flatnonzero(np.r_[True, np.diff(url_ids) != 0]).astype(np.int64)
+    np.save(os.path.join(path, "url_starts.npy"), url_starts)
+
+    write_meta(path, count=exported["count"], urls=exported["urls"])
+    logger.info(f"Chunks exportados: {exported['count']} chunks, {len(exported['urls'])} URLs")
+    return True
+
+
+def export_chunks(path=BRUTEFORCE_EXPORT_PATH):
+    """Exporta vetores, ids de documento, URLs e textos dos chunks para disco
+
+    Os chunks são gravados ordenados por URL, de modo que os chunks de cada URL
+    formam um trecho contíguo da matriz (necessário para a redução por URL).
+
+    Args:
+        path (str): Diretório onde os arquivos serão gravados
+
+    Returns:
+        bool: True se a exportação foi concluída
+    """
+    if not build_atomically(path, _export, "exportação de chunks"):
+        return False
+    logger.info(f"Chunks exportados para {path}")
+    return True
+
+
+class BruteForceIndex(LocalIndex):
+    """Matriz de embeddings exportada, aberta via memory-map"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Diretório de uma versão gerada por export_chunks
+        """
+        super().__init__(path)
+        self.vectors = np.load(os.path.join(path, "vectors.npy"), mmap_mode="r")
+        self.url_starts = np.load(os.path.join(path, "url_starts.npy"))
+
+    def search(self, query_vectors, n_results):
+        """Busca exata do melhor chunk por URL para várias consultas de uma vez
+
+        Args:
+            query_vectors (np.ndarray): Matriz (n_consultas x dimensão) de embeddings
+            n_results (int): Número de documentos por consulta
+
+        Returns:
+            list[list[dict]]: Documentos de cada consulta, com campos 'text', 'url', 'title', 'relevance_score'
+        """
+        queries = np.asarray(query_vectors, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        queries = queries / norms
+
+        # Uma única multiplicação pontua todos os chunks para todas as consultas
+        scores = self.vectors @ queries.T  # (n_chunks x n_consultas)
+
+        # Melhor score de cada URL (trechos contíguos da matriz)
+        best_per_url = np.maximum.reduceat(scores, self.url_starts, axis=0)  # (n_urls x n_consultas)
+        url_ends = np.r_[self.url_starts[1:], len(scores)]
+
+        k = min(n_results, len(best_per_url))
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+
+        top_urls = np.argpartition(-best_per_url, k - 1, axis=0)[:k]  # (k x n_consultas)
+
+        results = []
+        for q in range(len(queries)):
+            candidates = top_urls[:, q]
+            candidates = candidates[np.argsort(-best_per_url[candidates, q])]
+
+            documents = []
+            for url_id in candidates:
+                start, end = self.url_starts[url_id], url_ends[url_id]
+                row = start + int(np.argmax(scores[start:end, q]))
+
+                # Mesma conversão de distância usada na busca vetorial do Oracle
+                distance = max(1.0 - float(scores[row, q]), 0.0)
+                relevance_score = 1.0 / (1.0 + distance) if distance > 0 else 1.0
+
+                url, title = self.urls[url_id]
+                documents.append({
+                    'text': self._chunk_text(row),
+                    'url': url,
+                    'title': title,
+                    'relevance_score': relevance_score
+                })
+            results.append(documents)
+
+        return results
+
+
+# Exportação carregada sob demanda e recarregada quando uma nova é gravada
+_loader = LocalIndexLoader("exportação de chunks", BRUTEFORCE_EXPORT_PATH, BruteForceIndex,
+                           export_chunks, BRUTEFORCE_RETRY_SECONDS)
+
+
+def get_index():
+    """Retorna a exportação carregada, recarregando do disco quando uma nova é gravada
+
+    Nunca exporta no caminho da consulta: sem exportação em disco, ela é iniciada
+    em segundo plano e a busca retorna vazio até que termine.
+
+    Returns:
+        BruteForceIndex | None: Matriz pronta para consulta, ou None se ainda não existir
+    """
+    return _loader.get()
+
+
+def search_documents_by_text(queries, n_results_per_query=5):
+    """Implementação da busca vetorial exata por força bruta
+
+    Interface compatível com outros algoritmos de busca. Gera os embeddings de
+    todas as consultas em uma única passada do modelo e as pontua juntas
+    contra a matriz exportada.
+
+    Args:
+        queries (list[str]): Lista de consultas de busca
+        n_results_per_query (int): Número de resultados por consulta
+
+    Returns:
+        list[dict]: Lista de documentos com campos 'text', 'url', 'title', 'relevance_score'
+    """
+    # Validação de entrada
+    if not queries or not isinstance(queries, list):
+        return []
+
+    valid_queries = [query for query in queries if query and query.strip()]
+    if not valid_queries:
+        return []
+
+    try:
+        index = get_index()
+        if index is None:
+            return []
+
+        # Importado aqui: generate_chunks exporta sem carregar o modelo de consultas
+        from search_algorithms.vector_search import vectorize_queries
+        query_vectors = vectorize_queries(valid_queries)
+        all_documents = []
+        for documents in index.search(query_vectors, n_results_per_query):
+            all_documents.extend(documents)
+
+        logger.info(f"Busca por força bruta: {len(all_documents)} resultados para {len(valid_queries)} consultas")
+        return all_documents
+
+    except Exception as e:
+        logger.error(f"Erro inesperado na busca por força bruta: {e}")
+        return []
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    export_chunks()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Elasticsearch query bodies used by the searcher
+
+Kept apart from elasticsearch_search (which loads spaCy and Gemini on import)
+so that maintenance scripts, such as the index warm-up in
+migrate_to_elasticsearch.py, can issue exactly the queries production runs.
+"""
+
+def build_search_body(query, size, is_main_query=True):
+    """Build Elasticsearch search body
+    
+    Args:
+        query (str): Query text
+        size (int): Number of hits to return
+        is_main_query (bool): Original query (boosted multi_match on text and
+            title) or an expansion term (phrase match on text)
+    """
+    if is_main_query:
+        query_body = {
+            "bool": {
+                "should": [
+                    {
+                        "multi_match": {
+                            "query": query.lower(),
+                            "fields": ["text^2", "title^3"],
+                            "type": "best_fields",
+                            "fuzziness": "AUTO"
+                        }
+                    },
+                    {
+                        "multi_match": {
+                            "query": query.lower(),
+                            "type": "phrase",
+                            "slop": 1,
+                            "fields": ["text^2", "title^3"],
+                            "boost": 5
+                        }
+                    }
+                ]
+            }
+        }
+    else:
+        query_body = {
+        "match_phrase": {
+            "text": query.lower()
+        }}
+    
+    return {
+        "query": query_body,
+        "size": size,
+        "highlight": {
+            "fields": {
+                "text": {
+                    "fragment_size": 300,
+                    "number_of_fragments": 3,
+                    "pre_tags": ["<em>"],
+                    "post_tags": ["</em>"]
+                }
+            }
+        }
+    }
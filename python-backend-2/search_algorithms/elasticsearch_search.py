@@ -9,7 +9,9 @@ import google.generativeai as genai
 import asyncio
 import os
 import time
+import threading
 from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from search_algorithms.elasticsearch_query import build_search_body
 
 nlp = spacy.load("pt_core_news_lg")
 logger = logging.getLogger(__name__)
@@ -17,17 +19,100 @@ logger = logging.getLogger(__name__)
 # Configure Gemini
 genai.configure(api_key=os.getenv('GEMINI_API'))
 
+# Persistent client settings
+ES_MAX_CONNECTIONS = int(os.getenv("ES_MAX_CONNECTIONS", "25"))            # Keep-alive connections per node
+ES_REQUEST_TIMEOUT = float(os.getenv("ES_REQUEST_TIMEOUT", "30"))           # Seconds per request
+ES_HEALTHCHECK_INTERVAL = float(os.getenv("ES_HEALTHCHECK_INTERVAL", "30"))  # Seconds between background pings
+ES_PING_TIMEOUT = float(os.getenv("ES_PING_TIMEOUT", "2"))                  # Seconds per health ping
+ES_RECHECK_INTERVAL = float(os.getenv("ES_RECHECK_INTERVAL", "2"))          # Min seconds between on-demand re-pings while unhealthy
+
+# One client (and its HTTP connection pool) per Elasticsearch URL, shared by all requests.
+# _clients, _healthy and _last_check are only touched under _clients_lock.
+_clients = {}
+_healthy = {}
+_last_check = {}
+_clients_lock = threading.Lock()
+
+def _ping(es):
+    """Ping Elasticsearch, treating transport errors as unavailable"""
+    try:
+        return bool(es.options(request_timeout=ES_PING_TIMEOUT).ping())
+    except Exception:
+        return False
+
+def _set_healthy(url, healthy):
+    """Record the availability of url, logging transitions"""
+    with _clients_lock:
+        previous = _healthy.get(url)
+        _healthy[url] = healthy
+        _last_check[url] = time.monotonic()
+    if previous is not None and healthy != previous:
+        if healthy:
+            logger.info("Elasticsearch available again")
+        else:
+            logger.error("Elasticsearch health check failed")
+
+def _health_check_loop(url):
+    """Periodically ping Elasticsearch and record its availability"""
+    while True:
+        time.sleep(ES_HEALTHCHECK_INTERVAL)
+        with _clients_lock:
+            es = _clients[url]
+        _set_healthy(url, _ping(es))
+
+def _is_healthy(url, es):
+    """Return whether url is available, re-pinging on demand while it is marked down
+    
+    An unhealthy URL is pinged again on the request path (at most once every
+    ES_RECHECK_INTERVAL seconds), so a recovered cluster is used right away
+    instead of after the next background health check.
+    """
+    with _clients_lock:
+        if _healthy.get(url):
+            return True
+        if time.monotonic() - _last_check.get(url, 0.0) < ES_RECHECK_INTERVAL:
+            return False
+        # Claim this re-check so concurrent requests don't all ping at once
+        _last_check[url] = time.monotonic()
+    
+    healthy = _ping(es)
+    _set_healthy(url, healthy)
+    return healthy
+
+def get_client(url):
+    """Return the persistent client for url, creating it on first use"""
+    with _clients_lock:
+        es = _clients.get(url)
+        if es is not None:
+            return es
+        
+        es = Elasticsearch(
+            url,
+            connections_per_node=ES_MAX_CONNECTIONS,
+            request_timeout=ES_REQUEST_TIMEOUT,
+            retry_on_timeout=True,
+            max_retries=2
+        )
+        _clients[url] = es
+        # Availability is checked on first use by _is_healthy
+        _healthy[url] = False
+        _last_check[url] = 0.0
+    
+    threading.Thread(target=_health_check_loop, args=(url,), daemon=True, name="es-health-check").start()
+    return es
+
 def _connect_elasticsearch(url):
-    """Connect to Elasticsearch and return client"""
+    """Return the shared Elasticsearch client, or None if it is unavailable"""
     try:
-        es = Elasticsearch(url)
-        if not es.ping():
-            logger.error("Elasticsearch not available")
-            return None
-        return es
+        es = get_client(url)
     except Exception as e:
         logger.error(f"Cannot connect to Elasticsearch: {e}")
         return None
+    
+    if not _is_healthy(url, es):
+        logger.error("Elasticsearch not available")
+        return None
+    return es
 
 def _expand_query_with_gemini(query, max_expansions):
     """Expand query using Gemini-2.0-flash for entity extraction"""
@@ -79,53 +164,6 @@ def _expand_query(query, max_expansions):
         print(expanded)
         return expanded
 
-def _build_search_body(query, size, is_main_query=True):
-    """Build Elasticsearch search body"""
-    if is_main_query:
-        query_body = {
-            "bool": {
-                "should": [
-                    {
-                        "multi_match": {
-                            "query": query.lower(),
-                            "fields": ["text^2", "title^3"],
-                            "type": "best_fields",
-                            "fuzziness": "AUTO"
-                        }
-                    },
-                    {
-                        "multi_match": {
-                            "query": query.lower(),
-                            "type": "phrase",
-                            "slop": 1,
-                            "fields": ["text^2", "title^3"],
-                            "boost": 5
-                        }
-                    }
-                ]
-            }
-        }
-    else:
-        query_body = {
-        "match_phrase": {
-            "text": query.lower()
-        }}
-    
-    return {
-        "query": query_body,
-        "size": size,
-        "highlight": {
-            "fields": {
-                "text": {
-                    "fragment_size": 300,
-                    "number_of_fragments": 3,
-                    "pre_tags": ["<em>"],
-                    "post_tags": ["</em>"]
-                }
-            }
-        }
-    }
-
 def _process_search_hit(hit, is_main_query=True):
     """Process a single search hit into document format"""
     source = hit['_source']
@@ -139,10 +177,20 @@ def _process_search_hit(hit, is_main_query=True):
         'relevance_score': score
     }
 
+def _simple_search(es, query, size, is_main_query=True):
+    """Fallback search using a simple match on the text field"""
+    try:
+        simple_search = {"query": {"match": {"text": query.lower()}}, "size": size}
+        response = es.search(index="documents_folded", body=simple_search)
+        return [_process_search_hit(hit, is_main_query) for hit in response['hits']['hits']]
+    except Exception as e2:
+        logger.error(f"Fallback search failed: {e2}")
+        return []
+
 def _search_with_fallback(es, query, size, is_main_query=True):
     """Execute search with fallback to simple match"""
     try:
-        response = es.search(index="documents_folded", body=_build_search_body(query, size, is_main_query))
+        response = es.search(index="documents_folded", body=build_search_body(query, size, is_main_query))
         print("Consulta")
         print(query)
         print("Resultado")
@@ -150,13 +198,37 @@ def _search_with_fallback(es, query, size, is_main_query=True):
         return [_process_search_hit(hit, is_main_query) for hit in response['hits']['hits']]
     except Exception as e:
         logger.error(f"Elasticsearch search error: {e}")
-        try:
-            simple_search = {"query": {"match": {"text": query.lower()}}, "size": size}
-            response = es.search(index="documents_folded", body=simple_search)
-            return [_process_search_hit(hit, is_main_query) for hit in response['hits']['hits']]
-        except Exception as e2:
-            logger.error(f"Fallback search failed: {e2}")
-            return []
+        return _simple_search(es, query, size, is_main_query)
+
+def _msearch_with_fallback(es, searches):
+    """Execute (query, size, is_main_query) searches in a single _msearch request
+    
+    Sub-queries that fail inside the msearch fall back to a simple match on
+    their own; if the whole request fails, every search is issued individually.
+    """
+    if not searches:
+        return []
+    
+    body = []
+    for query, size, is_main_query in searches:
+        body.append({"index": "documents_folded"})
+        body.append(build_search_body(query, size, is_main_query))
+    
+    try:
+        responses = es.msearch(searches=body)['responses']
+    except Exception as e:
+        logger.error(f"Elasticsearch msearch error: {e}")
+        return [_search_with_fallback(es, query, size, is_main) for query, size, is_main in searches]
+    
+    results = []
+    for (query, size, is_main_query), response in zip(searches, responses):
+        if 'error' in response:
+            logger.error(f"Elasticsearch msearch sub-query error: {response['error']}")
+            results.append(_simple_search(es, query, size, is_main_query))
+        else:
+            results.append([_process_search_hit(hit, is_main_query) for hit in response['hits']['hits']])
+    print(f"Msearch com {len(searches)} consultas")
+    return results
 
 def _remove_duplicates(documents):
     """Remove duplicate documents based on URL and boost scores for multi-query matches"""
@@ -178,15 +250,16 @@ def _remove_duplicates(documents):
     
     return list(url_docs.values())
 
-def search_documents_by_text(queries, n_results_per_query=5, url_elastic_search="localhost:9200", expand=False):
-    """Elasticsearch search implementation"""
-    if not queries or not isinstance(queries, list):
-        return []
-    
-    es = _connect_elasticsearch(url_elastic_search)
-    if not es:
-        return []
-    
+def _expanded_sizes(n_results_per_query, expanded_queries):
+    """Split n_results_per_query among the expanded queries (main query gets the remainder)"""
+    results_per_query = n_results_per_query // len(expanded_queries)
+    return [
+        n_results_per_query - results_per_query * (len(expanded_queries) - 1) if i == 0 else results_per_query
+        for i in range(len(expanded_queries))
+    ]
+
+def _search_sequential(es, queries, n_results_per_query, expand):
+    """Issue one search per (expanded) query, plus a complement search when needed"""
     all_documents = []
     
     for query in queries:
@@ -197,12 +270,11 @@ def search_documents_by_text(queries, n_results_per_query=5, url_elastic_search=
         print("Expandindo consultas")
         print(expand)
         print(expanded_queries)
-        results_per_query = n_results_per_query // len(expanded_queries)
+        sizes = _expanded_sizes(n_results_per_query, expanded_queries)
         
         for i, expanded in enumerate(expanded_queries):
-            size = n_results_per_query - results_per_query * (len(expanded_queries) - 1) if i == 0 else results_per_query
             is_main = i == 0
-            documents = _search_with_fallback(es, expanded, size, is_main)
+            documents = _search_with_fallback(es, expanded, sizes[i], is_main)
             all_documents.extend(documents)
         
         # Complement with more results from main query if needed
@@ -217,4 +289,70 @@ def search_documents_by_text(queries, n_results_per_query=5, url_elastic_search=
         
         all_documents = unique_docs
     
-    return sorted(all_documents, key=lambda x: x['relevance_score'], reverse=True)
\ No newline at end of file
+    return all_documents
+
+def _search_batch(es, queries, n_results_per_query, expand):
+    """Send every (expanded) query in a single _msearch request
+    
+    The main query of each entry is requested with the complement size
+    (2 x n_results_per_query), so the complement step is served from the same
+    response instead of a second request. The accumulation and complement
+    logic is then replayed per sub-response, exactly as in the sequential mode.
+    """
+    plans = []
+    searches = []
+    additional_size = n_results_per_query * 2  # Get more to account for duplicates
+    
+    for query in queries:
+        if not query or not query.strip():
+            continue
+        
+        expanded_queries = _expand_query(query, 2) if expand else [query]
+        print("Expandindo consultas")
+        print(expand)
+        print(expanded_queries)
+        sizes = _expanded_sizes(n_results_per_query, expanded_queries)
+        
+        plans.append((len(searches), sizes))
+        for i, expanded in enumerate(expanded_queries):
+            is_main = i == 0
+            searches.append((expanded, max(sizes[i], additional_size) if is_main else sizes[i], is_main))
+    
+    responses = _msearch_with_fallback(es, searches)
+    all_documents = []
+    
+    for start, sizes in plans:
+        for i, size in enumerate(sizes):
+            all_documents.extend(responses[start + i][:size])
+        
+        # Complement with more results from main query if needed
+        unique_docs = _remove_duplicates(all_documents)
+        if len(unique_docs) < n_results_per_query:
+            existing_urls = {doc['url'] for doc in unique_docs}
+            for doc in responses[start][:additional_size]:
+                if doc['url'] not in existing_urls and len(unique_docs) < n_results_per_query:
+                    unique_docs.append(doc)
+        
+        all_documents = unique_docs
+    
+    return all_documents
+
+def search_documents_by_text(queries, n_results_per_query=5, url_elastic_search="localhost:9200", expand=False, batch=True):
+    """Elasticsearch search implementation
+    
+    With batch=True (default) all queries are sent in one _msearch request;
+    with batch=False each query is issued as its own search.
+    """
+    if not queries or not isinstance(queries, list):
+        return []
+    
+    es = _connect_elasticsearch(url_elastic_search)
+    if not es:
+        return []
+    
+    if batch:
+        all_documents = _search_batch(es, queries, n_results_per_query, expand)
+    else:
+        all_documents = _search_sequential(es, queries, n_results_per_query, expand)
+    
+    return sorted(all_documents, key=lambda x: x['relevance_score'], reverse=True)
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+"""
+Cache de embeddings de consultas (LRU + TTL) com persistência opcional em disco
+
+Os embeddings ficam em uma matriz float32 de capacidade fixa (calculada a partir
+do limite de memória em bytes). Cada consulta normalizada ocupa uma linha da
+matriz; quando a matriz enche, a linha usada menos recentemente é reaproveitada.
+Com persistência habilitada, a matriz é um arquivo memory-mapped (np.memmap) e
+o índice consulta -> linha é gravado em JSON ao lado, de modo que o cache
+sobrevive a reinicializações do servidor.
+
+Como o índice só é gravado periodicamente, cada linha guarda também um hash da
+sua consulta (<prefixo>.keys): após uma queda, um índice antigo que aponte para
+uma linha já reaproveitada por outra consulta é detectado e a entrada,
+descartada. Os arquivos persistidos pertencem a um único processo por vez
+(trava em <prefixo>.lock); os demais workers usam um cache apenas em memória.
+"""
+import os
+import json
+import time
+import hashlib
+import atexit
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Quantidade de inserções entre gravações do índice em disco
+SAVE_EVERY_N_PUTS = 32
+
+# Bytes do hash da consulta guardado junto de cada linha
+KEY_HASH_BYTES = 16
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _key_hash(key):
+    """Hash da consulta normalizada gravado ao lado do vetor"""
+    return np.frombuffer(hashlib.blake2b(key.encode("utf-8"), digest_size=KEY_HASH_BYTES).digest(), dtype=np.uint8)
+
+
+def _lock_file(path):
+    """Trava exclusiva e não bloqueante sobre path
+
+    Returns:
+        file | None: Arquivo aberto (mantém a trava enquanto aberto), ou None se
+            outro processo já detém a trava
+    """
+    lock_file = open(path, "a+b")
+    try:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        return lock_file
+    except OSError:
+        lock_file.close()
+        return None
+
+
+def normalize_query(query_text):
+    """Normaliza o texto da consulta para uso como chave do cache
+
+    Args:
+        query_text (str): Texto original da consulta
+
+    Returns:
+        str: Texto em NFC, sem espaços repetidos ou nas extremidades
+    """
+    return " ".join(unicodedata.normalize("NFC", query_text).split())
+
+
+class EmbeddingCache:
+    """Cache LRU + TTL de embeddings limitado por memória"""
+
+    def __init__(self, max_bytes, ttl_seconds, persist_path=None):
+        """
+        Args:
+            max_bytes (int): Memória máxima ocupada pelos vetores
+            ttl_seconds (float): Validade de cada entrada em segundos
+            persist_path (str, optional): Prefixo dos arquivos de persistência
+                (<prefixo>.f32 para a matriz e <prefixo>.json para o índice)
+        """
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.persist_path = persist_path
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # chave -> (linha, timestamp), da menos para a mais recente
+        self._free_rows = []
+        self._matrix = None
+        self._row_keys = None  # hash da consulta dona de cada linha
+        self._dim = None
+        self._capacity = 0
+        self._puts_since_save = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock_handle = None
+        if self.persist_path:
+            directory = os.path.dirname(self.persist_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._lock_handle = _lock_file(self.persist_path + ".lock")
+            if self._lock_handle is None:
+                # Outro worker já usa os arquivos: abri-los aqui sobrescreveria a matriz dele
+                logger.warning(f"Cache de embeddings em {self.persist_path} em uso por outro processo; usando apenas memória")
+                self.persist_path = None
+            else:
+                self._load()
+                atexit.register(self.save)
+
+    def _allocate(self, dim):
+        """Cria a matriz de vetores para embeddings de dimensão dim"""
+        self._dim = dim
+        self._capacity = max(self.max_bytes // (dim * 4), 1)
+        if self.persist_path:
+            # Seguro truncar: a trava garante que nenhum outro processo usa estes arquivos
+            self._matrix = np.memmap(self.persist_path + ".f32", dtype=np.float32, mode="w+", shape=(self._capacity, dim))
+            self._row_keys = np.memmap(self.persist_path + ".keys", dtype=np.uint8, mode="w+", shape=(self._capacity, KEY_HASH_BYTES))
+        else:
+            self._matrix = np.zeros((self._capacity, dim), dtype=np.float32)
+            self._row_keys = np.zeros((self._capacity, KEY_HASH_BYTES), dtype=np.uint8)
+        self._free_rows = list(range(self._capacity - 1, -1, -1))
+
+    def _load(self):
+        """Carrega matriz e índice persistidos, descartando entradas expiradas"""
+        index_path = self.persist_path + ".json"
+        matrix_path = self.persist_path + ".f32"
+        keys_path = self.persist_path + ".keys"
+        if not all(os.path.exists(path) for path in (index_path, matrix_path, keys_path)):
+            return
+
+        try:
+            with open(index_path, encoding="utf-8") as f:
+                index = json.load(f)
+            dim, capacity = index["dim"], index["capacity"]
+            if capacity != max(self.max_bytes // (dim * 4), 1):
+                logger.info("Limite de memória do cache de embeddings mudou; descartando cache persistido")
+                return
+
+            self._matrix = np.memmap(matrix_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+            self._row_keys = np.memmap(keys_path, dtype=np.uint8, mode="r+", shape=(capacity, KEY_HASH_BYTES))
+            self._dim = dim
+            self._capacity = capacity
+
+            now = time.time()
+            used_rows = set()
+            for key, row, timestamp in index["entries"]:
+                # Linha reaproveitada por outra consulta depois da última gravação do índice
+                if not np.array_equal(self._row_keys[row], _key_hash(key)):
+                    continue
+                if now - timestamp <= self.ttl_seconds:
+                    self._entries[key] = (row, timestamp)
+                    used_rows.add(row)
+            self._free_rows = [row for row in range(capacity - 1, -1, -1) if row not in used_rows]
+            logger.info(f"Cache de embeddings carregado do disco: {len(self._entries)} entradas")
+        except Exception as e:
+            logger.error(f"Erro ao carregar cache de embeddings: {e}")
+            self._entries.clear()
+            self._matrix = None
+            self._row_keys = None
+            self._dim = None
+
+    def get(self, query_text):
+        """Retorna o embedding em cache para a consulta, ou None
+
+        Args:
+            query_text (str): Texto da consulta
+
+        Returns:
+            np.ndarray | None: Cópia do embedding, se presente e válido
+        """
+        key = normalize_query(query_text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            row, timestamp = entry
+            if time.time() - timestamp > self.ttl_seconds:
+                del self._entries[key]
+                self._free_rows.append(row)
+                self.misses += 1
+                return None
+
+            if not np.array_equal(self._row_keys[row], _key_hash(key)):
+                # Índice desatualizado: a linha pertence a outra consulta
+                del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return np.array(self._matrix[row])
+
+    def put(self, query_text, vector):
+        """Armazena o embedding da consulta, removendo a entrada LRU se necessário
+
+        Args:
+            query_text (str): Texto da consulta
+            vector (np.ndarray): Embedding da consulta
+        """
+        key = normalize_query(query_text)
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            if self._matrix is None:
+                self._allocate(vector.shape[0])
+            if vector.shape[0] != self._dim:
+                return
+
+            if key in self._entries:
+                row, _ = self._entries.pop(key)
+            elif self._free_rows:
+                row = self._free_rows.pop()
+            else:
+                _, (row, _) = self._entries.popitem(last=False)
+                self.evictions += 1
+
+            # O hash é zerado antes de trocar o vetor e gravado por último: uma
+            # linha nunca fica com o hash de uma consulta e o vetor de outra
+            self._row_keys[row] = 0
+            self._matrix[row] = vector
+            self._row_keys[row] = _key_hash(key)
+            self._entries[key] = (row, time.time())
+
+            self._puts_since_save += 1
+            should_save = self.persist_path and self._puts_since_save >= SAVE_EVERY_N_PUTS
+
+        if should_save:
+            self.save()
+
+    def save(self):
+        """Grava a matriz e o índice em disco (apenas com persistência habilitada)"""
+        if not self.persist_path:
+            return
+
+        with self._lock:
+            if self._matrix is None:
+                return
+            self._matrix.flush()
+            self._row_keys.flush()
+            index = {
+                "dim": self._dim,
+                "capacity": self._capacity,
+                "entries": [[key, row, timestamp] for key, (row, timestamp) in self._entries.items()]
+            }
+            self._puts_since_save = 0
+
+        try:
+            tmp_path = self.persist_path + ".json.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(index, f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path + ".json")
+        except OSError as e:
+            logger.error(f"Erro ao salvar cache de embeddings: {e}")
+
+    def clear(self):
+        """Remove todas as entradas do cache"""
+        with self._lock:
+            self._entries.clear()
+            self._free_rows = list(range(self._capacity - 1, -1, -1))
+
+    def stats(self):
+        """Retorna estatísticas de uso do cache
+
+        Returns:
+            dict: Acertos, falhas, remoções, entradas e bytes ocupados
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "capacity": self._capacity,
+                "bytes": len(self._entries) * (self._dim or 0) * 4,
+                "max_bytes": self.max_bytes,
+            }
@@ -10,6 +10,7 @@ para melhorar a ordenação dos resultados de busca.
 import os
 import logging
 import oracledb
+from db_connection import get_connection
 import numpy as np
 from dotenv import load_dotenv
 from rank_bm25 import BM25Okapi
@@ -21,9 +22,6 @@ logger = logging.getLogger(__name__)
 
 # Carrega variáveis de ambiente
 load_dotenv()
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_DSN = os.getenv("DB_DSN")
 
 # Inicializa cliente Oracle
 oracledb.init_oracle_client(lib_dir=r"C:\oracle\instantclient_23_9")
@@ -42,7 +40,7 @@ def fetch_candidate_documents(query):
     """
 
     try:
-        with oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=DB_DSN) as conn:
+        with get_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(sql)
                 results = []
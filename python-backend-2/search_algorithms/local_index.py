@@ -0,0 +1,347 @@
+# -*- coding: utf-8 -*-
+"""
+Infraestrutura comum dos índices vetoriais locais (ann_search e bruteforce_search)
+
+- export_chunks: exporta os chunks do Oracle em streaming para um diretório
+  (matriz de vetores .npy, blob de textos com offsets, ids de documento e de URL);
+- build_atomically: constrói em uma nova versão (path/v<N>) e a publica
+  trocando o ponteiro CURRENT;
+- LocalIndex: base dos índices carregados via memory-map;
+- LocalIndexLoader: carga preguiçosa que nunca constrói no caminho da consulta.
+
+Os índices são construídos fora das consultas, por generate_chunks.py ou pela
+linha de comando de cada backend. O servidor continua usando o índice carregado
+até que uma nova versão seja publicada no CURRENT.
+"""
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+import numpy as np
+import oracledb
+from db_connection import get_connection
+
+# Logger para este módulo
+logger = logging.getLogger(__name__)
+
+# Arquivo com o nome da versão publicada do índice (path/v<N>)
+CURRENT_FILE = "CURRENT"
+
+# Versão incompleta mais antiga que isso é de uma construção que morreu (removível)
+STALE_BUILD_SECONDS = 24 * 3600
+
+# Consulta de exportação: chunk, vetor e documento de origem
+CHUNKS_QUERY = """
+    SELECT c.document_id, c.chunk_text, c.vector, d.url, d.title
+    FROM chunks c
+    JOIN documents d ON c.document_id = d.id
+"""
+
+
+def to_vector(value):
+    """Converte o valor de uma coluna VECTOR do Oracle em array float32"""
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+def export_chunks(path, vectors_file, order_by_url=False, normalize=False):
+    """Exporta os chunks do Oracle para o diretório path, em streaming
+
+    Arquivos gravados: <vectors_file> (float32, n x dimensão), texts.bin e
+    text_offsets.npy (textos dos chunks), doc_ids.npy e url_ids.npy (índice na
+    lista de URLs devolvida).
+
+    Args:
+        path (str): Diretório de destino (já existente)
+        vectors_file (str): Nome do arquivo .npy da matriz de vetores
+        order_by_url (bool): Ordena por URL, deixando os chunks de cada URL contíguos
+        normalize (bool): Grava os vetores com norma 1
+
+    Returns:
+        dict | None: {"count", "dim", "urls"} ou None se não houver chunks
+
+    Raises:
+        oracledb.Error: Em falhas de banco
+    """
+    with get_connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM chunks c JOIN documents d ON c.document_id = d.id")
+            total = cursor.fetchone()[0]
+            if total == 0:
+                return None
+
+            logger.info(f"Exportando {total} chunks do Oracle para {path}...")
+            cursor.arraysize = 1000
+            cursor.execute(CHUNKS_QUERY + (" ORDER BY d.url, c.id" if order_by_url else ""))
+
+            vectors = None
+            doc_ids = np.zeros(total, dtype=np.int64)
+            url_ids = np.zeros(total, dtype=np.int64)
+            text_offsets = np.zeros(total + 1, dtype=np.int64)
+            urls = []
+            url_index = {}
+            n = 0
+
+            with open(os.path.join(path, "texts.bin"), "wb") as texts_file:
+                for document_id, chunk_text, vector, url, title in cursor:
+                    if n >= total:
+                        break
+                    vector = to_vector(vector)
+                    if vectors is None:
+                        vectors = np.lib.format.open_memmap(
+                            os.path.join(path, vectors_file), mode="w+",
+                            dtype=np.float32, shape=(total, vector.shape[0]))
+                    if normalize:
+                        norm = np.linalg.norm(vector)
+                        vector = vector / norm if norm > 0 else vector
+                    vectors[n] = vector
+
+                    if url not in url_index:
+                        url_index[url] = len(urls)
+                        urls.append([url, title])
+                    url_ids[n] = url_index[url]
+                    doc_ids[n] = document_id
+
+                    text = chunk_text.read() if hasattr(chunk_text, "read") else str(chunk_text or "")
+                    encoded = text.encode("utf-8")
+                    texts_file.write(encoded)
+                    text_offsets[n + 1] = text_offsets[n] + len(encoded)
+                    n += 1
+
+    if vectors is None:
+        # COUNT(*) viu chunks, mas a consulta não retornou nenhum (removidos no meio da exportação)
+        return None
+
+    dim = vectors.shape[1]
+    vectors.flush()
+    del vectors
+    if n < total:
+        # Chunks removidos durante a exportação: descarta as linhas não preenchidas
+        full = np.load(os.path.join(path, vectors_file), mmap_mode="r")
+        np.save(os.path.join(path, vectors_file + ".part"), full[:n])
+        del full
+        os.replace(os.path.join(path, vectors_file + ".part.npy"), os.path.join(path, vectors_file))
+
+    np.save(os.path.join(path, "doc_ids.npy"), doc_ids[:n])
+    np.save(os.path.join(path, "url_ids.npy"), url_ids[:n])
+    np.save(os.path.join(path, "text_offsets.npy"), text_offsets[:n + 1])
+    return {"count": n, "dim": dim, "urls": urls}
+
+
+def write_meta(path, **meta):
+    """Grava o meta.json (por último: sua presença marca o índice como completo)"""
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"built_at": time.time(), **meta}, f, ensure_ascii=False)
+
+
+def _version_number(name):
+    """Número de uma versão "v<N>" (None se o nome não for de uma versão)"""
+    if not name.startswith("v"):
+        return None
+    try:
+        return int(name[1:])
+    except ValueError:
+        return None
+
+
+def published_version(path):
+    """Retorna o nome da versão publicada em path (None se não houver)"""
+    try:
+        with open(os.path.join(path, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _remove_old_versions(path, current):
+    """Apaga as versões substituídas por current (e arquivos do formato antigo)
+
+    Versões mais novas que current e construções incompletas recentes são de
+    outro construtor em andamento e ficam. Uma remoção que falhe (ex.: arquivos
+    ainda mapeados por um worker no Windows) fica para a próxima construção.
+    """
+    current_number = _version_number(current)
+    for entry in os.listdir(path):
+        if entry == current or entry.startswith(CURRENT_FILE):
+            continue
+        entry_path = os.path.join(path, entry)
+        number = _version_number(entry)
+        if number is not None:
+            if number > current_number:
+                continue
+            if (not os.path.exists(os.path.join(entry_path, "meta.json"))
+                    and time.time() - os.path.getmtime(entry_path) < STALE_BUILD_SECONDS):
+                continue
+        try:
+            if os.path.isdir(entry_path):
+                shutil.rmtree(entry_path)
+            else:
+                os.remove(entry_path)
+        except OSError as e:
+            logger.warning(f"Não foi possível remover {entry_path} ({e}); nova tentativa na próxima construção")
+
+
+def build_atomically(path, build, name):
+    """Constrói um índice em uma nova versão e a publica trocando o ponteiro
+
+    Cada construção grava em path/v<N>; ao terminar, o arquivo CURRENT passa a
+    apontar para ela por os.replace, que é atômico. Os leitores abrem sempre a
+    versão apontada, e as antigas só são apagadas depois da troca.
+
+    Args:
+        path (str): Diretório do índice (contém as versões e o CURRENT)
+        build: Função build(version_path) -> bool que grava os arquivos do índice
+        name (str): Nome do índice (usado nos logs)
+
+    Returns:
+        bool: True se o índice foi construído e publicado
+    """
+    os.makedirs(path, exist_ok=True)
+    version = f"v{time.time_ns()}"
+    version_path = os.path.join(path, version)
+    os.makedirs(version_path)
+
+    try:
+        if not build(version_path):
+            shutil.rmtree(version_path, ignore_errors=True)
+            return False
+    except oracledb.Error as e:
+        logger.error(f"Erro de banco de dados Oracle ao construir {name}: {e}")
+        shutil.rmtree(version_path, ignore_errors=True)
+        return False
+    except Exception:
+        shutil.rmtree(version_path, ignore_errors=True)
+        raise
+
+    published = published_version(path)
+    if published is not None and (_version_number(published) or 0) > _version_number(version):
+        # Uma construção iniciada depois desta já publicou um índice mais novo
+        logger.info(f"{name}: versão mais nova já publicada ({published}); descartando {version}")
+        shutil.rmtree(version_path, ignore_errors=True)
+        return True
+
+    pointer_tmp = os.path.join(path, f"{CURRENT_FILE}.tmp{os.getpid()}")
+    try:
+        with open(pointer_tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(pointer_tmp, os.path.join(path, CURRENT_FILE))
+    except OSError as e:
+        logger.error(f"Erro ao publicar {name} ({version}): {e}")
+        shutil.rmtree(version_path, ignore_errors=True)
+        if os.path.exists(pointer_tmp):
+            os.remove(pointer_tmp)
+        return False
+
+    _remove_old_versions(path, version)
+    return True
+
+
+class LocalIndex:
+    """Base dos índices locais: metadados, URLs e textos dos chunks via memory-map"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Diretório com os arquivos gravados por export_chunks
+        """
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.urls = self.meta["urls"]
+
+        self.url_ids = np.load(os.path.join(path, "url_ids.npy"), mmap_mode="r")
+        self.text_offsets = np.load(os.path.join(path, "text_offsets.npy"), mmap_mode="r")
+        self.texts = np.memmap(os.path.join(path, "texts.bin"), dtype=np.uint8, mode="r") \
+            if self.text_offsets[-1] > 0 else np.zeros(0, dtype=np.uint8)
+
+    def _chunk_text(self, row):
+        """Lê o texto de um chunk do blob memory-mapped"""
+        start, end = self.text_offsets[row], self.text_offsets[row + 1]
+        return bytes(self.texts[start:end]).decode("utf-8")
+
+
+class LocalIndexLoader:
+    """Carga preguiçosa de um índice local, sem construção no caminho da consulta
+
+    O índice é recarregado quando uma nova versão é publicada. Se não houver
+    índice utilizável em disco, uma única construção é iniciada em segundo
+    plano e get() retorna None até que termine; após uma falha, novas
+    tentativas esperam retry_seconds.
+    """
+
+    def __init__(self, name, path, index_class, build, retry_seconds):
+        """
+        Args:
+            name (str): Nome do índice (usado nos logs)
+            path (str): Diretório do índice
+            index_class: Subclasse de LocalIndex que abre o diretório de uma versão
+            build: Função build(path) -> bool que constrói o índice
+            retry_seconds (float): Espera após falha de carga ou construção
+        """
+        self.name = name
+        self.path = path
+        self.index_class = index_class
+        self.build = build
+        self.retry_seconds = retry_seconds
+
+        self._lock = threading.Lock()
+        self._index = None
+        self._version = None
+        self._build_thread = None
+        self._retry_at = 0.0
+
+    def _build_in_background(self):
+        """Constrói o índice em uma thread, fora do caminho das consultas"""
+
+        def run():
+            try:
+                if self.build(self.path):
+                    self._retry_at = 0.0
+                else:
+                    self._retry_at = time.monotonic() + self.retry_seconds
+            except Exception as e:
+                logger.error(f"Erro ao construir {self.name}: {e}")
+                self._retry_at = time.monotonic() + self.retry_seconds
+
+        with self._lock:
+            if self._build_thread is not None and self._build_thread.is_alive():
+                return
+            logger.info(f"{self.name} ausente; construindo em segundo plano...")
+            self._build_thread = threading.Thread(target=run, name=f"build-{self.name}", daemon=True)
+            self._build_thread.start()
+
+    def get(self):
+        """Retorna o índice carregado, recarregando se uma nova versão foi publicada
+
+        Returns:
+            LocalIndex | None: Índice pronto para consulta, ou None se ainda não existir
+        """
+        version = published_version(self.path)
+        if (version is not None and version == self._version) or time.monotonic() < self._retry_at:
+            return self._index
+
+        if version is None:
+            # Sem índice publicado: mantém o atual, se houver
+            if self._index is None:
+                self._build_in_background()
+            return self._index
+
+        load_failed = False
+        with self._lock:
+            if version != self._version:
+                version_path = os.path.join(self.path, version)
+                try:
+                    self._index = self.index_class(version_path)
+                    self._version = version
+                    logger.info(f"{self.name} carregado de {version_path}")
+                except Exception as e:
+                    logger.error(f"Erro ao carregar {self.name}: {e}")
+                    self._retry_at = time.monotonic() + self.retry_seconds
+                    load_failed = self._index is None
+
+        if load_failed:
+            # Índice ilegível e nada carregado: reconstrói
+            self._build_in_background()
+        return self._index
@@ -5,14 +5,12 @@ Simple LIKE search algorithm implementation
 import os
 import logging
 import oracledb
+from db_connection import get_connection
 from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
 
 load_dotenv()
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_DSN = os.getenv("DB_DSN")
 
 oracledb.init_oracle_client(lib_dir=r"C:\oracle\instantclient_23_9")
 
@@ -24,7 +22,7 @@ def search_documents_by_text(queries, n_results_per_query=5):
     all_documents = []
     
     try:
-        with oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=DB_DSN) as conn:
+        with get_connection() as conn:
             with conn.cursor() as cursor:
                 for query in queries:
                     if not query or not query.strip():
@@ -5,6 +5,7 @@ TF-IDF search algorithm implementation
 import os
 import logging
 import oracledb
+from db_connection import get_connection
 from dotenv import load_dotenv
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
@@ -13,9 +14,6 @@ import numpy as np
 logger = logging.getLogger(__name__)
 
 load_dotenv()
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_DSN = os.getenv("DB_DSN")
 
 oracledb.init_oracle_client(lib_dir=r"C:\oracle\instantclient_23_9")
 
@@ -33,7 +31,7 @@ def fetch_candidate_documents(query):
     """
 
     try:
-        with oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=DB_DSN) as conn:
+        with get_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(sql)
                 results = []
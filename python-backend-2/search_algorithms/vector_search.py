@@ -9,25 +9,44 @@ outros algoritmos de busca para integração no sistema modular.
 import os
 import logging
 import oracledb
+from db_connection import get_connection
+from search_algorithms.embedding_cache import EmbeddingCache
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from dotenv import load_dotenv
 import ssl
+import threading
 
 # Logger para este módulo
 logger = logging.getLogger(__name__)
 
 # Carrega variáveis de ambiente
 load_dotenv()
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_DSN = os.getenv("DB_DSN")
 
 # Modelo para gerar embeddings
 MODEL_NAME = 'intfloat/multilingual-e5-large-instruct'
 
 # Cache global do modelo
 _model_cache = None
+# Evita que consultas concorrentes carreguem o modelo mais de uma vez
+_model_lock = threading.Lock()
+
+# Cache de embeddings das consultas (LRU por memória + TTL, persistência opcional)
+EMBEDDING_CACHE_MAX_MB = float(os.getenv("EMBEDDING_CACHE_MAX_MB", "64"))
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL", str(7 * 24 * 3600)))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH")  # Ex.: cache/query_embeddings (vazio = só memória)
+embedding_cache = EmbeddingCache(
+    max_bytes=int(EMBEDDING_CACHE_MAX_MB * 1024 * 1024),
+    ttl_seconds=EMBEDDING_CACHE_TTL,
+    persist_path=EMBEDDING_CACHE_PATH or None
+)
+
+# Modo da busca vetorial no Oracle:
+#   "exact"  - varredura completa com VECTOR_DISTANCE (resultado exato)
+#   "approx" - usa o índice vetorial (FETCH APPROX FIRST), tempo sublinear no número de chunks
+VECTOR_SEARCH_MODE = os.getenv("VECTOR_SEARCH_MODE", "exact").lower()
+VECTOR_SEARCH_TARGET_ACCURACY = int(os.getenv("VECTOR_SEARCH_TARGET_ACCURACY", "90"))  # Precisão alvo do índice (%)
+VECTOR_SEARCH_OVERFETCH = int(os.getenv("VECTOR_SEARCH_OVERFETCH", "4"))  # Chunks buscados por resultado (dedup por documento)
 
 
 def get_model():
@@ -38,25 +57,65 @@ def get_model():
     """
     global _model_cache
     
-    if _model_cache is None:
-        logger.info(f"Carregando modelo {MODEL_NAME}...")
-        try:
-            # Configura proxy para redes corporativas (se necessário)
-            os.environ['http_proxy'] = 'http://10.0.220.11:3128'
-            os.environ['https_proxy'] = 'http://10.0.220.11:3128'
-            
-            # Contorna verificação SSL para redes corporativas
-            ssl._create_default_https_context = ssl._create_unverified_context
-            
-            # Carrega modelo do Hugging Face
-            _model_cache = SentenceTransformer(MODEL_NAME)
-            logger.info("Modelo carregado com sucesso")
-        except Exception as e:
-            logger.error(f"Erro ao carregar modelo: {e}")
-            raise
+    if _model_cache is not None:
+        return _model_cache
+    
+    with _model_lock:
+        if _model_cache is None:
+            logger.info(f"Carregando modelo {MODEL_NAME}...")
+            try:
+                # Configura proxy para redes corporativas (se necessário)
+                os.environ['http_proxy'] = 'http://10.0.220.11:3128'
+                os.environ['https_proxy'] = 'http://10.0.220.11:3128'
+                
+                # Contorna verificação SSL para redes corporativas
+                ssl._create_default_https_context = ssl._create_unverified_context
+                
+                # Carrega modelo do Hugging Face
+                _model_cache = SentenceTransformer(MODEL_NAME)
+                logger.info("Modelo carregado com sucesso")
+            except Exception as e:
+                logger.error(f"Erro ao carregar modelo: {e}")
+                raise
     
     return _model_cache
 
+def vectorize_queries(query_texts):
+    """Converte várias consultas em vetores de embedding em uma única passada do modelo
+    
+    Consultas já presentes no cache de embeddings não passam pelo modelo;
+    apenas as restantes são codificadas, em lote.
+    
+    Args:
+        query_texts (list[str]): Textos das consultas do usuário
+        
+    Returns:
+        np.ndarray: Matriz (n_consultas x dimensão) com um embedding por consulta
+    """
+    try:
+        embeddings = [embedding_cache.get(query_text) for query_text in query_texts]
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        
+        if missing:
+            # Obtém modelo do cache
+            model = get_model()
+            
+            # Adiciona prefixo "query:" recomendado para consultas nos modelos e5
+            queries_with_prefix = [f"query: {query_texts[i]}" for i in missing]
+            
+            # Gera os embeddings faltantes em lote
+            new_embeddings = model.encode(queries_with_prefix, convert_to_numpy=True)
+            for i, embedding in zip(missing, new_embeddings):
+                embedding_cache.put(query_texts[i], embedding)
+                embeddings[i] = embedding
+        
+        logger.info(f"Embeddings: {len(query_texts) - len(missing)} do cache, {len(missing)} gerados")
+        return np.stack(embeddings).astype(np.float32)
+        
+    except Exception as e:
+        logger.error(f"Erro ao vetorizar consultas: {e}")
+        raise
+
 def vectorize_query(query_text):
     """Converte texto da consulta em vetor de embedding
     
@@ -66,94 +125,123 @@ def vectorize_query(query_text):
     Returns:
         np.ndarray: Vetor de embedding da consulta
     """
-    try:
-        # Obtém modelo do cache
-        model = get_model()
+    return vectorize_queries([query_text])[0]  # Retorna o primeiro (e único) embedding
+
+def _format_results(rows, n_results):
+    """Formata linhas (texto, url, título, distância) mantendo o melhor chunk por documento
+    
+    Args:
+        rows (list[tuple]): Linhas ordenadas por distância crescente
+        n_results (int): Número máximo de documentos a retornar
         
-        # Adiciona prefixo "query:" recomendado para consultas nos modelos e5
-        query_with_prefix = f"query: {query_text}"
+    Returns:
+        list[dict]: Lista de documentos com campos 'text', 'url', 'title', 'relevance_score'
+    """
+    documents = []
+    seen_urls = set()
+    for text, url, title, distance in rows:
+        if url in seen_urls:
+            continue
+        seen_urls.add(url)
         
-        # Gera embedding da consulta
-        embedding = model.encode([query_with_prefix], convert_to_numpy=True)
+        # Trata objetos CLOB do Oracle (lidos apenas para os chunks mantidos)
+        text_content = text.read() if hasattr(text, 'read') else str(text)
         
-        return embedding[0]  # Retorna o primeiro (e único) embedding
+        # Converte distância em score de relevância (menor distância = maior relevância)
+        relevance_score = 1.0 / (1.0 + distance) if distance > 0 else 1.0
         
-    except Exception as e:
-        logger.error(f"Erro ao vetorizar consulta: {e}")
-        raise
+        documents.append({
+            'text': text_content,
+            'url': url,
+            'title': title,
+            'relevance_score': relevance_score
+        })
+        if len(documents) >= n_results:
+            break
+    
+    return documents
 
-def search_documents_by_text(queries, n_results_per_query=5):
-    """Implementação da busca vetorial semântica
+def _search_exact(cursor, vector_str, n_results):
+    """Busca exata: varre todos os chunks e mantém o mais próximo de cada documento"""
+    sql = """
+    SELECT c.chunk_text as text, d.url, d.title, VECTOR_DISTANCE(c.vector, VECTOR(:1)) as distance
+    FROM chunks c
+    JOIN documents d ON c.document_id = d.id
+    WHERE (d.url, VECTOR_DISTANCE(c.vector, VECTOR(:2))) IN (
+        SELECT url, MIN(VECTOR_DISTANCE(c2.vector, VECTOR(:3)))
+        FROM chunks c2
+        JOIN documents d2 ON c2.document_id = d2.id
+        GROUP BY url
+    )
+    ORDER BY VECTOR_DISTANCE(c.vector, VECTOR(:4))
+    FETCH FIRST :5 ROWS ONLY
+    """
     
-    Interface compatível com outros algoritmos de busca. Converte consultas em
-    embeddings vetoriais e utiliza VECTOR_DISTANCE do Oracle 23ai para encontrar
-    documentos semanticamente similares.
+    cursor.execute(sql, (vector_str, vector_str, vector_str, vector_str, n_results))
+    return cursor.fetchall()
+
+def _search_approx(cursor, vector_str, n_results):
+    """Busca aproximada: consulta o índice vetorial pelos n_results x VECTOR_SEARCH_OVERFETCH
+    chunks mais próximos; a deduplicação por documento é feita em Python"""
+    # A precisão alvo é um literal na cláusula; o valor vem da configuração (inteiro)
+    sql = f"""
+    SELECT t.chunk_text as text, d.url, d.title, t.distance
+    FROM (
+        SELECT c.chunk_text, c.document_id, VECTOR_DISTANCE(c.vector, VECTOR(:qv)) as distance
+        FROM chunks c
+        ORDER BY VECTOR_DISTANCE(c.vector, VECTOR(:qv))
+        FETCH APPROX FIRST :k ROWS ONLY WITH TARGET ACCURACY {int(VECTOR_SEARCH_TARGET_ACCURACY)}
+    ) t
+    JOIN documents d ON t.document_id = d.id
+    ORDER BY t.distance
+    """
+    
+    cursor.execute(sql, qv=vector_str, k=n_results * max(VECTOR_SEARCH_OVERFETCH, 1))
+    return cursor.fetchall()
+
+def search_by_vector(cursor, query_vector, n_results):
+    """Executa a busca vetorial no Oracle para um embedding já calculado
     
     Args:
-        queries (list[str]): Lista de consultas de busca
-        n_results_per_query (int): Número de resultados por consulta
+        cursor: Cursor Oracle aberto
+        query_vector (np.ndarray): Embedding da consulta
+        n_results (int): Número de resultados a retornar
         
     Returns:
         list[dict]: Lista de documentos com campos 'text', 'url', 'title', 'relevance_score'
     """
-    # Validação de entrada
-    if not queries or not isinstance(queries, list):
-        return []
+    # Converte para formato Oracle VECTOR
+    vector_str = '[' + ','.join(map(str, query_vector.astype(np.float32))) + ']'
+    
+    # Executa busca vetorial no Oracle (chunks)
+    if VECTOR_SEARCH_MODE == "approx":
+        rows = _search_approx(cursor, vector_str, n_results)
+    else:
+        rows = _search_exact(cursor, vector_str, n_results)
     
+    documents = _format_results(rows, n_results)
+    
+    logger.info(f"Encontrados {len(documents)} resultados para consulta vetorial ({VECTOR_SEARCH_MODE})")
+    return documents
+
+def search_documents_by_vectors(query_vectors, n_results_per_query=5):
+    """Busca vetorial a partir de embeddings já calculados
+    
+    Args:
+        query_vectors (list[np.ndarray] | np.ndarray): Embeddings das consultas
+        n_results_per_query (int): Número de resultados por consulta
+        
+    Returns:
+        list[dict]: Lista de documentos com campos 'text', 'url', 'title', 'relevance_score'
+    """
     all_documents = []
     
     try:
         # Conecta ao banco Oracle
-        with oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=DB_DSN) as connection:
+        with get_connection() as connection:
             with connection.cursor() as cursor:
-                
-                # Processa cada consulta individualmente
-                for query in queries:
-                    if not query or not query.strip():
-                        continue
-                    
-                    logger.info(f"Processando consulta vetorial: '{query[:50]}...'")
-                    
-                    # Etapa 1: Gerar embedding vetorial da consulta
-                    query_vector = vectorize_query(query)
-                    
-                    # Etapa 2: Converter para formato Oracle VECTOR
-                    vector_str = '[' + ','.join(map(str, query_vector.astype(np.float32))) + ']'
-                    
-                    # Etapa 3: Executar busca vetorial no Oracle (chunks)
-                    sql = """
-                    SELECT c.chunk_text as text, d.url, d.title, VECTOR_DISTANCE(c.vector, VECTOR(:1)) as distance
-                    FROM chunks c
-                    JOIN documents d ON c.document_id = d.id
-                    WHERE (d.url, VECTOR_DISTANCE(c.vector, VECTOR(:2))) IN (
-                        SELECT url, MIN(VECTOR_DISTANCE(c2.vector, VECTOR(:3)))
-                        FROM chunks c2
-                        JOIN documents d2 ON c2.document_id = d2.id
-                        GROUP BY url
-                    )
-                    ORDER BY VECTOR_DISTANCE(c.vector, VECTOR(:4))
-                    FETCH FIRST :5 ROWS ONLY
-                    """
-                    
-                    cursor.execute(sql, (vector_str, vector_str, vector_str, vector_str, n_results_per_query))
-                    results = cursor.fetchall()
-                    
-                    # Etapa 4: Formatar resultados
-                    for text, url, title, distance in results:
-                        # Trata objetos CLOB do Oracle
-                        text_content = text.read() if hasattr(text, 'read') else str(text)
-                        
-                        # Converte distância em score de relevância (menor distância = maior relevância)
-                        relevance_score = 1.0 / (1.0 + distance) if distance > 0 else 1.0
-                        
-                        all_documents.append({
-                            'text': text_content,
-                            'url': url,
-                            'title': title,
-                            'relevance_score': relevance_score
-                        })
-                    
-                    logger.info(f"Encontrados {len(results)} resultados para consulta vetorial")
+                for query_vector in query_vectors:
+                    all_documents.extend(search_by_vector(cursor, query_vector, n_results_per_query))
         
         return all_documents
         
@@ -162,4 +250,37 @@ def search_documents_by_text(queries, n_results_per_query=5):
         return []
     except Exception as e:
         logger.error(f"Erro inesperado na busca vetorial: {e}")
-        return []
\ No newline at end of file
+        return []
+
+def search_documents_by_text(queries, n_results_per_query=5):
+    """Implementação da busca vetorial semântica
+    
+    Interface compatível com outros algoritmos de busca. Converte todas as
+    consultas em embeddings em uma única passada do modelo e utiliza
+    VECTOR_DISTANCE do Oracle 23ai para encontrar documentos semanticamente similares.
+    
+    Args:
+        queries (list[str]): Lista de consultas de busca
+        n_results_per_query (int): Número de resultados por consulta
+        
+    Returns:
+        list[dict]: Lista de documentos com campos 'text', 'url', 'title', 'relevance_score'
+    """
+    # Validação de entrada
+    if not queries or not isinstance(queries, list):
+        return []
+    
+    valid_queries = [query for query in queries if query and query.strip()]
+    if not valid_queries:
+        return []
+    
+    logger.info(f"Processando {len(valid_queries)} consultas vetoriais em lote")
+    
+    try:
+        # Gera os embeddings de todas as consultas de uma só vez
+        query_vectors = vectorize_queries(valid_queries)
+    except Exception as e:
+        logger.error(f"Erro inesperado na busca vetorial: {e}")
+        return []
+    
+    return search_documents_by_vectors(query_vectors, n_results_per_query)
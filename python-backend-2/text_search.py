@@ -9,6 +9,7 @@ import os
 import logging
 from datetime import datetime
 from search_algorithms import elasticsearch_search
+from result_cache import ResultCache
 import google.generativeai as genai
 from dotenv import load_dotenv
 import json
@@ -27,6 +28,9 @@ load_dotenv()
 DEFAULT_SEARCH_ALGORITHM = elasticsearch_search
 EVALUATE_WITH_GEMINI = True
 
+# Cache de resultados por (consultas, n_results_per_query, expand)
+_result_cache = ResultCache("text_search")
+
 def search_documents_by_text(queries, n_results_per_query=5, expand=True):
     """Função principal de busca usando algoritmo padrão
     
@@ -44,11 +48,25 @@ def search_documents_by_text(queries, n_results_per_query=5, expand=True):
         queries = [q.lower() if q else q for q in queries]
         print("Consultas:\n")
         print(queries)
+    
+    # Consultas idênticas recentes são respondidas pelo cache
+    cache_key = (tuple(queries), n_results_per_query, expand) if isinstance(queries, list) else None
+    if cache_key is not None:
+        cached = _result_cache.get(cache_key)
+        if cached is not None:
+            print("Resultado obtido do cache")
+            return cached
+    
     # Handle different algorithm signatures
     if DEFAULT_SEARCH_ALGORITHM == elasticsearch_search:
-        return DEFAULT_SEARCH_ALGORITHM.search_documents_by_text(queries, n_results_per_query, url_elastic_search=URL_ELASTIC_SEARCH, expand=expand)
+        results = DEFAULT_SEARCH_ALGORITHM.search_documents_by_text(queries, n_results_per_query, url_elastic_search=URL_ELASTIC_SEARCH, expand=expand)
     else:
-        return DEFAULT_SEARCH_ALGORITHM.search_documents_by_text(queries, n_results_per_query)
+        results = DEFAULT_SEARCH_ALGORITHM.search_documents_by_text(queries, n_results_per_query)
+    
+    # Não guarda resultados vazios (podem indicar indisponibilidade temporária)
+    if cache_key is not None and results:
+        _result_cache.put(cache_key, results)
+    return results
 
 
 def evaluate_with_gemini(query, all_results):
@@ -165,7 +183,8 @@ def test_all_algorithms():
     """
     # Importa todos os algoritmos de busca disponíveis
     from search_algorithms import (bm25_search, 
-                                 elasticsearch_search, vector_search)
+                                 elasticsearch_search, vector_search,
+                                 bruteforce_search)
     
     # Consulta de teste padrão
     test_queries = ['práticas religiosas populares Brasil colonial imperial']
@@ -181,6 +200,7 @@ def test_all_algorithms():
     algorithms = {
         'bm25': bm25_search,           # BM25 clássico
         'vector': vector_search,       # Busca vetorial semântica
+        'bruteforce': bruteforce_search,  # Busca vetorial exata em NumPy (linha de base sem Oracle)
     }
     
     # Timestamp para identificar execução nos logs
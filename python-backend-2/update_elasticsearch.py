@@ -9,8 +9,10 @@ import logging
 import oracledb
 from dotenv import load_dotenv
 from elasticsearch import Elasticsearch
-from elasticsearch.helpers import bulk
 import hashlib
+from bulk_indexing import bulk_index
+from db_connection import stream_query, close_pool
+from result_cache import invalidate_result_caches
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,81 +20,92 @@ logger = logging.getLogger(__name__)
 os.environ["NO_PROXY"] = "localhost,127.0.0.1"
 
 load_dotenv()
-DB_USER = os.getenv("DB_USER")
-DB_PASSWORD = os.getenv("DB_PASSWORD")
-DB_DSN = os.getenv("DB_DSN")
 
 oracledb.init_oracle_client(lib_dir=r"C:\oracle\instantclient_23_9")
 
+# Documentos lidos por página no snapshot do Elasticsearch
+ES_SNAPSHOT_PAGE_SIZE = int(os.getenv("ES_SNAPSHOT_PAGE_SIZE", "5000"))
+ES_SNAPSHOT_KEEP_ALIVE = "2m"
+
+# CLOBs como str: documentos são lidos em lotes, sem uma ida ao banco por LOB
+oracledb.defaults.fetch_lobs = False
+
 def get_document_hash(text, url, title):
     """Gera hash único para detectar mudanças no documento"""
     content = f"{text}{url}{title}"
     return hashlib.md5(content.encode('utf-8')).hexdigest()
 
 def fetch_oracle_documents():
-    """Busca todos os documentos do Oracle"""
+    """Lê os documentos do Oracle em lotes de tamanho fixo (streaming)
     
+    Yields:
+        list[dict]: Lote de documentos com text, url, title e hash
+    """
     try:
-        # Force fresh connection
-        with oracledb.connect(user=DB_USER, password=DB_PASSWORD, dsn=DB_DSN) as conn:
-            # Set read committed isolation and autocommit
-            conn.autocommit = True
-            
-            with conn.cursor() as cursor:
-                # Force fresh read with hints
-                cursor.execute("ALTER SESSION SET ISOLATION_LEVEL = READ COMMITTED")
-                cursor.execute("COMMIT")
-                
-                # Test query
-                cursor.execute("select title from documents where title like '%10 jul. 1853.'")
-                for title in cursor.fetchall():
-                    print({"title": title})
-                
-                # Main query with NO_CACHE hint to force fresh read
-                cursor.execute("SELECT /*+ NO_CACHE */ text, url, title FROM documents")
-                documents = {}
-                
-                for text, url, title in cursor.fetchall():
-                    text_content = text.read() if hasattr(text, "read") else str(text)
-                    doc_hash = get_document_hash(text_content, url, title)
-                    documents[url] = {
-                        "text": text_content,
-                        "url": url,
-                        "title": title,
-                        "hash": doc_hash
-                    }
-                
-                logger.info(f"Oracle: {len(documents)} documentos encontrados")
-                return documents
+        # NO_CACHE para forçar leitura atualizada
+        for rows in stream_query("SELECT /*+ NO_CACHE */ text, url, title FROM documents"):
+            batch = []
+            for text, url, title in rows:
+                text_content = text or ""
+                batch.append({
+                    "text": text_content,
+                    "url": url,
+                    "title": title,
+                    "hash": get_document_hash(text_content, url, title)
+                })
+            yield batch
                 
     except oracledb.Error as e:
         logger.error(f"Erro Oracle: {e}")
-        return {}
+        raise
+
+def iter_elasticsearch_documents(es, index="documents", page_size=ES_SNAPSHOT_PAGE_SIZE):
+    """Percorre todo o índice com point-in-time + search_after
+    
+    O point-in-time garante uma visão consistente do índice durante a leitura
+    e não há limite de 10.000 resultados; apenas url e hash são transferidos.
+    
+    Yields:
+        tuple[str, str, str | None]: (_id, url, hash) de cada documento
+    """
+    pit_id = es.open_point_in_time(index=index, keep_alive=ES_SNAPSHOT_KEEP_ALIVE)["id"]
+    search_after = None
+    try:
+        while True:
+            response = es.search(
+                pit={"id": pit_id, "keep_alive": ES_SNAPSHOT_KEEP_ALIVE},
+                size=page_size,
+                sort=["_shard_doc"],
+                source=["url", "hash"],
+                search_after=search_after,
+                track_total_hits=False
+            )
+            hits = response['hits']['hits']
+            if not hits:
+                break
+            pit_id = response.get('pit_id', pit_id)
+            for hit in hits:
+                source = hit.get('_source', {})
+                yield hit['_id'], source.get('url'), source.get('hash')
+            search_after = hits[-1]['sort']
+    finally:
+        es.close_point_in_time(id=pit_id)
 
 def fetch_elasticsearch_documents():
-    """Busca documentos existentes no Elasticsearch"""
+    """Busca url, id e hash dos documentos existentes no Elasticsearch
+    
+    Returns:
+        tuple[dict, Elasticsearch]: url -> (id, hash) e o cliente, ou ({}, None) em caso de erro
+    """
     es = Elasticsearch("http://localhost:9200")
     
     try:
         if not es.ping():
             logger.error("Elasticsearch não disponível")
             return {}, None
-            
-        response = es.search(
-            index="documents",
-            body={"query": {"match_all": {}}, "size": 10000}
-        )
         
-        documents = {}
-        for hit in response['hits']['hits']:
-            source = hit['_source']
-            url = source['url']
-            # Use stored hash if available, otherwise calculate it
-            doc_hash = source.get('hash', get_document_hash(source['text'], source['url'], source['title']))
-            documents[url] = {
-                "id": hit['_id'],
-                "hash": doc_hash
-            }
+        # Documentos sem hash gravado ficam com hash None e serão atualizados
+        documents = {url: (doc_id, doc_hash) for doc_id, url, doc_hash in iter_elasticsearch_documents(es)}
         
         logger.info(f"Elasticsearch: {len(documents)} documentos encontrados")
         return documents, es
@@ -102,10 +115,14 @@ def fetch_elasticsearch_documents():
         return {}, None
 
 def update_elasticsearch(force_reupload=False):
-    """Atualiza Elasticsearch com mudanças do Oracle"""
+    """Atualiza Elasticsearch com mudanças do Oracle
+    
+    Os documentos do Oracle são lidos em streaming e comparados com os hashes
+    já indexados; inclusões, atualizações e remoções seguem em um único fluxo
+    de indexação em lote. Apenas os hashes (url -> (id, hash)) ficam em memória.
+    """
     logger.info("=== ATUALIZANDO ELASTICSEARCH ===")
     
-    oracle_docs = fetch_oracle_documents()
     es_docs, es = fetch_elasticsearch_documents()
     
     if not es:
@@ -119,60 +136,75 @@ def update_elasticsearch(force_reupload=False):
             logger.info("✅ Todos os documentos removidos")
         except:
             pass
+        es_docs = {}
+    
+    counts = {"added": 0, "updated": 0, "deleted": 0}
+    seen_urls = set()
+    
+    def actions():
+        """Gera as ações de inclusão, atualização e remoção"""
+        for batch in fetch_oracle_documents():
+            # Detecta novos e modificados
+            for oracle_doc in batch:
+                url = oracle_doc["url"]
+                if url in seen_urls:
+                    continue
+                seen_urls.add(url)
+                
+                source = {"text": oracle_doc["text"], "url": url, "title": oracle_doc["title"], "hash": oracle_doc["hash"]}
+                if url not in es_docs:
+                    counts["added"] += 1
+                    yield {"_op_type": "index", "_index": "documents", "_source": source}
+                else:
+                    es_id, es_hash = es_docs[url]
+                    if es_hash != oracle_doc['hash']:
+                        counts["updated"] += 1
+                        yield {"_op_type": "update", "_index": "documents", "_id": es_id, "doc": source}
         
-        # Add all Oracle documents
-        to_add = list(oracle_docs.values())
-        to_update = []
-        to_delete = []
-    else:
-        to_add = []
-        to_update = []
-        to_delete = []
-        
-        # Detecta novos e modificados
-        for url, oracle_doc in oracle_docs.items():
-            if url not in es_docs:
-                to_add.append(oracle_doc)
-            elif es_docs[url]['hash'] != oracle_doc['hash']:
-                oracle_doc['es_id'] = es_docs[url]['id']
-                to_update.append(oracle_doc)
-        
-        # Detecta removidos
-        for url, es_doc in es_docs.items():
-            if url not in oracle_docs:
-                to_delete.append(es_doc)
-    
-    logger.info(f"Mudanças: +{len(to_add)} ~{len(to_update)} -{len(to_delete)}")
-    
-    # Executa atualizações
-    if to_add:
-        actions = [{
-            "_index": "documents",
-            "_source": {"text": doc["text"], "url": doc["url"], "title": doc["title"], "hash": doc["hash"]}
-        } for doc in to_add]
+        logger.info(f"Oracle: {len(seen_urls)} documentos lidos")
         
-        bulk(es, actions)
-        logger.info(f"✅ {len(to_add)} documentos adicionados")
-    
-    if to_update:
-        for doc in to_update:
-            es.update(
-                index="documents",
-                id=doc["es_id"],
-                body={"doc": {"text": doc["text"], "url": doc["url"], "title": doc["title"], "hash": doc["hash"]}}
-            )
-        logger.info(f"✅ {len(to_update)} documentos atualizados")
+        # Detecta removidos (só após a leitura completa do Oracle)
+        for url, (es_id, _) in es_docs.items():
+            if url not in seen_urls:
+                counts["deleted"] += 1
+                yield {"_op_type": "delete", "_index": "documents", "_id": es_id}
+    
+    try:
+        success, errors = bulk_index(es, actions())
+    except oracledb.Error:
+        # Leitura incompleta: as remoções não foram geradas
+        logger.error("Sincronização interrompida; remoções não aplicadas")
+        if force_reupload or counts["added"] or counts["updated"]:
+            invalidate_result_caches()
+        return
+    
+    added, updated, deleted = counts["added"], counts["updated"], counts["deleted"]
+    logger.info(f"Mudanças: +{added} ~{updated} -{deleted}")
+    
+    if added:
+        logger.info(f"✅ {added} documentos adicionados")
+    
+    if updated:
+        logger.info(f"✅ {updated} documentos atualizados")
     
-    if to_delete:
-        for doc in to_delete:
-            es.delete(index="documents", id=doc["id"])
-        logger.info(f"✅ {len(to_delete)} documentos removidos")
+    if deleted:
+        logger.info(f"✅ {deleted} documentos removidos")
     
-    if not (to_add or to_update or to_delete):
+    if errors:
+        logger.error(f"❌ {len(errors)} operações falharam")
+    
+    if not (added or updated or deleted):
         logger.info("✅ Elasticsearch já está sincronizado")
     
+    if force_reupload or added or updated or deleted:
+        # Índice mudou: resultados em cache não valem mais
+        invalidate_result_caches()
+    
     logger.info("=== ATUALIZAÇÃO CONCLUÍDA ===")
 
 if __name__ == "__main__":
     force_reupload = len(sys.argv) > 1 and sys.argv[1] == "--force"
-    update_elasticsearch(force_reupload)
\ No newline at end of file
+    try:
+        update_elasticsearch(force_reupload)
+    finally:
+        close_pool()
\ No newline at end of file
@@ -9,6 +9,7 @@ de algoritmos de busca.
 """
 import logging
 from dotenv import load_dotenv
+from result_cache import ResultCache
 
 # Configuração do sistema de logging para debug
 logging.basicConfig(level=logging.INFO)
@@ -20,6 +21,9 @@ load_dotenv()
 # Nota: Funções de modelo e vetorização movidas para search_algorithms/vector_search.py
 # Este módulo agora serve como interface de compatibilidade
 
+# Cache de resultados por (consulta, n_results)
+_result_cache = ResultCache("vector_search")
+
 def search_similar_documents(query_text, n_results=5):
     """Busca documentos similares usando busca vetorial semântica
     
@@ -33,6 +37,12 @@ def search_similar_documents(query_text, n_results=5):
     Returns:
         list[dict]: Lista de documentos com campos 'text', 'url' e 'title'
     """
+    # Consultas idênticas recentes são respondidas pelo cache
+    cache_key = (query_text, n_results)
+    cached = _result_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    
     # Importa algoritmo vetorial do módulo search_algorithms
     from search_algorithms.vector_search import search_documents_by_text
     
@@ -47,6 +57,46 @@ def search_similar_documents(query_text, n_results=5):
         if 'relevance_score' in doc:
             del doc['relevance_score']
     
+    # Não guarda resultados vazios (podem indicar indisponibilidade temporária)
+    if results:
+        _result_cache.put(cache_key, results)
+    return results
+
+def search_similar_documents_by_vector(query_vector, n_results=5, query_text=None):
+    """Busca documentos similares a partir de um embedding já calculado
+    
+    Permite que o chamador gere os embeddings de várias consultas em lote
+    (search_algorithms.vector_search.vectorize_queries) e depois dispare as
+    buscas no Oracle separadamente. Com query_text, usa o mesmo cache de
+    search_similar_documents (chave: consulta e n_results).
+    
+    Args:
+        query_vector (np.ndarray): Embedding da consulta
+        n_results (int): Número de resultados a retornar (padrão: 5)
+        query_text (str, optional): Texto que originou o embedding
+        
+    Returns:
+        list[dict]: Lista de documentos com campos 'text', 'url' e 'title'
+    """
+    # Consultas idênticas recentes são respondidas pelo cache
+    cache_key = (query_text, n_results)
+    if query_text:
+        cached = _result_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    from search_algorithms.vector_search import search_documents_by_vectors
+    
+    results = search_documents_by_vectors([query_vector], n_results_per_query=n_results)
+    
+    # Remove campo relevance_score para manter compatibilidade
+    for doc in results:
+        if 'relevance_score' in doc:
+            del doc['relevance_score']
+    
+    # Não guarda resultados vazios (podem indicar indisponibilidade temporária)
+    if query_text and results:
+        _result_cache.put(cache_key, results)
     return results
 
 def test_vector_search():
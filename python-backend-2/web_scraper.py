@@ -5,58 +5,73 @@ from urllib.parse import urljoin, urlparse
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+# Mesmo User-Agent para o scraper síncrono e o assíncrono (async_web_scraper.py)
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# lxml é bem mais rápido que o html.parser; usado quando instalado
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+def parse_webpage(url, content):
+    """
+    Extrai título, descrição, conteúdo textual e links de um HTML já baixado
+    """
+    print("📝 Analisando HTML...")
+    soup = BeautifulSoup(content, HTML_PARSER)
+    
+    # Remove scripts e styles
+    for script in soup(["script", "style"]):
+        script.decompose()
+    print("✅ Análise HTML concluída")
+    
+    # Extrai título
+    title = soup.find('title')
+    title_text = title.get_text().strip() if title else ""
+    
+    # Extrai meta description
+    meta_desc = soup.find('meta', attrs={'name': 'description'})
+    description = meta_desc.get('content', '') if meta_desc else ""
+    
+    # Extrai conteúdo principal
+    content_tags = soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'article', 'section'])
+    content_text = ' '.join([tag.get_text().strip() for tag in content_tags if tag.get_text().strip()])
+    
+    # Extrai links
+    links = []
+    for link in soup.find_all('a', href=True):
+        href = urljoin(url, link['href'])
+        link_text = link.get_text().strip()
+        if link_text:
+            links.append({'url': href, 'text': link_text})
+    
+    print(f"✅ Scraping concluído - Extraídos {len(content_text)} caracteres")
+    return {
+        'url': url,
+        'title': title_text,
+        'description': description,
+        'content': content_text,
+        'links': links[:10],  # Limita a 10 links
+        'status': 'success'
+    }
+
 def scrape_webpage(url):
     """
     Realiza web scraping de uma URL e extrai o conteúdo textual
     """
     try:
         print(f"🔍 Fazendo scraping da URL: {url}")
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
         
         print("🌐 Baixando conteúdo da página...")
-        response = requests.get(url, headers=headers, timeout=30, verify=False)
+        response = requests.get(url, headers=HEADERS, timeout=30, verify=False)
         response.raise_for_status()
         print("✅ Download concluído")
         
-        print("📝 Analisando HTML...")
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove scripts e styles
-        for script in soup(["script", "style"]):
-            script.decompose()
-        print("✅ Análise HTML concluída")
-        
-        # Extrai título
-        title = soup.find('title')
-        title_text = title.get_text().strip() if title else ""
-        
-        # Extrai meta description
-        meta_desc = soup.find('meta', attrs={'name': 'description'})
-        description = meta_desc.get('content', '') if meta_desc else ""
-        
-        # Extrai conteúdo principal
-        content_tags = soup.find_all(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'article', 'section'])
-        content_text = ' '.join([tag.get_text().strip() for tag in content_tags if tag.get_text().strip()])
-        
-        # Extrai links
-        links = []
-        for link in soup.find_all('a', href=True):
-            href = urljoin(url, link['href'])
-            link_text = link.get_text().strip()
-            if link_text:
-                links.append({'url': href, 'text': link_text})
-        
-        print(f"✅ Scraping concluído - Extraídos {len(content_text)} caracteres")
-        return {
-            'url': url,
-            'title': title_text,
-            'description': description,
-            'content': content_text,
-            'links': links[:10],  # Limita a 10 links
-            'status': 'success'
-        }
+        return parse_webpage(url, response.content)
         
     except Exception as e:
         return {